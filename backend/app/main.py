@@ -15,8 +15,13 @@ print(f"[ENV] DEEPGRAM_API_KEY present: {bool(os.getenv('DEEPGRAM_API_KEY'))}")
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.routes import catalyst, voice, rag
-from app.services.firebase_service import initialize_firebase, cleanup_firebase
+from app.routes import catalyst, voice, rag, metrics as metrics_routes
+from app.services.firebase_service import initialize_firebase, cleanup_firebase, get_firestore_client
+from app.services.job_service import job_service
+from app.services.batch_service import batch_service
+from app.services.deepgram_service import deepgram_service
+from app.services.blocking_executor import blocking_executor
+from app.services import metrics
 
 
 @asynccontextmanager
@@ -25,9 +30,16 @@ async def lifespan(app: FastAPI):
     Lifespan context manager for FastAPI app.
     Handles startup and shutdown events.
     """
+    # Shared pool for blocking work of async routes (transcription, workflow)
+    blocking_executor.start()
+
     # Startup: Initialize Firebase
     try:
         initialize_firebase()
+        # Count Firestore reads/writes per pipeline stage
+        metrics.instrument_firestore()
+        # Start meeting job workers and resume jobs interrupted by a restart
+        job_service.start(get_firestore_client())
         print("✓ Application started successfully")
     except FileNotFoundError as e:
         print(f"⚠ WARNING: {str(e)}")
@@ -38,7 +50,11 @@ async def lifespan(app: FastAPI):
 
     yield
 
-    # Shutdown: Cleanup Firebase resources
+    # Shutdown: Stop job workers, batches and the blocking executor, then cleanup Firebase resources
+    job_service.shutdown()
+    batch_service.shutdown()
+    blocking_executor.shutdown()
+    deepgram_service.close()
     cleanup_firebase()
     print("✓ Application shutdown complete")
 
@@ -60,3 +76,4 @@ app.add_middleware(
 app.include_router(catalyst.router)
 app.include_router(voice.router)
 app.include_router(rag.router)
+app.include_router(metrics_routes.router)
@@ -18,3 +18,11 @@ class CycleStatus(str, enum.Enum):
     active = "active"
     completed = "completed"
     cancelled = "cancelled"
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    analyzing = "analyzing"
+    creating = "creating"
+    diagramming = "diagramming"
+    done = "done"
+    failed = "failed"
@@ -1,6 +1,7 @@
 from datetime import date, datetime
-from typing import List, Optional
-from pydantic import BaseModel, Field
+import re
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from .enums import TicketStatus, Priority, CycleStatus
 
 
@@ -220,6 +221,7 @@ class TicketBase(BaseModel):
     cycle_id: Optional[str] = None
     module_id: Optional[str] = None
     parent_ticket_id: Optional[str] = None
+    dependency_ids: List[str] = Field(default_factory=list)  # Tickets this one depends on
 
 
 class TicketCreate(TicketBase):
@@ -240,6 +242,7 @@ class TicketUpdate(BaseModel):
     cycle_id: Optional[str] = None
     module_id: Optional[str] = None
     parent_ticket_id: Optional[str] = None
+    dependency_ids: Optional[List[str]] = None
     label_ids: Optional[List[str]] = None
 
 
@@ -275,6 +278,7 @@ class UserBase(BaseModel):
     email: Optional[str] = Field(None, max_length=255)
     avatar_url: Optional[str] = Field(None, max_length=500)
     color: Optional[str] = Field(None, max_length=7)
+    aliases: Optional[List[str]] = Field(None, description="Other names used for this person in meetings")
 
 
 class UserCreate(UserBase):
@@ -286,6 +290,7 @@ class UserUpdate(BaseModel):
     email: Optional[str] = Field(None, max_length=255)
     avatar_url: Optional[str] = Field(None, max_length=500)
     color: Optional[str] = Field(None, max_length=7)
+    aliases: Optional[List[str]] = None
 
 
 class UserOut(UserBase):
@@ -302,6 +307,135 @@ class UserListOut(BaseModel):
     total: int
 
 
+# ============================================================================
+# AGGREGATE SCHEMAS
+# ============================================================================
+
+class CountOut(BaseModel):
+    total: int
+
+
+class TicketEstimatesOut(BaseModel):
+    total: int
+    total_estimated_hours: float
+    avg_estimated_hours: Optional[float] = None
+
+
+# ============================================================================
+# ANALYTICS SCHEMAS
+# ============================================================================
+
+class BurndownDayOut(BaseModel):
+    date: date
+    scope_hours: Optional[float] = None
+    completed_hours: Optional[float] = None
+    remaining_hours: Optional[float] = None
+    remaining_tickets: Optional[int] = None
+    ideal_hours: float
+
+
+class CycleBurndownOut(BaseModel):
+    cycle_id: str
+    project_id: Optional[str] = None
+    start_date: date
+    end_date: date
+    ticket_count: int
+    completed_ticket_count: int
+    total_scope_hours: float
+    completed_hours: float
+    unestimated_ticket_count: int
+    days: List[BurndownDayOut]
+
+
+class CycleVelocityOut(BaseModel):
+    cycle_id: str
+    name: Optional[str] = None
+    status: Optional[str] = None
+    start_date: date
+    end_date: date
+    committed_hours: float
+    completed_hours: float
+    committed_tickets: int
+    completed_tickets: int
+    completion_rate: float
+
+
+class ProjectVelocityOut(BaseModel):
+    project_id: str
+    cycles: List[CycleVelocityOut]
+    average_velocity: Optional[float] = None
+    window: int
+
+
+class CriticalPathTicketOut(BaseModel):
+    id: str
+    title: Optional[str] = None
+    status: Optional[str] = None
+    estimated_hours: Optional[float] = None
+    assignee_id: Optional[str] = None
+    dependency_ids: List[str] = Field(default_factory=list)
+    duration_hours: float
+    earliest_start_hours: float
+    earliest_finish_hours: float
+    latest_start_hours: float
+    latest_finish_hours: float
+    slack_hours: float
+    earliest_start_date: date
+    latest_start_date: date
+    is_critical: bool
+
+
+class CriticalPathOut(BaseModel):
+    project_id: str
+    anchor_date: date
+    hours_per_day: float
+    duration_hours: float
+    estimated_finish_date: date
+    critical_path: List[str]
+    topological_order: List[str]
+    tickets: List[CriticalPathTicketOut]
+
+
+class WorkloadSummaryOut(BaseModel):
+    ticket_count: int
+    unestimated_ticket_count: int
+    total_hours: float
+    remaining_hours: float
+    completed_hours: float
+    hours_by_status: Dict[str, float]
+    tickets_by_status: Dict[str, int]
+
+
+class ProjectWorkloadOut(WorkloadSummaryOut):
+    project_id: Optional[str] = None
+
+
+class CycleWorkloadOut(WorkloadSummaryOut):
+    cycle_id: Optional[str] = None
+    project_id: Optional[str] = None
+
+
+class UserWorkloadOut(WorkloadSummaryOut):
+    user_id: str
+    projects: List[ProjectWorkloadOut]
+    cycles: List[CycleWorkloadOut]
+
+
+class AssigneeCapacityOut(WorkloadSummaryOut):
+    assignee_id: Optional[str] = None
+    capacity_hours: Optional[float] = None
+    utilization: Optional[float] = None
+    over_capacity: bool = False
+
+
+class ProjectCapacityOut(BaseModel):
+    project_id: str
+    cycle_id: Optional[str] = None
+    capacity_hours: Optional[float] = None
+    total_remaining_hours: float
+    assignees: List[AssigneeCapacityOut]
+
+
 # ============================================================================
 # MERMAID GENERATION SCHEMAS
 # ============================================================================
@@ -311,4 +445,77 @@ class MermaidGenerateRequest(BaseModel):
 
 
 class MermaidGenerateResponse(BaseModel):
-    mermaid: str = Field(..., description="Generated Mermaid diagram syntax")
\ No newline at end of file
+    mermaid: str = Field(..., description="Generated Mermaid diagram syntax")
+
+
+# ============================================================================
+# MEETING ANALYSIS SCHEMAS (Agent 1 output)
+# ============================================================================
+
+class TicketSpec(BaseModel):
+    """
+    One ticket extracted from a meeting transcript.
+
+    The JSON schema of MeetingAnalysisSpec is sent to the model for guided
+    decoding; validation is lenient so slightly off values are coerced
+    (or dropped to null) instead of losing the whole ticket.
+    """
+    model_config = ConfigDict(extra="ignore")
+
+    title: str = Field(..., min_length=1, max_length=255)
+    description: Optional[str] = None
+    priority: Optional[str] = Field(None, json_schema_extra={"enum": [p.value for p in Priority] + [None]})
+    estimated_hours: Optional[float] = Field(None, ge=0)
+    assignee_name: Optional[str] = None
+    deadline: Optional[str] = Field(None, description="YYYY-MM-DD")
+    labels: List[str] = Field(default_factory=list)
+    dependencies: List[str] = Field(default_factory=list, description='"ticket:N" references')
+
+    @field_validator("title", mode="before")
+    @classmethod
+    def _strip_title(cls, value: Any) -> Any:
+        return value.strip() if isinstance(value, str) else value
+
+    @field_validator("priority", mode="before")
+    @classmethod
+    def _priority_text(cls, value: Any) -> Optional[str]:
+        return str(value).strip().lower() if value is not None else None
+
+    @field_validator("estimated_hours", mode="before")
+    @classmethod
+    def _hours_number(cls, value: Any) -> Optional[float]:
+        # "4h", "about 3 hours" -> leading number; anything else -> null
+        if isinstance(value, str):
+            match = re.search(r"\d+(?:\.\d+)?", value)
+            return float(match.group()) if match else None
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0:
+            return value
+        return None
+
+    @field_validator("labels", mode="before")
+    @classmethod
+    def _label_list(cls, value: Any) -> List[str]:
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list):
+            return []
+        return [label.strip() for label in value if isinstance(label, str) and label.strip()]
+
+    @field_validator("dependencies", mode="before")
+    @classmethod
+    def _dependency_list(cls, value: Any) -> List[str]:
+        if isinstance(value, (str, int)) and not isinstance(value, bool):
+            value = [value]
+        if not isinstance(value, list):
+            return []
+        return [
+            f"ticket:{dep}" if isinstance(dep, int) and not isinstance(dep, bool) else dep
+            for dep in value
+            if isinstance(dep, str) or (isinstance(dep, int) and not isinstance(dep, bool))
+        ]
+
+
+class MeetingAnalysisSpec(BaseModel):
+    """Complete Agent 1 response: project name followed by the tickets."""
+    project_name: Optional[str] = None
+    tickets: List[TicketSpec] = Field(default_factory=list)
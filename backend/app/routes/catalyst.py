@@ -15,9 +15,15 @@ from app.models.schemas import (
     TicketCreate, TicketUpdate, TicketOut, TicketListOut,
     # User schemas
     UserCreate, UserUpdate, UserOut, UserListOut,
+    # Aggregate schemas
+    CountOut, TicketEstimatesOut,
+    # Analytics schemas
+    CycleBurndownOut, ProjectVelocityOut, CriticalPathOut,
+    UserWorkloadOut, ProjectCapacityOut,
     # Mermaid schemas
     MermaidGenerateRequest, MermaidGenerateResponse,
 )
+from app.models.enums import TicketStatus
 from app.services.firestore_client import get_db
 from app.services.project_service import project_service
 from app.services.label_service import label_service
@@ -25,6 +31,9 @@ from app.services.cycle_service import cycle_service
 from app.services.module_service import module_service
 from app.services.ticket_service import ticket_service
 from app.services.user_service import user_service
+from app.services.analytics_service import analytics_service
+from app.services.dependency_graph import dependency_graph_service, DependencyCycleError
+from app.services.workload_service import workload_service
 from app.services.nemotron_service import generate_mermaid_from_prompt
 
 
@@ -59,6 +68,15 @@ def list_projects(db: firestore.Client = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to fetch projects: {str(e)}")
 
 
+@project_router.get("/count", response_model=CountOut)
+def count_projects(db: firestore.Client = Depends(get_db)):
+    """Count projects without fetching them"""
+    try:
+        return {"total": project_service.count_projects(db)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to count projects: {str(e)}")
+
+
 @project_router.get("/{project_id}", response_model=ProjectOut)
 def get_project(project_id: str, db: firestore.Client = Depends(get_db)):
     """Get a single project by ID"""
@@ -68,6 +86,57 @@ def get_project(project_id: str, db: firestore.Client = Depends(get_db)):
     return project
 
 
+@project_router.get("/{project_id}/velocity", response_model=ProjectVelocityOut)
+def get_project_velocity(
+    project_id: str,
+    window: int = Query(3, ge=1, le=20),
+    db: firestore.Client = Depends(get_db),
+):
+    """Committed vs. completed hours per cycle and rolling velocity"""
+    if not project_service.get_project_by_id(db, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    try:
+        return analytics_service.get_project_velocity(db, project_id, window)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute velocity: {str(e)}")
+
+
+@project_router.get("/{project_id}/critical-path", response_model=CriticalPathOut)
+def get_project_critical_path(project_id: str, db: firestore.Client = Depends(get_db)):
+    """Critical path, topological order and earliest/latest start of every ticket"""
+    if not project_service.get_project_by_id(db, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    try:
+        return dependency_graph_service.get_critical_path(db, project_id)
+    except DependencyCycleError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "cycle": e.cycle})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute critical path: {str(e)}")
+
+
+@project_router.get("/{project_id}/capacity", response_model=ProjectCapacityOut)
+def get_project_capacity(
+    project_id: str,
+    cycle_id: Optional[str] = Query(None),
+    capacity_hours: Optional[float] = Query(None, gt=0, description="Available hours per person"),
+    db: firestore.Client = Depends(get_db),
+):
+    """Estimated hours per assignee and status, compared with available capacity"""
+    if not project_service.get_project_by_id(db, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    cycle = None
+    if cycle_id is not None:
+        cycle = cycle_service.get_cycle_by_id(db, cycle_id)
+        if not cycle or cycle.get("project_id") != project_id:
+            raise HTTPException(status_code=404, detail="Cycle not found in this project")
+
+    try:
+        return workload_service.get_project_capacity(db, project_id, cycle, capacity_hours)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute capacity: {str(e)}")
+
+
 @project_router.put("/{project_id}", response_model=ProjectOut)
 def update_project(project_id: str, update_data: ProjectUpdate, db: firestore.Client = Depends(get_db)):
     """Update a project"""
@@ -119,6 +188,15 @@ def list_labels(project_id: Optional[str] = Query(None), db: firestore.Client =
         raise HTTPException(status_code=500, detail=f"Failed to fetch labels: {str(e)}")
 
 
+@label_router.get("/count", response_model=CountOut)
+def count_labels(project_id: Optional[str] = Query(None), db: firestore.Client = Depends(get_db)):
+    """Count labels, optionally filtered by project, without fetching them"""
+    try:
+        return {"total": label_service.count_labels(db, project_id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to count labels: {str(e)}")
+
+
 @label_router.get("/{label_id}", response_model=LabelOut)
 def get_label(label_id: str, db: firestore.Client = Depends(get_db)):
     """Get a single label by ID"""
@@ -179,6 +257,15 @@ def list_cycles(project_id: Optional[str] = Query(None), db: firestore.Client =
         raise HTTPException(status_code=500, detail=f"Failed to fetch cycles: {str(e)}")
 
 
+@cycle_router.get("/count", response_model=CountOut)
+def count_cycles(project_id: Optional[str] = Query(None), db: firestore.Client = Depends(get_db)):
+    """Count cycles, optionally filtered by project, without fetching them"""
+    try:
+        return {"total": cycle_service.count_cycles(db, project_id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to count cycles: {str(e)}")
+
+
 @cycle_router.get("/{cycle_id}", response_model=CycleOut)
 def get_cycle(cycle_id: str, db: firestore.Client = Depends(get_db)):
     """Get a single cycle by ID"""
@@ -188,6 +275,20 @@ def get_cycle(cycle_id: str, db: firestore.Client = Depends(get_db)):
     return cycle
 
 
+@cycle_router.get("/{cycle_id}/burndown", response_model=CycleBurndownOut)
+def get_cycle_burndown(cycle_id: str, db: firestore.Client = Depends(get_db)):
+    """Daily scope, completed and remaining hours for a cycle"""
+    try:
+        burndown = analytics_service.get_cycle_burndown(db, cycle_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute burndown: {str(e)}")
+    if burndown is None:
+        raise HTTPException(status_code=404, detail="Cycle not found")
+    return burndown
+
+
 @cycle_router.put("/{cycle_id}", response_model=CycleOut)
 def update_cycle(cycle_id: str, update_data: CycleUpdate, db: firestore.Client = Depends(get_db)):
     """Update a cycle"""
@@ -239,6 +340,15 @@ def list_modules(project_id: Optional[str] = Query(None), db: firestore.Client =
         raise HTTPException(status_code=500, detail=f"Failed to fetch modules: {str(e)}")
 
 
+@module_router.get("/count", response_model=CountOut)
+def count_modules(project_id: Optional[str] = Query(None), db: firestore.Client = Depends(get_db)):
+    """Count modules, optionally filtered by project, without fetching them"""
+    try:
+        return {"total": module_service.count_modules(db, project_id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to count modules: {str(e)}")
+
+
 @module_router.get("/{module_id}", response_model=ModuleOut)
 def get_module(module_id: str, db: firestore.Client = Depends(get_db)):
     """Get a single module by ID"""
@@ -352,6 +462,41 @@ def list_tickets(project_id: Optional[str] = Query(None), db: firestore.Client =
         raise HTTPException(status_code=500, detail=f"Failed to fetch tickets: {str(e)}\n{traceback.format_exc()}")
 
 
+@ticket_router.get("/count", response_model=CountOut)
+def count_tickets(
+    project_id: Optional[str] = Query(None),
+    status: Optional[TicketStatus] = Query(None),
+    cycle_id: Optional[str] = Query(None),
+    assignee_id: Optional[str] = Query(None),
+    db: firestore.Client = Depends(get_db),
+):
+    """Count tickets matching the filters with a single aggregation query"""
+    try:
+        total = ticket_service.count_tickets(
+            db, project_id, status.value if status else None, cycle_id, assignee_id
+        )
+        return {"total": total}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to count tickets: {str(e)}")
+
+
+@ticket_router.get("/estimates", response_model=TicketEstimatesOut)
+def ticket_estimates(
+    project_id: Optional[str] = Query(None),
+    status: Optional[TicketStatus] = Query(None),
+    cycle_id: Optional[str] = Query(None),
+    assignee_id: Optional[str] = Query(None),
+    db: firestore.Client = Depends(get_db),
+):
+    """Ticket count with sum and average of estimated_hours, computed server-side"""
+    try:
+        return ticket_service.get_estimate_totals(
+            db, project_id, status.value if status else None, cycle_id, assignee_id
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to aggregate ticket estimates: {str(e)}")
+
+
 @ticket_router.get("/{ticket_id}", response_model=TicketOut)
 def get_ticket(ticket_id: str, db: firestore.Client = Depends(get_db)):
     """Retrieve a single ticket by ID"""
@@ -412,6 +557,15 @@ def list_users(db: firestore.Client = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to fetch users: {str(e)}")
 
 
+@user_router.get("/count", response_model=CountOut)
+def count_users(db: firestore.Client = Depends(get_db)):
+    """Count users without fetching them"""
+    try:
+        return {"total": user_service.count_users(db)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to count users: {str(e)}")
+
+
 @user_router.get("/{user_id}", response_model=UserOut)
 def get_user(user_id: str, db: firestore.Client = Depends(get_db)):
     """Retrieve a single user by ID"""
@@ -421,6 +575,17 @@ def get_user(user_id: str, db: firestore.Client = Depends(get_db)):
     return user
 
 
+@user_router.get("/{user_id}/workload", response_model=UserWorkloadOut)
+def get_user_workload(user_id: str, db: firestore.Client = Depends(get_db)):
+    """Estimated hours assigned to a user by status, project and cycle"""
+    if not user_service.get_user_by_id(db, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        return workload_service.get_user_workload(db, user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute workload: {str(e)}")
+
+
 @user_router.put("/{user_id}", response_model=UserOut)
 def update_user(user_id: str, update_data: UserUpdate, db: firestore.Client = Depends(get_db)):
     """Update an existing user"""
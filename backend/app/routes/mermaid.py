@@ -17,7 +17,7 @@ class MermaidRequest(BaseModel):
 
 
 @router.post("/generate")
-async def generate_mermaid(request: MermaidRequest):
+def generate_mermaid(request: MermaidRequest):
     """
     Generate a Mermaid diagram from a text prompt.
 
@@ -0,0 +1,17 @@
+"""
+Prometheus scrape endpoint.
+"""
+
+from fastapi import APIRouter, Request, Response
+
+from app.services import metrics
+
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics(request: Request):
+    """Pipeline metrics in Prometheus text format (OpenMetrics with exemplars if accepted)."""
+    body, content_type = metrics.exposition(request.headers.get("accept"))
+    return Response(content=body, media_type=content_type)
@@ -4,14 +4,29 @@ Voice transcription routes for Deepgram integration.
 Handles both live audio streaming and pre-recorded file uploads.
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+import json
+import time
 import traceback
 
 from app.services.deepgram_service import deepgram_service
+from app.services.audio_upload import receive_audio, UploadTooLargeError, UploadFormatError
+from app.services.live_meeting import run_live_meeting
 from app.services.agent_service import agent_service
 from app.services.firebase_service import get_firestore_client
+from app.services.llm_cache import llm_cache
+from app.services.job_service import job_service, JobQueueFullError
+from app.services.blocking_executor import blocking_executor, ExecutorSaturatedError
+from app.services.single_flight import meeting_flight, mermaid_flight
+from app.services.nemotron_service import nvidia_limiter
+from app.services.token_budget import token_usage
+from app.services.json_stream import parse_stats
+from app.services.ticket_dedup import ticket_dedup
+from app.services.batch_service import batch_service, is_valid_batch_id, load_items
 
 
 router = APIRouter(prefix="/api/voice", tags=["Voice"])
@@ -21,40 +36,101 @@ router = APIRouter(prefix="/api/voice", tags=["Voice"])
 class ProcessMeetingRequest(BaseModel):
     transcript: str
     project_name: Optional[str] = None
+    # Draw the diagram with the LLM instead of the local renderer
+    stylised_diagram: bool = False
 
 
-@router.post("/transcribe-file")
-async def transcribe_audio_file(file: UploadFile = File(...)):
+class BatchTranscript(BaseModel):
+    id: str
+    transcript: str
+    project_name: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    # Exactly one source: a directory or .jsonl manifest below BATCH_ROOT, or inline transcripts
+    directory: Optional[str] = None
+    manifest: Optional[str] = None
+    transcripts: Optional[List[BatchTranscript]] = None
+    # Reuse an earlier batch ID to resume it from its results file
+    batch_id: Optional[str] = None
+    workers: Optional[int] = Field(None, ge=1, le=32)
+    retry_failed: bool = False
+
+
+# Documents the multipart body that the route parses itself
+_AUDIO_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            },
+            "audio/*": {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+
+@router.post("/transcribe-file", openapi_extra=_AUDIO_UPLOAD_BODY)
+async def transcribe_audio_file(
+    request: Request,
+    normalize: Optional[bool] = Query(None, description="Downmix to mono 16 kHz and re-encode before sending (default: AUDIO_NORMALIZE)"),
+    codec: Optional[Literal["opus", "flac", "wav"]] = Query(None, description="Codec of the normalized audio (default: AUDIO_CODEC)"),
+    trim_silence: Optional[bool] = Query(None, description="Cut long pauses while normalizing (default: VAD_ENABLED)")
+):
     """
     Transcribe a pre-recorded audio file.
     
     Supports: MP3, WAV, M4A, WebM, OGG
+
+    Send a multipart 'file' field, or the raw audio with its content type.
+    The upload is streamed to a temp file (never fully into memory) and
+    rejected with 413 once it exceeds MAX_UPLOAD_BYTES.
+
+    Unless normalize=false, the audio is converted to mono 16 kHz Opus (or
+    codec) first, and unless trim_silence=false long pauses are cut; word
+    timestamps still refer to the uploaded audio. metadata.preprocess
+    reports the bytes and silence removed and the time it took,
+    metadata.total_seconds the whole transcription.
     """
     import asyncio
-    from concurrent.futures import ThreadPoolExecutor
-    
+
     try:
-        print(f"[Voice API] Receiving file: {file.filename} ({file.content_type})")
-        
-        # Read file content
-        file_content = await file.read()
-        print(f"[Voice API] File size: {len(file_content)} bytes")
-        
+        # Turn the upload away before reading it when there is no worker for it
+        blocking_executor.check_capacity("transcribe-file")
+        try:
+            audio = await receive_audio(request)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except UploadFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        print(f"[Voice API] Received file: {audio.filename} ({audio.mimetype}), "
+              f"{audio.size} bytes, sha256 {audio.sha256[:12]}")
+
         # Get mimetype
-        mimetype = file.content_type or "audio/wav"
-        
-        # Run Deepgram in thread pool to prevent blocking with timeout
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as pool:
-            result = await asyncio.wait_for(
-                loop.run_in_executor(
-                    pool,
-                    deepgram_service.transcribe_file,
-                    file_content,
-                    mimetype
-                ),
-                timeout=120.0  # 2 minute timeout
-            )
+        mimetype = audio.mimetype or "audio/wav"
+
+        # Run Deepgram on the shared executor to prevent blocking with timeout.
+        # The upload is closed when the task ends: after a timeout the worker
+        # may still be reading it.
+        started = time.perf_counter()
+        result = await blocking_executor.run(
+            deepgram_service.transcribe_file,
+            audio,
+            mimetype,
+            audio.size,
+            normalize,
+            codec,
+            trim_silence,
+            timeout=120.0,  # 2 minute timeout
+            on_done=audio.close
+        )
+        total_seconds = time.perf_counter() - started
         
         print(f"[Voice API] Transcription result: {result.get('success')}")
         
@@ -64,13 +140,21 @@ async def transcribe_audio_file(file: UploadFile = File(...)):
                 detail=f"Transcription failed: {result.get('error', 'Unknown error')}"
             )
         
-        return result["data"]
+        data = result["data"]
+        data["metadata"]["bytes"] = audio.size
+        data["metadata"]["sha256"] = audio.sha256
+        data["metadata"]["total_seconds"] = round(total_seconds, 3)
+        return data
         
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except asyncio.TimeoutError:
         raise HTTPException(
             status_code=504,
             detail="Transcription timed out after 2 minutes. Please try a smaller file."
         )
+    except HTTPException:
+        raise
     except ValueError as e:
         # API key not configured
         raise HTTPException(status_code=503, detail=str(e))
@@ -83,14 +167,99 @@ async def transcribe_audio_file(file: UploadFile = File(...)):
         )
 
 
+@router.websocket("/live")
+async def live_transcription(
+    websocket: WebSocket,
+    project_name: Optional[str] = None,
+    encoding: Optional[str] = None,
+    sample_rate: Optional[int] = None,
+    channels: Optional[int] = None,
+    language: Optional[str] = None
+):
+    """
+    Live meeting transcription with tickets created during the meeting.
+
+    Send audio as binary frames (containerized audio such as WebM/Opus as
+    is; raw PCM needs encoding and sample_rate) and {"type": "stop"} to end
+    the meeting. Receives interim/final 'transcript' messages, 'project' and
+    'ticket' messages as tickets are extracted, and a final 'done' message.
+    """
+    await websocket.accept()
+    if not deepgram_service.has_api_key():
+        await websocket.send_text(json.dumps({
+            "type": "error",
+            "data": {"error": "DEEPGRAM_API_KEY not found in environment variables"}
+        }))
+        await websocket.close(code=1011)
+        return
+    try:
+        blocking_executor.check_capacity("live")
+    except ExecutorSaturatedError as e:
+        await websocket.send_text(json.dumps({
+            "type": "error",
+            "data": {"error": str(e), "retry_after": e.retry_after}
+        }))
+        await websocket.close(code=1013)  # Try again later
+        return
+
+    options = {"encoding": encoding, "sample_rate": sample_rate, "channels": channels, "language": language}
+    await run_live_meeting(websocket, get_firestore_client(), project_name, options)
+
+
 @router.get("/api-key-status")
 def check_deepgram_api_key():
     """Check if Deepgram API key is configured."""
-    try:
-        deepgram_service._ensure_client()
+    if deepgram_service.has_api_key():
         return {"configured": True}
-    except ValueError:
-        return {"configured": False, "message": "DEEPGRAM_API_KEY not found in environment variables"}
+    return {"configured": False, "message": "DEEPGRAM_API_KEY not found in environment variables"}
+
+
+@router.get("/llm-cache")
+def get_llm_cache_stats():
+    """LLM response cache metrics: hit rate, entries and size."""
+    return llm_cache.stats()
+
+
+@router.delete("/llm-cache")
+def clear_llm_cache():
+    """Drop every cached LLM response."""
+    return {"removed": llm_cache.clear()}
+
+
+@router.get("/llm-limiter")
+def get_llm_limiter_stats():
+    """NVIDIA rate limiter metrics: queue depth, wait times, concurrency window, retries."""
+    return nvidia_limiter.stats()
+
+
+@router.get("/llm-usage")
+def get_llm_token_usage():
+    """Prompt/completion tokens per stage and how much of max_tokens was used."""
+    return token_usage.stats()
+
+
+@router.get("/analysis-parsing")
+def get_analysis_parse_stats():
+    """How often Agent 1 output parsed cleanly, needed repair, or was unusable."""
+    return parse_stats.stats()
+
+
+@router.get("/dedup")
+def get_dedup_stats():
+    """Duplicate ticket detection: indexed tickets, lookups and duplicates found."""
+    return ticket_dedup.stats()
+
+
+@router.get("/executor")
+def get_executor_stats():
+    """Shared blocking-work executor: active threads, queue depth, queue wait and rejections."""
+    return blocking_executor.stats()
+
+
+@router.get("/coalescing")
+def get_coalescing_stats():
+    """How many meeting/Mermaid requests were served by an identical in-flight or recent run."""
+    return {"meeting": meeting_flight.stats(), "mermaid": mermaid_flight.stats()}
 
 
 @router.post("/process-meeting")
@@ -99,12 +268,11 @@ async def process_meeting(request: ProcessMeetingRequest):
     Process meeting transcript through 3-agent workflow:
     1. Analyze transcript with Nemotron to extract tickets
     2. Create tickets in Firestore
-    3. Generate Mermaid diagram
+    3. Generate Mermaid diagram (locally, or with Nemotron if stylised_diagram)
 
     Returns created tickets, diagram, and summary.
     """
     import asyncio
-    from concurrent.futures import ThreadPoolExecutor
 
     try:
         print(f"[Voice API] Processing meeting transcript ({len(request.transcript)} chars)")
@@ -119,19 +287,15 @@ async def process_meeting(request: ProcessMeetingRequest):
         # Get Firestore client
         db = get_firestore_client()
 
-        # Run agent workflow in thread pool to prevent blocking
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as pool:
-            result = await asyncio.wait_for(
-                loop.run_in_executor(
-                    pool,
-                    agent_service.process_meeting_transcript,
-                    db,
-                    request.transcript,
-                    request.project_name
-                ),
-                timeout=300.0  # 5 minute timeout for complete workflow
-            )
+        # Run agent workflow on the shared executor to prevent blocking
+        result = await blocking_executor.run(
+            agent_service.process_meeting_transcript,
+            db,
+            request.transcript,
+            request.project_name,
+            request.stylised_diagram,
+            timeout=300.0  # 5 minute timeout for complete workflow
+        )
 
         print(f"[Voice API] Workflow result: {result.get('success')}")
 
@@ -151,9 +315,12 @@ async def process_meeting(request: ProcessMeetingRequest):
             "project": data["project"],
             "diagram": data.get("diagram"),
             "summary": data["summary"],
-            "ticket_count": data["ticket_count"]
+            "ticket_count": data["ticket_count"],
+            "updated_count": data["updated_count"]
         }
 
+    except ExecutorSaturatedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except asyncio.TimeoutError:
         raise HTTPException(
             status_code=504,
@@ -169,3 +336,162 @@ async def process_meeting(request: ProcessMeetingRequest):
             detail=f"Failed to process meeting: {str(e)}"
         )
 
+
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@router.post("/process-meeting/stream")
+def process_meeting_stream(request: ProcessMeetingRequest):
+    """
+    Process a meeting transcript, streaming results as Server-Sent Events.
+
+    Tickets are created while the model is still generating, and each one
+    is sent as soon as it exists instead of after the whole workflow.
+
+    Events: project, ticket, ticket_updated, diagram, done, error
+    """
+    print(f"[Voice API] Streaming meeting processing ({len(request.transcript)} chars)")
+
+    # Validate transcript
+    if not request.transcript or len(request.transcript.strip()) < 10:
+        raise HTTPException(
+            status_code=400,
+            detail="Transcript is too short. Please provide a meaningful meeting transcript."
+        )
+
+    db = get_firestore_client()
+
+    def event_stream():
+        # Sync generator: Starlette iterates it in a worker thread
+        for message in agent_service.process_meeting_transcript_stream(
+            db, request.transcript, request.project_name, request.stylised_diagram
+        ):
+            yield _sse(message["event"], message["data"])
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/jobs", status_code=202)
+def create_meeting_job(request: ProcessMeetingRequest):
+    """
+    Queue a meeting transcript for background processing.
+
+    Returns the job immediately; follow it with GET /jobs/{job_id} or the
+    /jobs/{job_id}/events SSE stream.
+    """
+    if not request.transcript or len(request.transcript.strip()) < 10:
+        raise HTTPException(
+            status_code=400,
+            detail="Transcript is too short. Please provide a meaningful meeting transcript."
+        )
+
+    db = get_firestore_client()
+    try:
+        return job_service.submit(db, request.transcript, request.project_name, request.stylised_diagram)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/jobs/{job_id}")
+def get_meeting_job(job_id: str):
+    """Get a meeting job's status, stage timings and (when done) result."""
+    job = job_service.get_job(get_firestore_client(), job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/events")
+def stream_meeting_job(job_id: str):
+    """
+    Follow a meeting job as Server-Sent Events.
+
+    Sends a 'job' event with the full state on every change and ends once
+    the job is done or failed.
+    """
+    db = get_firestore_client()
+    if job_service.get_job(db, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    def event_stream():
+        for job in job_service.watch(db, job_id):
+            if job.get("keepalive"):
+                yield ": keepalive\n\n"
+            else:
+                yield _sse("job", job)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/batches", status_code=202)
+def create_batch(request: BatchRequest):
+    """
+    Run many transcripts through the workflow in the background.
+
+    Results are written as NDJSON (GET /batches/{batch_id}/results).
+    Submitting again with the same batch_id skips meetings that already
+    have a result, so an interrupted batch resumes.
+    """
+    sources = [s for s in (request.directory, request.manifest, request.transcripts) if s]
+    if len(sources) != 1:
+        raise HTTPException(status_code=400, detail="Provide exactly one of directory, manifest or transcripts")
+
+    try:
+        if request.transcripts:
+            items = [item.model_dump() for item in request.transcripts]
+            if len({item["id"] for item in items}) != len(items):
+                raise ValueError("Transcript IDs must be unique")
+        else:
+            items = load_items(batch_service.resolve_input(request.directory or request.manifest))
+        if not items:
+            raise ValueError("No transcripts found")
+        return batch_service.start(
+            get_firestore_client(), items, request.batch_id, request.workers, request.retry_failed
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/batches")
+def list_batches():
+    """Batches started by this process, with progress and throughput."""
+    return {"batches": batch_service.list_batches()}
+
+
+@router.get("/batches/{batch_id}")
+def get_batch(batch_id: str):
+    """Progress of a batch: counts, tickets created and meetings per minute."""
+    run = batch_service.get(batch_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return run.stats()
+
+
+@router.get("/batches/{batch_id}/results")
+def get_batch_results(batch_id: str):
+    """The batch's NDJSON results (one record per processed meeting)."""
+    if not is_valid_batch_id(batch_id) or not batch_service.output_path(batch_id).exists():
+        raise HTTPException(status_code=404, detail="Batch results not found")
+    return FileResponse(batch_service.output_path(batch_id), media_type="application/x-ndjson", filename=f"{batch_id}.ndjson")
+
+
+@router.delete("/batches/{batch_id}")
+def cancel_batch(batch_id: str):
+    """Stop a batch after the meetings in progress; resubmit it to resume."""
+    run = batch_service.get(batch_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    run.cancel()
+    return run.stats()
@@ -8,26 +8,60 @@ This service implements a 3-agent workflow:
 """
 
 import json
+import os
 import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Generator, Iterable, Iterator, List, Optional, Set, Tuple
 from firebase_admin import firestore
-from difflib import SequenceMatcher
 
-from app.services.nemotron_service import get_nemotron_client
+from app.services.nemotron_service import chat_completion_details, create_chat_completion, stream_chat_completion
+from app.services.token_budget import (
+    ANALYSIS_CHUNK_TOKENS,
+    ANALYSIS_MAX_TOKENS,
+    analysis_max_tokens,
+    chars_per_token,
+    count_message_tokens,
+    count_tokens,
+    diagram_max_tokens,
+    fit_to_tokens,
+    prompt_budget,
+)
+from app.services.json_stream import TicketStreamParser, parse_analysis, parse_stats, CLEAN, REPAIRED, FAILED
+from app.services.transcript_chunker import split_transcript, TicketMerger
+from app.services.mermaid_renderer import render_ticket_diagram
+from app.services.single_flight import meeting_flight, request_key
+from app.services import metrics
 from app.services.ticket_service import ticket_service
 from app.services.user_service import user_service
+from app.services.user_index import user_index
+from app.services.ticket_dedup import ticket_dedup
 from app.services.project_service import project_service
 from app.services.label_service import label_service
 from app.models.schemas import (
     TicketCreate,
+    TicketUpdate,
     UserCreate,
     ProjectCreate,
     LabelCreate,
+    MeetingAnalysisSpec,
     Priority,
     TicketStatus
 )
 
+# Long transcripts are analyzed in chunks of token_budget.ANALYSIS_CHUNK_TOKENS,
+# overlapping by this many characters
+CHUNK_OVERLAP_CHARS = int(os.getenv("TRANSCRIPT_CHUNK_OVERLAP", "1000"))
+# Maximum chunks analyzed at the same time
+ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "4"))
+# Guided decoding schema for Agent 1 output
+ANALYSIS_SCHEMA = MeetingAnalysisSpec.model_json_schema()
+# Most urgent first; a duplicate only ever raises an existing ticket's priority
+PRIORITY_RANK = {p: rank for rank, p in enumerate(
+    (Priority.urgent, Priority.high, Priority.medium, Priority.low, Priority.none)
+)}
+
 
 class AgentService:
     """Service for multi-agent meeting analysis workflow."""
@@ -37,18 +71,8 @@ class AgentService:
     # ========================================================================
 
     @staticmethod
-    def analyze_meeting(transcript: str) -> Dict[str, Any]:
-        """
-        Agent 1: Analyze meeting transcript and extract ticket specifications.
-
-        Args:
-            transcript: The meeting transcript text
-
-        Returns:
-            Dict with 'success' and either 'data' (ticket specs) or 'error'
-        """
-        print("[Agent 1] Analyzing meeting transcript...")
-
+    def _analysis_messages(transcript: str, part: Optional[Tuple[int, int]] = None) -> List[Dict[str, str]]:
+        """Build the Agent 1 chat messages for a transcript (or one part of it)."""
         system_prompt = """You are an expert project manager analyzing meeting transcripts.
 Extract actionable tickets from the meeting discussion.
 
@@ -75,6 +99,7 @@ Important rules:
 - Parse dates into YYYY-MM-DD format
 - For dependencies, use "ticket:N" format where N is the index
 - If no clear information, use null
+- Write project_name before the tickets array
 - Return valid JSON only"""
 
         user_prompt = f"""Analyze this meeting transcript and extract actionable tickets:
@@ -83,41 +108,135 @@ Important rules:
 
 Return the JSON object with project_name and tickets array."""
 
-        try:
-            # Call Nemotron using OpenAI SDK
-            client = get_nemotron_client()
-
-            response = client.chat.completions.create(
-                model="meta/llama-3.1-70b-instruct",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,  # Lower temperature for more structured output
-                max_tokens=4096
+        if part is not None:
+            user_prompt = (
+                f"This is part {part[0] + 1} of {part[1]} of a longer meeting; it may overlap "
+                f"with neighbouring parts. Dependencies may only reference tickets in this part.\n\n"
+                + user_prompt
             )
 
-            content = response.choices[0].message.content.strip()
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
 
-            # Remove markdown code blocks if present
-            if content.startswith("```"):
-                lines = content.split("\n")
-                content = "\n".join(lines[1:-1]) if len(lines) > 2 else content
-                if content.startswith("json"):
-                    content = content[4:].strip()
+    @staticmethod
+    @metrics.timed_stage("analysis")
+    def analyze_meeting(transcript: str) -> Dict[str, Any]:
+        """
+        Agent 1: Analyze meeting transcript and extract ticket specifications.
 
-            ticket_specs = json.loads(content)
+        Transcripts longer than ANALYSIS_CHUNK_TOKENS are split into
+        overlapping chunks that are analyzed concurrently and merged
+        (map-reduce).
 
-            # Validate structure
-            if "project_name" not in ticket_specs or "tickets" not in ticket_specs:
-                raise ValueError("Missing required fields: project_name or tickets")
-            
-            # Ensure tickets is a list
-            if not isinstance(ticket_specs.get("tickets"), list):
-                raise ValueError("tickets must be a list")
+        Args:
+            transcript: The meeting transcript text
+
+        Returns:
+            Dict with 'success' and either 'data' (ticket specs) or 'error'
+        """
+        chunks = AgentService._split_for_analysis(transcript)
+        if len(chunks) == 1:
+            return AgentService._analyze_transcript(transcript)
+
+        merger = TicketMerger()
+        results = dict(AgentService._analyze_chunks(chunks))
+        failed = [idx for idx, result in results.items() if not result["success"]]
+        if len(failed) == len(chunks):
+            return {
+                "success": False,
+                "error": f"All {len(chunks)} transcript chunks failed: {results[0]['error']}",
+                "reason": results[0].get("reason")
+            }
+        if failed:
+            print(f"[Agent 1] Warning: {len(failed)}/{len(chunks)} chunks failed, continuing with the rest")
+
+        # Merge in transcript order so the result is deterministic
+        for idx in sorted(results):
+            if results[idx]["success"]:
+                merger.add_chunk(idx, results[idx]["data"])
+
+        ticket_specs = merger.result()
+        print(f"[Agent 1] Merged {len(ticket_specs['tickets'])} tickets from {len(chunks)} chunks")
+        return {
+            "success": True,
+            "data": ticket_specs
+        }
+
+    @staticmethod
+    def _split_for_analysis(transcript: str) -> List[str]:
+        """Split a transcript into chunks of about ANALYSIS_CHUNK_TOKENS tokens."""
+        if count_tokens(transcript) <= ANALYSIS_CHUNK_TOKENS:
+            return [transcript]
+        max_chars = int(ANALYSIS_CHUNK_TOKENS * chars_per_token(transcript))
+        return split_transcript(transcript, max_chars, min(CHUNK_OVERLAP_CHARS, max_chars // 4))
+
+    @staticmethod
+    def _fit_analysis_input(transcript: str, max_tokens: int, part: Optional[Tuple[int, int]] = None) -> str:
+        """Compact or cut a transcript so prompt + completion fit the context window."""
+        fixed = count_message_tokens(AgentService._analysis_messages("", part))
+        fitted = fit_to_tokens(transcript, prompt_budget(max_tokens, reserved=fixed))
+        if len(fitted) < len(transcript):
+            print(f"[Agent 1] Transcript compacted from {len(transcript)} to {len(fitted)} characters to fit the context")
+        return fitted
+
+    @staticmethod
+    def _analyze_chunks(chunks: List[str]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Analyze chunks concurrently, yielding (chunk index, result) as each finishes."""
+        print(f"[Agent 1] Analyzing {len(chunks)} transcript chunks (up to {ANALYSIS_CONCURRENCY} at a time)...")
+        with ThreadPoolExecutor(max_workers=max(1, ANALYSIS_CONCURRENCY)) as pool:
+            futures = {
+                pool.submit(AgentService._analyze_transcript, chunk, (idx, len(chunks))): idx
+                for idx, chunk in enumerate(chunks)
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    @staticmethod
+    def _analyze_transcript(transcript: str, part: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """Run Agent 1 on a transcript (or one chunk of it) with a single prompt."""
+        label = f" (part {part[0] + 1}/{part[1]})" if part else ""
+        print(f"[Agent 1] Analyzing meeting transcript{label}...")
+
+        try:
+            # Size the completion budget from the transcript
+            max_tokens = analysis_max_tokens(count_tokens(transcript))
+            transcript = AgentService._fit_analysis_input(transcript, max_tokens, part)
+
+            # Call Nemotron (responses are cached by request content)
+            result = chat_completion_details(
+                messages=AgentService._analysis_messages(transcript, part),
+                temperature=0.3,  # Lower temperature for more structured output
+                max_tokens=max_tokens,
+                stage="analysis",
+                json_schema=ANALYSIS_SCHEMA
+            )
+            if result["finish_reason"] == "length" and max_tokens < ANALYSIS_MAX_TOKENS:
+                print(f"[Agent 1] Output truncated at {max_tokens} tokens, retrying with {ANALYSIS_MAX_TOKENS}")
+                result = chat_completion_details(
+                    messages=AgentService._analysis_messages(transcript, part),
+                    temperature=0.3,
+                    max_tokens=ANALYSIS_MAX_TOKENS,
+                    stage="analysis",
+                    json_schema=ANALYSIS_SCHEMA
+                )
+            content = result["content"].strip()
+
+            # Strict parse, or repair / salvage the valid prefix
+            ticket_specs, outcome = parse_analysis(content)
+            if outcome == FAILED:
+                print(f"[Agent 1] Raw content: {content[:500]}")
+                return {
+                    "success": False,
+                    "error": "Failed to parse AI response as JSON: no project_name or tickets found",
+                    "reason": "unparseable_output"
+                }
+            if outcome == REPAIRED:
+                print(f"[Agent 1] Repaired malformed or truncated response{label}")
 
             ticket_count = len(ticket_specs['tickets'])
-            print(f"[Agent 1] Extracted {ticket_count} tickets from meeting")
+            print(f"[Agent 1] Extracted {ticket_count} tickets from meeting{label}")
             
             if ticket_count == 0:
                 print("[Agent 1] Warning: No tickets extracted from meeting transcript")
@@ -127,46 +246,177 @@ Return the JSON object with project_name and tickets array."""
                 "data": ticket_specs
             }
 
-        except json.JSONDecodeError as e:
-            print(f"[Agent 1] JSON parse error: {str(e)}")
-            print(f"[Agent 1] Raw content: {content[:500] if 'content' in locals() else 'N/A'}")
-            return {
-                "success": False,
-                "error": f"Failed to parse AI response as JSON: {str(e)}"
-            }
         except Exception as e:
             print(f"[Agent 1] Error: {str(e)}")
             import traceback
             traceback.print_exc()
             return {
                 "success": False,
-                "error": f"Error processing ticket specifications: {str(e)}"
+                "error": f"Error processing ticket specifications: {str(e)}",
+                "reason": type(e).__name__
             }
 
-    # ========================================================================
-    # AGENT 2: TICKET CREATOR (PYTHON LOGIC)
-    # ========================================================================
+    @staticmethod
+    def analyze_meeting_stream(transcript: str) -> Iterator[Tuple[str, Any]]:
+        """
+        Agent 1 in streaming mode: yield results while the model is generating.
+
+        The completion is streamed and fed through an incremental JSON parser,
+        so each ticket is available as soon as its object closes instead of
+        after the whole response arrives.
+
+        Args:
+            transcript: The meeting transcript text
+
+        Yields:
+            ("project_name", str), then ("ticket", spec dict) per ticket, and
+            finally ("done", ticket specs dict)
+
+        If the output is cut off at the sized max_tokens it is generated
+        again with ANALYSIS_MAX_TOKENS, like the non-streaming path. The
+        retry is merged with the tickets already yielded: only new tickets
+        follow, and ("ticket_updated", (index, spec)) for yielded tickets
+        the retry completed.
+
+        Long transcripts are analyzed in concurrent chunks instead; tickets
+        are then yielded as each chunk is merged, and ("ticket_updated",
+        (index, spec)) when a later chunk adds details or dependencies to a
+        ticket yielded before.
+
+        Raises:
+            ValueError: If the response contains no usable JSON object
+        """
+        chunks = AgentService._split_for_analysis(transcript)
+        if len(chunks) > 1:
+            yield from AgentService._stream_chunks(chunks)
+            return
+
+        print("[Agent 1] Analyzing meeting transcript (streaming)...")
+
+        max_tokens = analysis_max_tokens(count_tokens(transcript))
+        transcript = AgentService._fit_analysis_input(transcript, max_tokens)
+
+        messages = AgentService._analysis_messages(transcript)
+        parser = TicketStreamParser(validate=True)
+        finish_reason = yield from AgentService._feed_stream(parser, messages, max_tokens)
+
+        sent = None
+        if finish_reason == "length" and max_tokens < ANALYSIS_MAX_TOKENS:
+            print(f"[Agent 1] Output truncated at {max_tokens} tokens, retrying with {ANALYSIS_MAX_TOKENS}")
+            sent, parser = parser, TicketStreamParser(validate=True)
+            # Not yielded as it arrives: merged with the tickets already sent below
+            for _ in AgentService._feed_stream(parser, messages, ANALYSIS_MAX_TOKENS):
+                pass
+            if parser.project_name is None and not parser.tickets:
+                print("[Agent 1] Warning: retry returned nothing usable, keeping the truncated result")
+                parser, sent = sent, None
+
+        if parser.project_name is None and not parser.tickets:
+            parse_stats.record(FAILED)
+            print(f"[Agent 1] Raw content: {parser.buffer[:500]}")
+            raise ValueError("Failed to parse AI response as JSON: no project_name or tickets found")
+        if not parser.complete:
+            print("[Agent 1] Warning: response ended before the JSON object closed")
+        if parser.invalid_tickets:
+            print(f"[Agent 1] Warning: skipped {parser.invalid_tickets} malformed ticket(s)")
+        repaired = not parser.complete or parser.invalid_tickets
+        parse_stats.record(REPAIRED if repaired else CLEAN, dropped=parser.invalid_tickets)
+
+        if sent is None:
+            print(f"[Agent 1] Extracted {len(parser.tickets)} tickets from meeting")
+            yield "done", parser.result()
+            return
+
+        # The retry repeats the tickets already sent: merge it like a second chunk
+        merger = TicketMerger()
+        merger.add_chunk(0, sent.result())
+        new_tickets = merger.add_chunk(1, parser.result())
+        if sent.project_name is None and merger.project_name:
+            yield "project_name", merger.project_name
+        for ticket_idx in merger.updated:
+            yield "ticket_updated", (ticket_idx, merger.tickets[ticket_idx])
+        for ticket in new_tickets:
+            yield "ticket", ticket
+        print(f"[Agent 1] Extracted {len(merger.tickets)} tickets from meeting ({len(new_tickets)} after the retry)")
+        yield "done", merger.result()
 
     @staticmethod
-    def _fuzzy_match_name(name: str, candidates: List[Dict]) -> Optional[Dict]:
-        """Fuzzy match a name against a list of candidates."""
-        if not name or not candidates:
-            return None
+    def _feed_stream(
+        parser: TicketStreamParser, messages: List[Dict[str, str]], max_tokens: int
+    ) -> Generator[Tuple[str, Any], None, Optional[str]]:
+        """Stream one analysis through parser, yielding its events; returns the finish_reason."""
+        stream = stream_chat_completion(
+            messages=messages,
+            temperature=0.3,
+            max_tokens=max_tokens,
+            stage="analysis",
+            json_schema=ANALYSIS_SCHEMA
+        )
+        while True:
+            try:
+                content = next(stream)
+            except StopIteration as stop:
+                return stop.value
+            yield from parser.feed(content)
 
-        name_lower = name.lower().strip()
-        best_match = None
-        best_ratio = 0.0
+    @staticmethod
+    def _stream_chunks(chunks: List[str]) -> Iterator[Tuple[str, Any]]:
+        """
+        Streaming counterpart of the map-reduce path.
 
-        for candidate in candidates:
-            candidate_name = candidate.get("name", "").lower().strip()
-            ratio = SequenceMatcher(None, name_lower, candidate_name).ratio()
+        Chunks are analyzed concurrently but merged in transcript order (a
+        finished chunk waits for the ones before it), so the ticket order
+        and merges match analyze_meeting.
+        """
+        merger = TicketMerger()
+        errors = []
+        project_name_sent = False
+        finished: Dict[int, Dict[str, Any]] = {}
+        next_idx = 0
+
+        for idx, result in AgentService._analyze_chunks(chunks):
+            finished[idx] = result
+            while next_idx in finished:
+                result = finished.pop(next_idx)
+                if not result["success"]:
+                    errors.append(result["error"])
+                else:
+                    new_tickets = merger.add_chunk(next_idx, result["data"])
+                    if not project_name_sent and merger.project_name:
+                        project_name_sent = True
+                        yield "project_name", merger.project_name
+                    # Duplicates from this chunk completed tickets that were already sent
+                    for ticket_idx in merger.updated:
+                        yield "ticket_updated", (ticket_idx, merger.tickets[ticket_idx])
+                    for ticket in new_tickets:
+                        yield "ticket", ticket
+                next_idx += 1
+
+        if len(errors) == len(chunks):
+            raise ValueError(f"All {len(chunks)} transcript chunks failed: {errors[0]}")
+        if errors:
+            print(f"[Agent 1] Warning: {len(errors)}/{len(chunks)} chunks failed, continuing with the rest")
+
+        print(f"[Agent 1] Merged {len(merger.tickets)} tickets from {len(chunks)} chunks")
+        yield "done", merger.result()
 
-            if ratio > best_ratio:
-                best_ratio = ratio
-                best_match = candidate
+    # ========================================================================
+    # AGENT 2: TICKET CREATOR (PYTHON LOGIC)
+    # ========================================================================
 
-        # Require at least 60% similarity
-        return best_match if best_ratio >= 0.6 else None
+    @staticmethod
+    def _parse_dependency_indices(dependencies: Any, own_index: int) -> List[int]:
+        """Parse "ticket:N" references into unique ticket indices (excluding itself)."""
+        indices = []
+        for dep in dependencies or []:
+            if isinstance(dep, str) and dep.startswith("ticket:"):
+                try:
+                    dep_idx = int(dep.split(":")[1])
+                except (ValueError, IndexError):
+                    continue
+                if dep_idx != own_index and dep_idx >= 0 and dep_idx not in indices:
+                    indices.append(dep_idx)
+        return indices
 
     @staticmethod
     def _normalize_priority(priority_str: Optional[str]) -> Priority:
@@ -219,6 +469,7 @@ Return the JSON object with project_name and tickets array."""
         return f"#{random.randint(0, 0xFFFFFF):06x}"
 
     @staticmethod
+    @metrics.timed_stage("creation")
     def create_tickets_from_specs(
         db: firestore.Client,
         ticket_specs: Dict[str, Any],
@@ -233,128 +484,33 @@ Return the JSON object with project_name and tickets array."""
             project_name: Override project name
 
         Returns:
-            Dict with 'success' and either 'data' (created tickets) or 'error'
+            Dict with 'success' and either 'data' (the meeting's tickets, new
+            and updated, with created_count and updated_count) or 'error'
         """
         print("[Agent 2] Creating tickets from specifications...")
 
         try:
-            # Use provided project name or extract from specs
-            proj_name = project_name or ticket_specs.get("project_name")
-            if not proj_name:
-                proj_name = "General"
-
-            # Get or create project
-            project = project_service.get_project_by_name(db, proj_name)
-            if not project:
-                project = project_service.get_project_by_identifier(db, proj_name)
-
-            if not project:
-                print(f"[Agent 2] Creating new project: {proj_name}")
-                project = project_service.create_project(db, ProjectCreate(
-                    name=proj_name,
-                    identifier=proj_name[:10].upper().replace(" ", ""),
-                    description=f"Auto-created from meeting analysis"
-                ))
-
-            project_id = project["id"]
-            print(f"[Agent 2] Using project: {proj_name} (ID: {project_id})")
+            session = TicketCreationSession(db, project_name or ticket_specs.get("project_name"))
 
-            # Get all users for fuzzy matching
-            all_users = user_service.get_all_users(db)
+            specs = ticket_specs.get("tickets", [])
+            for idx, spec in enumerate(specs):
+                print(f"[Agent 2] Processing ticket {idx + 1}/{len(specs)}: {spec.get('title', 'Untitled')}")
+                session.add_ticket(spec)
 
-            # Get existing labels for this project
-            existing_labels = label_service.get_all_labels(db, project_id=project_id)
-            label_map = {label["name"].lower(): label for label in existing_labels}
+            session.finish()
+            created_tickets = session.created_tickets
 
-            # Process each ticket spec
-            created_tickets = []
-            ticket_id_map = {}  # Map index to created ticket ID
-
-            for idx, spec in enumerate(ticket_specs.get("tickets", [])):
-                print(f"[Agent 2] Processing ticket {idx + 1}/{len(ticket_specs['tickets'])}: {spec.get('title', 'Untitled')}")
-
-                # Handle assignee
-                assignee_id = None
-                assignee_name = spec.get("assignee_name")
-                if assignee_name:
-                    matched_user = AgentService._fuzzy_match_name(assignee_name, all_users)
-                    if matched_user:
-                        assignee_id = matched_user["id"]
-                        print(f"[Agent 2]   Matched assignee: {assignee_name} -> {matched_user['name']}")
-                    else:
-                        print(f"[Agent 2]   Creating new user: {assignee_name}")
-                        new_user = user_service.create_user(db, UserCreate(
-                            name=assignee_name,
-                            color=AgentService._generate_random_color()
-                        ))
-                        assignee_id = new_user["id"]
-                        all_users.append(new_user)
-
-                # Handle labels
-                label_ids = []
-                for label_name in spec.get("labels", []):
-                    label_key = label_name.lower().strip()
-                    if label_key in label_map:
-                        label_ids.append(label_map[label_key]["id"])
-                    else:
-                        print(f"[Agent 2]   Creating new label: {label_name}")
-                        new_label = label_service.create_label(db, LabelCreate(
-                            name=label_name,
-                            color=AgentService._generate_random_color(),
-                            project_id=project_id
-                        ))
-                        label_ids.append(new_label["id"])
-                        label_map[label_key] = new_label
-
-                # Handle dependencies (parent ticket)
-                parent_ticket_id = None
-                dependencies = spec.get("dependencies", [])
-                if dependencies:
-                    for dep in dependencies:
-                        if isinstance(dep, str) and dep.startswith("ticket:"):
-                            try:
-                                dep_idx = int(dep.split(":")[1])
-                                if dep_idx in ticket_id_map:
-                                    parent_ticket_id = ticket_id_map[dep_idx]
-                                    print(f"[Agent 2]   Set parent: ticket at index {dep_idx}")
-                                    break
-                            except (ValueError, IndexError):
-                                pass
-
-                # Normalize priority
-                priority = AgentService._normalize_priority(spec.get("priority"))
-
-                # Parse deadline
-                deadline = AgentService._parse_date(spec.get("deadline"))
-
-                # Create ticket
-                ticket_data = TicketCreate(
-                    title=spec.get("title", "Untitled Task"),
-                    summary=spec.get("description"),
-                    priority=priority,
-                    estimated_hours=spec.get("estimated_hours"),
-                    assignee_id=assignee_id,
-                    end_date=deadline,
-                    project_id=project_id,
-                    parent_ticket_id=parent_ticket_id,
-                    label_ids=label_ids,
-                    status=TicketStatus.open
-                )
-
-                created_ticket = ticket_service.create_ticket(db, ticket_data)
-                created_tickets.append(created_ticket)
-                ticket_id_map[idx] = created_ticket["id"]
-
-                print(f"[Agent 2]   ✓ Created ticket: {created_ticket['id']}")
-
-            print(f"[Agent 2] Successfully created {len(created_tickets)} tickets")
+            print(f"[Agent 2] {session.summary()}")
 
             return {
                 "success": True,
                 "data": {
                     "tickets": created_tickets,
-                    "project": project,
-                    "summary": f"Created {len(created_tickets)} ticket(s) in project '{proj_name}'"
+                    "created_count": session.created_count,
+                    "updated_count": session.updated_count,
+                    "project": session.project,
+                    "summary": session.summary(),
+                    "assignee_names": session.assignee_names()
                 }
             }
 
@@ -362,7 +518,8 @@ Return the JSON object with project_name and tickets array."""
             print(f"[Agent 2] Validation error: {str(e)}")
             return {
                 "success": False,
-                "error": f"Validation error: {str(e)}"
+                "error": f"Validation error: {str(e)}",
+                "reason": "validation"
             }
         except Exception as e:
             print(f"[Agent 2] Error creating tickets: {str(e)}")
@@ -370,7 +527,8 @@ Return the JSON object with project_name and tickets array."""
             traceback.print_exc()
             return {
                 "success": False,
-                "error": f"Error creating tickets: {str(e)}"
+                "error": f"Error creating tickets: {str(e)}",
+                "reason": type(e).__name__
             }
 
     # ========================================================================
@@ -378,18 +536,56 @@ Return the JSON object with project_name and tickets array."""
     # ========================================================================
 
     @staticmethod
-    def generate_diagram(tickets: List[Dict[str, Any]], project_name: str) -> Dict[str, Any]:
+    @metrics.timed_stage("diagram")
+    def generate_diagram(
+        tickets: List[Dict[str, Any]],
+        project_name: str,
+        stylised: bool = False,
+        assignee_names: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
         """
         Agent 3: Generate Mermaid diagram from created tickets.
 
+        By default the diagram is rendered locally (mermaid_renderer), which
+        is deterministic and needs no model call. stylised=True asks
+        Nemotron to draw it instead.
+
         Args:
             tickets: List of created tickets
             project_name: Project name
+            stylised: Generate the diagram with the LLM
+            assignee_names: User ID -> name, for per-assignee subgraphs
 
         Returns:
             Dict with 'success' and either 'diagram' (Mermaid syntax) or 'error'
         """
-        print(f"[Agent 3] Generating diagram for {len(tickets)} tickets...")
+        if not stylised:
+            try:
+                if any(ticket.get("module_id") for ticket in tickets):
+                    group_by = "module"
+                elif any(ticket.get("assignee_id") for ticket in tickets):
+                    group_by = "assignee"
+                else:
+                    group_by = None
+                diagram = render_ticket_diagram(
+                    tickets,
+                    group_by=group_by,
+                    group_names=assignee_names if group_by == "assignee" else None
+                )
+                print(f"[Agent 3] Rendered diagram locally ({len(diagram)} characters)")
+                return {
+                    "success": True,
+                    "diagram": diagram
+                }
+            except Exception as e:
+                print(f"[Agent 3] Error rendering diagram: {str(e)}")
+                return {
+                    "success": False,
+                    "error": f"Error rendering diagram: {str(e)}",
+                    "reason": type(e).__name__
+                }
+
+        print(f"[Agent 3] Generating stylised diagram for {len(tickets)} tickets...")
 
         # Prepare ticket summary
         ticket_summary = []
@@ -401,6 +597,7 @@ Return the JSON object with project_name and tickets array."""
                 "priority": ticket.get("priority"),
                 "assignee_id": ticket.get("assignee_id"),
                 "parent_ticket_id": ticket.get("parent_ticket_id"),
+                "dependency_ids": ticket.get("dependency_ids", []),
                 "estimated_hours": ticket.get("estimated_hours")
             }
             ticket_summary.append(summary)
@@ -412,7 +609,7 @@ Return ONLY the Mermaid diagram code (no markdown code blocks, no explanations).
 
 Requirements:
 - Use flowchart format (graph TD or graph LR)
-- Show ticket dependencies (parent-child relationships)
+- Show ticket dependencies (an arrow from each id in dependency_ids to the ticket)
 - Color-code by priority: urgent=red, high=orange, medium=yellow, low=green, none=gray
 - Include ticket titles (abbreviated if too long)
 - Make it visually clear and readable
@@ -432,20 +629,16 @@ graph TD
 Generate the Mermaid diagram code."""
 
         try:
-            # Call Nemotron using OpenAI SDK
-            client = get_nemotron_client()
-
-            response = client.chat.completions.create(
-                model="meta/llama-3.1-70b-instruct",
+            # Call Nemotron (responses are cached by request content)
+            diagram = create_chat_completion(
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
                 temperature=0.5,
-                max_tokens=2048
-            )
-
-            diagram = response.choices[0].message.content.strip()
+                max_tokens=diagram_max_tokens(len(tickets)),
+                stage="diagram"
+            ).strip()
 
             # Remove markdown code blocks if present
             if diagram.startswith("```"):
@@ -467,7 +660,8 @@ Generate the Mermaid diagram code."""
             traceback.print_exc()
             return {
                 "success": False,
-                "error": f"Error generating diagram: {str(e)}"
+                "error": f"Error generating diagram: {str(e)}",
+                "reason": type(e).__name__
             }
 
     # ========================================================================
@@ -478,21 +672,54 @@ Generate the Mermaid diagram code."""
     def process_meeting_transcript(
         db: firestore.Client,
         transcript: str,
-        project_name: Optional[str] = None
+        project_name: Optional[str] = None,
+        stylised_diagram: bool = False
     ) -> Dict[str, Any]:
         """
         Complete 3-agent workflow: Analyze meeting → Create tickets → Generate diagram.
 
+        Identical requests (same normalized transcript and options) that
+        arrive while one is running, or shortly after it succeeded, share its
+        result instead of creating the tickets again.
+
         Args:
             db: Firestore client
             transcript: Meeting transcript text
             project_name: Optional override for project name
+            stylised_diagram: Draw the diagram with the LLM instead of locally
 
         Returns:
             Dict with 'success' and either complete results or 'error'
         """
-        print(f"[AgentService] Starting complete workflow...")
+        key = request_key("process_meeting", transcript, (project_name or "").casefold(), stylised_diagram)
+        return meeting_flight.do(
+            key,
+            AgentService._process_meeting_transcript,
+            db, transcript, project_name, stylised_diagram,
+            keep=lambda result: result["success"]
+        )
 
+    @staticmethod
+    def _process_meeting_transcript(
+        db: firestore.Client,
+        transcript: str,
+        project_name: Optional[str],
+        stylised_diagram: bool
+    ) -> Dict[str, Any]:
+        """Run the 3-agent workflow once (see process_meeting_transcript)."""
+        with metrics.meeting("sync") as trace:
+            print(f"[AgentService] Starting complete workflow (trace {trace.trace_id})...")
+            result = AgentService._run_workflow(db, transcript, project_name, stylised_diagram)
+            trace.finish(result["success"], result["data"]["ticket_count"] if result["success"] else None)
+            return result
+
+    @staticmethod
+    def _run_workflow(
+        db: firestore.Client,
+        transcript: str,
+        project_name: Optional[str],
+        stylised_diagram: bool
+    ) -> Dict[str, Any]:
         # Agent 1: Analyze meeting
         analysis_result = AgentService.analyze_meeting(transcript)
         if not analysis_result["success"]:
@@ -522,7 +749,9 @@ Generate the Mermaid diagram code."""
         # Agent 3: Generate diagram
         diagram_result = AgentService.generate_diagram(
             created_tickets,
-            project["name"]
+            project["name"],
+            stylised=stylised_diagram,
+            assignee_names=creation_result["data"]["assignee_names"]
         )
 
         # Diagram generation is optional - don't fail if it errors
@@ -541,10 +770,436 @@ Generate the Mermaid diagram code."""
                 "project": project,
                 "diagram": diagram,
                 "summary": creation_result["data"]["summary"],
-                "ticket_count": len(created_tickets)
+                "ticket_count": creation_result["data"]["created_count"],
+                "updated_count": creation_result["data"]["updated_count"]
             }
         }
 
+    @staticmethod
+    def process_meeting_transcript_stream(
+        db: firestore.Client,
+        transcript: str,
+        project_name: Optional[str] = None,
+        stylised_diagram: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming 3-agent workflow: tickets are created as Agent 1 emits them.
+
+        Args:
+            db: Firestore client
+            transcript: Meeting transcript text
+            project_name: Optional override for project name
+            stylised_diagram: Draw the diagram with the LLM instead of locally
+
+        Yields:
+            Event dicts with 'event' and 'data':
+            - project: the project tickets are created in
+            - ticket: a created ticket (with its 'index' in the meeting, and
+              'existing' set when an existing duplicate was updated instead)
+            - ticket_updated: a created ticket that changed afterwards (details
+              from a later transcript chunk, or forward dependencies linked)
+            - diagram: Mermaid diagram of the created tickets
+            - done: summary, ticket_count (tickets created) and updated_count
+              (existing tickets updated as duplicates)
+            - error: 'stage' and 'error' (ends the stream)
+        """
+        trace = metrics.MeetingTrace("stream")
+        print(f"[AgentService] Starting streaming workflow (trace {trace.trace_id})...")
+
+        session = None
+        waiting_specs = []  # Specs that arrived before the project name
+        # Analysis and creation interleave, so creation time is accumulated
+        # separately and subtracted from the analysis wall time
+        creation_seconds = 0.0
+
+        def open_session(name: Optional[str]):
+            nonlocal session, creation_seconds
+            started = time.perf_counter()
+            session = TicketCreationSession(db, project_name or name)
+            creation_seconds += time.perf_counter() - started
+            return {"event": "project", "data": session.project}
+
+        def create(spec: Dict[str, Any]):
+            nonlocal creation_seconds
+            started = time.perf_counter()
+            index = len(session.created_tickets)
+            print(f"[Agent 2] Processing ticket {index + 1}: {spec.get('title', 'Untitled')}")
+            ticket = session.add_ticket(spec)
+            creation_seconds += time.perf_counter() - started
+            return {"event": "ticket", "data": {**ticket, "index": index, "existing": ticket["id"] in session.updated_ticket_ids}}
+
+        def merge_update(index: int, spec: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            nonlocal creation_seconds
+            if index >= len(session.created_tickets):
+                return None
+            started = time.perf_counter()
+            ticket = session.update_ticket(index, spec)
+            creation_seconds += time.perf_counter() - started
+            return ticket
+
+        stage = "analysis"
+        started = time.perf_counter()
+        try:
+            if project_name:
+                stage = "creation"
+                yield open_session(project_name)
+
+            for event, value in AgentService.analyze_meeting_stream(transcript):
+                stage = "creation"
+                if event == "project_name" and session is None:
+                    yield open_session(value)
+                    for spec in waiting_specs:
+                        yield create(spec)
+                    waiting_specs = []
+                elif event == "ticket":
+                    if session is None:
+                        waiting_specs.append(value)
+                    else:
+                        yield create(value)
+                elif event == "ticket_updated" and session is not None:
+                    # Specs still waiting are the merged dicts and need no update
+                    index, spec = value
+                    ticket = merge_update(index, spec)
+                    if ticket is not None:
+                        yield {"event": "ticket_updated", "data": ticket}
+                stage = "analysis"
+            metrics.observe_stage("analysis", time.perf_counter() - started - creation_seconds, trace.trace_id)
+
+            stage = "creation"
+            if session is None:
+                yield open_session(None)
+            for spec in waiting_specs:
+                yield create(spec)
+
+            started = time.perf_counter()
+            updated = session.finish()
+            creation_seconds += time.perf_counter() - started
+            metrics.observe_stage("creation", creation_seconds, trace.trace_id)
+            for ticket in updated:
+                yield {"event": "ticket_updated", "data": ticket}
+            print(f"[Agent 2] {session.summary()}")
+
+        except Exception as e:
+            print(f"[AgentService] Streaming workflow failed at {stage}: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            metrics.record_failure(stage, type(e).__name__)
+            trace.finish(success=False)
+            yield {"event": "error", "data": {"stage": stage, "error": str(e)}}
+            return
+
+        # Agent 3: Diagram generation is optional - don't fail if it errors
+        diagram_result = AgentService.generate_diagram(
+            session.created_tickets,
+            session.project["name"],
+            stylised=stylised_diagram,
+            assignee_names=session.assignee_names()
+        )
+        if diagram_result["success"]:
+            yield {"event": "diagram", "data": {"diagram": diagram_result["diagram"]}}
+        else:
+            print(f"[AgentService] Warning: Diagram generation failed: {diagram_result.get('error')}")
+
+        print(f"[AgentService] ✓ Streaming workflow finished successfully")
+        trace.finish(success=True, ticket_count=session.created_count)
+        yield {
+            "event": "done",
+            "data": {
+                "summary": session.summary(),
+                "ticket_count": session.created_count,
+                "updated_count": session.updated_count
+            }
+        }
+
+
+class TicketCreationSession:
+    """
+    Agent 2 state for one meeting: the project, known users and labels, and
+    the meeting's tickets so far (created_tickets, in spec order, includes
+    existing tickets updated as duplicates; see created_count).
+
+    Tickets are added one spec at a time, so creation can start before the
+    analyzer has finished. Dependencies on tickets that have not been
+    created yet are linked in finish(). A spec that duplicates an open
+    ticket of the project updates that ticket instead (see ticket_dedup).
+    """
+
+    @metrics.in_stage("creation")
+    def __init__(self, db: firestore.Client, project_name: Optional[str] = None):
+        self.db = db
+        self.project_name = project_name or "General"
+
+        # Get or create project
+        project = project_service.get_project_by_name(db, self.project_name)
+        if not project:
+            project = project_service.get_project_by_identifier(db, self.project_name)
+
+        if not project:
+            print(f"[Agent 2] Creating new project: {self.project_name}")
+            project = project_service.create_project(db, ProjectCreate(
+                name=self.project_name,
+                identifier=self.project_name[:10].upper().replace(" ", ""),
+                description=f"Auto-created from meeting analysis"
+            ))
+
+        self.project = project
+        self.project_id = project["id"]
+        print(f"[Agent 2] Using project: {self.project_name} (ID: {self.project_id})")
+
+        # Assignees are resolved through the shared user name index
+        user_index.ensure_loaded(db)
+
+        # Get existing labels for this project
+        existing_labels = label_service.get_all_labels(db, project_id=self.project_id)
+        self.label_map = {label["name"].lower(): label for label in existing_labels}
+
+        self.created_tickets: List[Dict[str, Any]] = []
+        self.ticket_id_map: Dict[int, str] = {}  # Map index to created ticket ID
+        self.updated_ticket_ids: Set[str] = set()  # Existing tickets matched as duplicates
+        self.pending_dependencies: Dict[int, List[int]] = {}  # Index -> dependency indices not created yet
+
+    def _resolve_assignee(self, assignee_name: Optional[str]) -> Optional[str]:
+        if not assignee_name:
+            return None
+        matched_user = user_index.match(assignee_name)
+        if matched_user:
+            print(f"[Agent 2]   Matched assignee: {assignee_name} -> {matched_user['name']}")
+            return matched_user["id"]
+
+        print(f"[Agent 2]   Creating new user: {assignee_name}")
+        new_user = user_service.create_user(self.db, UserCreate(
+            name=assignee_name,
+            color=AgentService._generate_random_color()
+        ))
+        return new_user["id"]
+
+    def _resolve_labels(self, label_names: List[str]) -> List[str]:
+        label_ids = []
+        for label_name in label_names or []:
+            label_key = label_name.lower().strip()
+            if label_key in self.label_map:
+                label_ids.append(self.label_map[label_key]["id"])
+            else:
+                print(f"[Agent 2]   Creating new label: {label_name}")
+                new_label = label_service.create_label(self.db, LabelCreate(
+                    name=label_name,
+                    color=AgentService._generate_random_color(),
+                    project_id=self.project_id
+                ))
+                label_ids.append(new_label["id"])
+                self.label_map[label_key] = new_label
+        return label_ids
+
+    @metrics.in_stage("creation")
+    def add_ticket(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Create the ticket for the next spec and return it."""
+        idx = len(self.created_tickets)
+
+        # Handle dependencies: keep every edge, first one also sets the parent
+        dep_indices = AgentService._parse_dependency_indices(spec.get("dependencies"), idx)
+        resolved_deps = [d for d in dep_indices if d in self.ticket_id_map]
+        forward_deps = [d for d in dep_indices if d not in self.ticket_id_map]
+        dependency_ids = [self.ticket_id_map[d] for d in resolved_deps]
+        parent_ticket_id = dependency_ids[0] if dependency_ids else None
+        if parent_ticket_id:
+            print(f"[Agent 2]   Set parent: ticket at index {resolved_deps[0]}")
+
+        # Update an open ticket this spec duplicates instead of copying it
+        duplicate = ticket_dedup.find_duplicate(
+            self.db, self.project_id, spec.get("title"), spec.get("description"),
+            exclude=self.ticket_id_map.values()
+        )
+        if duplicate is not None:
+            existing, score = duplicate
+            print(f"[Agent 2]   Matches existing ticket {existing['id']} ({score:.0%} similar), updating it")
+            ticket = self._update_existing(existing, spec, dependency_ids)
+            self.updated_ticket_ids.add(ticket["id"])
+            self.created_tickets.append(ticket)
+            self.ticket_id_map[idx] = ticket["id"]
+            if forward_deps:
+                self.pending_dependencies[idx] = forward_deps
+            return ticket
+
+        # Create ticket
+        ticket_data = TicketCreate(
+            title=spec.get("title", "Untitled Task"),
+            summary=spec.get("description"),
+            priority=AgentService._normalize_priority(spec.get("priority")),
+            estimated_hours=spec.get("estimated_hours"),
+            assignee_id=self._resolve_assignee(spec.get("assignee_name")),
+            end_date=AgentService._parse_date(spec.get("deadline")),
+            project_id=self.project_id,
+            parent_ticket_id=parent_ticket_id,
+            dependency_ids=dependency_ids,
+            label_ids=self._resolve_labels(spec.get("labels", [])),
+            status=TicketStatus.open
+        )
+
+        created_ticket = ticket_service.create_ticket(self.db, ticket_data)
+        self.created_tickets.append(created_ticket)
+        self.ticket_id_map[idx] = created_ticket["id"]
+        if forward_deps:
+            self.pending_dependencies[idx] = forward_deps
+
+        print(f"[Agent 2]   ✓ Created ticket: {created_ticket['id']}")
+        return created_ticket
+
+    @metrics.in_stage("creation")
+    def update_ticket(self, idx: int, spec: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Apply a changed spec (e.g. merged with a later transcript chunk) to
+        the ticket already created for it.
+
+        Returns:
+            The updated ticket, or None if nothing had to change
+        """
+        dep_indices = AgentService._parse_dependency_indices(spec.get("dependencies"), idx)
+        dependency_ids = [self.ticket_id_map[d] for d in dep_indices if d in self.ticket_id_map]
+        forward_deps = [d for d in dep_indices if d not in self.ticket_id_map]
+        if forward_deps:
+            pending = self.pending_dependencies.setdefault(idx, [])
+            pending.extend(d for d in forward_deps if d not in pending)
+
+        ticket = self.created_tickets[idx]
+        updated = self._update_existing(ticket, spec, dependency_ids)
+        if updated is ticket:
+            return None
+        self.created_tickets[idx] = updated
+        print(f"[Agent 2]   Updated ticket {idx + 1} with details from a later chunk")
+        return updated
+
+    def _update_existing(self, existing: Dict[str, Any], spec: Dict[str, Any], dependency_ids: List[str]) -> Dict[str, Any]:
+        """
+        Fold a duplicate spec into an existing ticket: fill in what is
+        missing, keep the longer description, raise (never lower) the
+        priority and add new labels and dependencies.
+        """
+        update: Dict[str, Any] = {}
+
+        description = spec.get("description")
+        if description and len(description) > len(existing.get("summary") or ""):
+            update["summary"] = description
+
+        if spec.get("priority"):
+            priority = AgentService._normalize_priority(spec.get("priority"))
+            # Priority is a str enum, so stored values look up directly
+            if PRIORITY_RANK[priority] < PRIORITY_RANK.get(existing.get("priority"), len(PRIORITY_RANK)):
+                update["priority"] = priority
+
+        if existing.get("estimated_hours") is None and spec.get("estimated_hours") is not None:
+            update["estimated_hours"] = spec["estimated_hours"]
+        if not existing.get("assignee_id") and spec.get("assignee_name"):
+            update["assignee_id"] = self._resolve_assignee(spec["assignee_name"])
+        if not existing.get("end_date"):
+            end_date = AgentService._parse_date(spec.get("deadline"))
+            if end_date:
+                update["end_date"] = end_date
+
+        label_ids = existing.get("label_ids") or []
+        new_labels = [l for l in self._resolve_labels(spec.get("labels", [])) if l not in label_ids]
+        if new_labels:
+            update["label_ids"] = label_ids + new_labels
+
+        current_deps = existing.get("dependency_ids") or []
+        new_deps = [d for d in dependency_ids if d not in current_deps and d != existing["id"]]
+        if new_deps:
+            update["dependency_ids"] = current_deps + new_deps
+
+        if not update:
+            return existing
+        updated = ticket_service.update_ticket(self.db, existing["id"], TicketUpdate(**update))
+        return updated or existing
+
+    @metrics.in_stage("creation")
+    def resume(
+        self,
+        specs: List[Dict[str, Any]],
+        tickets: List[Optional[Dict[str, Any]]],
+        updated_ticket_ids: Iterable[str] = ()
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Continue a session whose first tickets were created earlier.
+
+        Args:
+            specs: All ticket specs of the meeting
+            tickets: Tickets already created for the first len(tickets)
+                     specs; None where a ticket no longer exists, which is
+                     then created again at the same index
+            updated_ticket_ids: Which of them were existing tickets that
+                                were updated instead of created
+
+        Returns:
+            Index -> ticket of the tickets that were created again
+        """
+        recreated = {}
+        updated_ticket_ids = set(updated_ticket_ids)
+        for idx, ticket in enumerate(tickets):
+            if ticket is None:
+                print(f"[Agent 2]   Ticket {idx + 1} no longer exists, creating it again")
+                recreated[idx] = self.add_ticket(specs[idx])
+                continue
+            self.created_tickets.append(ticket)
+            self.ticket_id_map[idx] = ticket["id"]
+            if ticket["id"] in updated_ticket_ids:
+                self.updated_ticket_ids.add(ticket["id"])
+        # Forward dependencies of resumed tickets, and edges to recreated
+        # ones, are still to be linked (add_ticket recorded the recreated
+        # tickets' own)
+        for idx in range(len(tickets)):
+            if idx in recreated:
+                continue
+            spec = specs[idx] if idx < len(specs) else {}
+            forward_deps = [
+                d for d in AgentService._parse_dependency_indices(spec.get("dependencies"), idx)
+                if d >= len(tickets) or d in recreated
+            ]
+            if forward_deps:
+                self.pending_dependencies[idx] = forward_deps
+        return recreated
+
+    @metrics.in_stage("creation")
+    def finish(self) -> List[Dict[str, Any]]:
+        """
+        Resolve dependencies on tickets that appeared later in the list.
+
+        Returns:
+            The tickets that were updated with new dependency edges
+        """
+        updated_tickets = []
+        for idx, forward_deps in self.pending_dependencies.items():
+            resolved = [self.ticket_id_map[d] for d in forward_deps if d in self.ticket_id_map]
+            if not resolved:
+                continue
+            ticket = self.created_tickets[idx]
+            dependency_ids = ticket.get("dependency_ids", []) + resolved
+            updated = ticket_service.update_ticket(
+                self.db, ticket["id"], TicketUpdate(dependency_ids=dependency_ids)
+            )
+            if updated:
+                self.created_tickets[idx] = updated
+                updated_tickets.append(updated)
+            print(f"[Agent 2]   Linked forward dependencies of ticket {idx + 1}")
+        self.pending_dependencies = {}
+        return updated_tickets
+
+    def assignee_names(self) -> Dict[str, str]:
+        """User ID -> name of every assignee of the session's tickets."""
+        return user_index.names({t["assignee_id"] for t in self.created_tickets if t.get("assignee_id")})
+
+    @property
+    def created_count(self) -> int:
+        """Tickets created by the session (created_tickets also holds updated duplicates)."""
+        return len(self.created_tickets) - len(self.updated_ticket_ids)
+
+    @property
+    def updated_count(self) -> int:
+        """Existing tickets updated instead of creating a duplicate."""
+        return len(self.updated_ticket_ids)
+
+    def summary(self) -> str:
+        updated = f", updated {self.updated_count} existing" if self.updated_ticket_ids else ""
+        return f"Created {self.created_count} ticket(s){updated} in project '{self.project_name}'"
+
 
 # Singleton instance
 agent_service = AgentService()
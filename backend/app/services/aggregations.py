@@ -0,0 +1,44 @@
+"""
+Firestore aggregation query helpers.
+
+Aggregation queries (count, sum, avg) are evaluated server-side and cost
+a single RPC, billed at one read per 1000 index entries, instead of
+fetching every matching document.
+"""
+
+from typing import Dict, Optional
+
+
+def _run(aggregate_query) -> Dict[str, Optional[float]]:
+    """Execute an aggregate query and map alias -> value."""
+    results = aggregate_query.get()
+    return {result.alias: result.value for result in results[0]}
+
+
+def count(query) -> int:
+    """Count documents matching a query or collection without reading them."""
+    values = _run(query.count(alias="count"))
+    return int(values["count"] or 0)
+
+
+def numeric_summary(query, field: str) -> Dict[str, Optional[float]]:
+    """
+    Count, sum and average of a numeric field in one aggregation RPC.
+
+    Documents where the field is missing or not numeric are ignored by
+    sum/avg, but still counted.
+
+    Returns:
+        Dict with 'count', 'sum' and 'avg' (avg is None when nothing matched)
+    """
+    aggregate_query = (
+        query.count(alias="count")
+        .sum(field, alias="sum")
+        .avg(field, alias="avg")
+    )
+    values = _run(aggregate_query)
+    return {
+        "count": int(values["count"] or 0),
+        "sum": float(values["sum"] or 0),
+        "avg": float(values["avg"]) if values.get("avg") is not None else None,
+    }
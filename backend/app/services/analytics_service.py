@@ -0,0 +1,287 @@
+"""
+Cycle burndown and project velocity analytics.
+
+Computed with NumPy/pandas over the columnar ticket snapshot
+(ticket_snapshot), so no per-request Firestore scan is needed once a
+project is loaded. Results are cached per cycle / per project and dropped
+when a ticket in that cycle or project changes.
+
+Definitions:
+- scope:      estimated_hours of tickets in the cycle created by that day
+              (tickets created before the cycle, or without created_at,
+              count from day one; a ticket is in scope by the day it is
+              resolved at the latest)
+- completed:  estimated_hours of those tickets resolved by that day
+- remaining:  scope - completed (never negative)
+- velocity:   completed hours per cycle, resolved before the cycle ended
+"""
+
+import threading
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from firebase_admin import firestore
+
+from app.services import ticket_events
+from app.services.cycle_service import cycle_service
+from app.services.ticket_snapshot import ticket_snapshot_store
+
+
+def _to_day(value) -> Optional[pd.Timestamp]:
+    """Normalize a date, datetime or ISO string to a UTC midnight Timestamp."""
+    if value is None:
+        return None
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize(timezone.utc)
+    return timestamp.tz_convert(timezone.utc).normalize()
+
+
+def _day_index(times: pd.Series, start: pd.Timestamp, num_days: int) -> np.ndarray:
+    """
+    Map timestamps to day offsets from start, vectorized.
+
+    Days before the start clamp to 0; missing times and times after the last
+    day map to num_days (an overflow bucket that is never summed).
+    """
+    offsets = ((times - start) // pd.Timedelta(days=1)).to_numpy(dtype="float64", na_value=np.nan)
+    offsets = np.where(np.isnan(offsets), num_days, offsets)
+    return np.clip(offsets, 0, num_days).astype(np.int64)
+
+
+def compute_burndown(frame: pd.DataFrame, cycle: dict, today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Compute the daily burndown of one cycle from a ticket frame.
+
+    Args:
+        frame: Project ticket frame (see ticket_snapshot.build_frame)
+        cycle: Cycle dict with id, start_date and end_date
+        today: Days after this are reported without actuals (default: UTC today)
+
+    Returns:
+        Dict with per-day scope/completed/remaining/ideal series and totals
+    """
+    start = _to_day(cycle["start_date"])
+    end = _to_day(cycle["end_date"])
+    if end < start:
+        raise ValueError("Cycle end_date is before start_date")
+    num_days = int((end - start) / pd.Timedelta(days=1)) + 1
+    today = _to_day(today or datetime.now(timezone.utc).date())
+
+    tickets = frame[frame["cycle_id"] == cycle["id"]]
+    hours = tickets["estimated_hours"].fillna(0.0).to_numpy()
+
+    resolved_times = tickets["resolved_at"].where(tickets["is_done"])
+    resolved_idx = _day_index(resolved_times, start, num_days)
+    # Missing created_at counts from day one, and nothing is completed before
+    # it is in scope (imported or clock-skewed timestamps), so remaining >= 0
+    created_idx = _day_index(tickets["created_at"].fillna(start), start, num_days)
+    created_idx = np.minimum(created_idx, resolved_idx)
+
+    # Per-day additions via bincount, then running totals
+    scope = np.cumsum(np.bincount(created_idx, weights=hours, minlength=num_days + 1)[:num_days])
+    completed = np.cumsum(np.bincount(resolved_idx, weights=hours, minlength=num_days + 1)[:num_days])
+    scope_count = np.cumsum(np.bincount(created_idx, minlength=num_days + 1)[:num_days])
+    completed_count = np.cumsum(np.bincount(resolved_idx, minlength=num_days + 1)[:num_days])
+    remaining = scope - completed
+
+    initial_scope = scope[0] if num_days else 0.0
+    ideal = np.linspace(initial_scope, 0.0, num_days) if num_days > 1 else np.zeros(num_days)
+
+    days = pd.date_range(start, periods=num_days, freq="D")
+    is_future = days > today
+
+    series = [
+        {
+            "date": day.date(),
+            "scope_hours": None if future else round(float(s), 2),
+            "completed_hours": None if future else round(float(c), 2),
+            "remaining_hours": None if future else round(float(r), 2),
+            "remaining_tickets": None if future else int(sc - cc),
+            "ideal_hours": round(float(i), 2),
+        }
+        for day, future, s, c, r, sc, cc, i in zip(
+            days, is_future, scope, completed, remaining, scope_count, completed_count, ideal
+        )
+    ]
+
+    done = tickets["is_done"].to_numpy()
+    return {
+        "cycle_id": cycle["id"],
+        "project_id": cycle.get("project_id"),
+        "start_date": start.date(),
+        "end_date": end.date(),
+        "ticket_count": int(len(tickets)),
+        "completed_ticket_count": int(done.sum()),
+        "total_scope_hours": round(float(hours.sum()), 2),
+        "completed_hours": round(float(hours[done].sum()), 2),
+        "unestimated_ticket_count": int(tickets["estimated_hours"].isna().sum()),
+        "days": series,
+    }
+
+
+def compute_velocity(frame: pd.DataFrame, cycles: list, window: int = 3) -> Dict[str, Any]:
+    """
+    Compute committed vs. completed hours per cycle and a rolling velocity.
+
+    Args:
+        frame: Project ticket frame
+        cycles: Cycle dicts of the project
+        window: Number of most recent cycles in the rolling average
+
+    Returns:
+        Dict with one entry per cycle (oldest first) and average velocity
+    """
+    if not cycles:
+        return {"cycles": [], "average_velocity": None, "window": window}
+
+    cycle_frame = pd.DataFrame({
+        "cycle_id": [c["id"] for c in cycles],
+        "name": [c.get("name") for c in cycles],
+        "status": [getattr(c.get("status"), "value", c.get("status")) for c in cycles],
+        "start": [_to_day(c["start_date"]) for c in cycles],
+        "end": [_to_day(c["end_date"]) for c in cycles],
+    }).sort_values("start", kind="stable").reset_index(drop=True)
+
+    tickets = frame[frame["cycle_id"].isin(cycle_frame["cycle_id"])]
+    hours = tickets["estimated_hours"].fillna(0.0)
+
+    # Ticket counts as completed if resolved before its cycle's end day ran out
+    cycle_end = tickets["cycle_id"].map(cycle_frame.set_index("cycle_id")["end"]) + pd.Timedelta(days=1)
+    completed_in_cycle = tickets["is_done"] & (tickets["resolved_at"] < cycle_end)
+
+    per_cycle = pd.DataFrame({
+        "cycle_id": tickets["cycle_id"],
+        "committed_hours": hours,
+        "completed_hours": hours.where(completed_in_cycle, 0.0),
+        "committed_tickets": 1,
+        "completed_tickets": completed_in_cycle.astype(np.int64),
+    }).groupby("cycle_id").sum()
+
+    merged = cycle_frame.join(per_cycle, on="cycle_id").fillna({
+        "committed_hours": 0.0,
+        "completed_hours": 0.0,
+        "committed_tickets": 0,
+        "completed_tickets": 0,
+    })
+    committed = merged["committed_hours"].to_numpy()
+    completed = merged["completed_hours"].to_numpy()
+    completion_rate = np.divide(completed, committed, out=np.zeros_like(completed), where=committed > 0)
+
+    # Velocity only counts cycles that have finished
+    finished = merged["status"].eq("completed") | (merged["end"] < _to_day(datetime.now(timezone.utc)))
+    recent = completed[finished.to_numpy()][-window:]
+    average_velocity = round(float(recent.mean()), 2) if len(recent) else None
+
+    return {
+        "cycles": [
+            {
+                "cycle_id": row.cycle_id,
+                "name": row.name,
+                "status": row.status,
+                "start_date": row.start.date(),
+                "end_date": row.end.date(),
+                "committed_hours": round(float(row.committed_hours), 2),
+                "completed_hours": round(float(row.completed_hours), 2),
+                "committed_tickets": int(row.committed_tickets),
+                "completed_tickets": int(row.completed_tickets),
+                "completion_rate": round(float(rate), 3),
+            }
+            for row, rate in zip(merged.itertuples(index=False), completion_rate)
+        ],
+        "average_velocity": average_velocity,
+        "window": window,
+    }
+
+
+class AnalyticsService:
+    """Cached burndown/velocity analytics over ticket snapshots."""
+
+    def __init__(self):
+        self._burndown_cache: Dict[str, Tuple[tuple, Dict[str, Any]]] = {}
+        self._velocity_cache: Dict[str, Tuple[tuple, Dict[str, Any]]] = {}
+        # Bumped on invalidation so results computed concurrently are not stored
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cycle_key(cycle: dict) -> tuple:
+        return (str(cycle.get("start_date")), str(cycle.get("end_date")), str(cycle.get("status")))
+
+    def _cached(self, cache: dict, key: str, fingerprint: tuple):
+        with self._lock:
+            entry = cache.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                return entry[1], self._generations.get(key, 0)
+            return None, self._generations.get(key, 0)
+
+    def _store(self, cache: dict, key: str, generation: int, fingerprint: tuple, result: dict):
+        with self._lock:
+            if self._generations.get(key, 0) == generation:
+                cache[key] = (fingerprint, result)
+
+    def get_cycle_burndown(self, db: firestore.Client, cycle_id: str) -> Optional[Dict[str, Any]]:
+        """Burndown for a cycle, or None if the cycle does not exist."""
+        cycle = cycle_service.get_cycle_by_id(db, cycle_id)
+        if cycle is None:
+            return None
+
+        # Cycle edits and the passing of days change the result too
+        fingerprint = self._cycle_key(cycle) + (datetime.now(timezone.utc).date(),)
+        result, generation = self._cached(self._burndown_cache, cycle_id, fingerprint)
+        if result is not None:
+            return result
+
+        frame = ticket_snapshot_store.get_frame(db, cycle["project_id"])
+        result = compute_burndown(frame, cycle)
+        self._store(self._burndown_cache, cycle_id, generation, fingerprint, result)
+        return result
+
+    def get_project_velocity(self, db: firestore.Client, project_id: str, window: int = 3) -> Dict[str, Any]:
+        """Per-cycle committed/completed hours and rolling velocity of a project."""
+        cycles = cycle_service.get_all_cycles(db, project_id)
+
+        fingerprint = (window, datetime.now(timezone.utc).date()) + tuple(
+            (c["id"], c.get("name")) + self._cycle_key(c) for c in cycles
+        )
+        result, generation = self._cached(self._velocity_cache, project_id, fingerprint)
+        if result is not None:
+            return result
+
+        frame = ticket_snapshot_store.get_frame(db, project_id)
+        result = {"project_id": project_id, **compute_velocity(frame, cycles, window)}
+        self._store(self._velocity_cache, project_id, generation, fingerprint, result)
+        return result
+
+    def invalidate(self, cycle_ids=(), project_ids=()):
+        """Drop cached results for the given cycles and projects."""
+        with self._lock:
+            for key, cache in [(k, self._burndown_cache) for k in cycle_ids] + \
+                              [(k, self._velocity_cache) for k in project_ids]:
+                cache.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+    def on_ticket_event(self, event: str, ticket: Optional[dict], previous: Optional[dict]):
+        """ticket_events listener: drop results for the cycles/projects touched."""
+        if event == "reset":
+            with self._lock:
+                project_id = ticket.get("project_id") if ticket else None
+                stale_cycles = [
+                    cid for cid, (_, result) in self._burndown_cache.items()
+                    if project_id is None or result.get("project_id") == project_id
+                ]
+            self.invalidate(
+                cycle_ids=stale_cycles,
+                project_ids=[project_id] if project_id else list(self._velocity_cache),
+            )
+            return
+
+        cycle_ids = {t.get("cycle_id") for t in (ticket, previous) if t is not None} - {None}
+        self.invalidate(cycle_ids=cycle_ids, project_ids=ticket_events.affected_projects(ticket, previous))
+
+
+# Singleton instance
+analytics_service = AnalyticsService()
+ticket_events.subscribe(analytics_service.on_ticket_event)
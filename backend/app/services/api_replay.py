@@ -0,0 +1,349 @@
+"""
+Record/replay of Nemotron and Deepgram HTTP calls.
+
+Benchmarks and regression runs of the pipeline should neither pay for API
+calls nor inherit their latency swings. With API_REPLAY_MODE=record, every
+call to the NVIDIA endpoint (get_nemotron_client) and to Deepgram
+(DeepgramService.transcribe_file) still goes out, and the exchange is
+saved as a fixture:
+
+    {API_FIXTURES_DIR}/{service}/{request key}.json
+
+The request key is a hash of method, path, query and body (JSON bodies
+canonicalized), so the same prompt or the same audio always maps to the
+same fixture. Credentials are never recorded.
+
+With API_REPLAY_MODE=replay, both clients talk to a local stand-in server
+(ReplayServer, or scripts/replay_server.py) at API_REPLAY_URL instead. It
+serves the fixtures with recorded, fixed or scaled latency, streams SSE
+responses event by event, and injects errors at a configurable rate.
+Latency and errors are derived from a seed, the request key and how often
+that key was requested, so a run is reproducible however requests
+interleave.
+
+Configuration (environment variables):
+- API_REPLAY_MODE: off, record or replay (default: off)
+- API_FIXTURES_DIR: Fixture directory (default: backend/fixtures/api)
+- API_REPLAY_URL: Stand-in server used in replay mode (default: http://127.0.0.1:8765)
+"""
+
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+
+_BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+
+MODE = os.getenv("API_REPLAY_MODE", "off").lower()
+FIXTURES_DIR = Path(os.getenv("API_FIXTURES_DIR", str(_BACKEND_DIR / "fixtures" / "api")))
+REPLAY_URL = os.getenv("API_REPLAY_URL", "http://127.0.0.1:8765").rstrip("/")
+
+SERVICES = ("nemotron", "deepgram")
+
+# Response headers worth replaying (the rest describe the original connection)
+_KEPT_HEADERS = ("content-type", "retry-after", "retry-after-ms", "x-request-id", "dg-request-id")
+
+
+def recording() -> bool:
+    return MODE == "record"
+
+
+def replaying() -> bool:
+    return MODE == "replay"
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+def _body_digest(body: bytes) -> Tuple[str, Any]:
+    """(digest, readable form) of a request body; JSON is canonicalized first."""
+    try:
+        parsed = json.loads(body) if body else None
+    except (ValueError, UnicodeDecodeError):
+        return hashlib.sha256(body).hexdigest(), {"sha256": hashlib.sha256(body).hexdigest(), "bytes": len(body)}
+    canonical = json.dumps(parsed, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest(), parsed
+
+
+def request_key(method: str, path: str, query: str, body: bytes) -> str:
+    """Fixture key of a request (independent of host, headers and query order)."""
+    digest, _ = _body_digest(body)
+    params = "&".join(f"{k}={v}" for k, v in sorted(parse_qsl(query, keep_blank_values=True)))
+    raw = f"{method.upper()} {path}?{params}\n{digest}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def fixture_path(service: str, key: str, fixtures_dir: Optional[Path] = None) -> Path:
+    return Path(fixtures_dir or FIXTURES_DIR) / service / f"{key}.json"
+
+
+def load_fixture(service: str, key: str, fixtures_dir: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    path = fixture_path(service, key, fixtures_dir)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_fixture(
+    service: str,
+    request: httpx.Request,
+    body: bytes,
+    status: int,
+    headers: httpx.Headers,
+    content: bytes,
+    elapsed_ms: float
+) -> Path:
+    """Write one exchange as a fixture (atomically; re-recording overwrites)."""
+    url = request.url
+    key = request_key(request.method, url.path, url.query.decode("ascii"), body)
+    _, readable = _body_digest(body)
+    try:
+        response_body = {"text": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        response_body = {"base64": base64.b64encode(content).decode("ascii")}
+
+    fixture = {
+        "key": key,
+        "request": {
+            "method": request.method,
+            "path": url.path,
+            "query": url.query.decode("ascii"),
+            "body": readable,
+        },
+        "response": {
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k.lower() in _KEPT_HEADERS},
+            **response_body,
+        },
+        "elapsed_ms": round(elapsed_ms, 1),
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+    path = fixture_path(service, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(fixture, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+    return path
+
+
+def _fixture_content(fixture: Dict[str, Any]) -> bytes:
+    response = fixture["response"]
+    if "base64" in response:
+        return base64.b64decode(response["base64"])
+    return response.get("text", "").encode("utf-8")
+
+
+# ============================================================================
+# CLIENT SIDE
+# ============================================================================
+
+class RecordingTransport(httpx.BaseTransport):
+    """httpx transport that forwards requests and saves every exchange as a fixture."""
+
+    def __init__(self, service: str, inner: Optional[httpx.BaseTransport] = None):
+        self.service = service
+        self._inner = inner or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        started = time.perf_counter()
+        response = self._inner.handle_request(request)
+        try:
+            # Buffers streamed responses too; recording runs are not about latency
+            content = response.read()
+        finally:
+            response.close()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        path = save_fixture(self.service, request, body, response.status_code, response.headers, content, elapsed_ms)
+        print(f"[Replay] Recorded {self.service} {request.method} {request.url.path} -> {path.name}")
+        headers = {k: v for k, v in response.headers.items() if k.lower() in _KEPT_HEADERS}
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    def close(self):
+        self._inner.close()
+
+
+def http_client(service: str, timeout: float) -> httpx.Client:
+    """httpx client for a service: recording in record mode, plain otherwise."""
+    if recording():
+        return httpx.Client(timeout=timeout, transport=RecordingTransport(service))
+    return httpx.Client(timeout=timeout)
+
+
+def base_url(service: str, default: str) -> str:
+    """The service's base URL, or its prefix on the stand-in server in replay mode."""
+    if not replaying():
+        return default
+    return f"{REPLAY_URL}/{service}{urlsplit(default).path.rstrip('/')}"
+
+
+# ============================================================================
+# STAND-IN SERVER
+# ============================================================================
+
+class ReplayServer:
+    """
+    Local HTTP server answering Nemotron/Deepgram requests from fixtures.
+
+    Paths are prefixed with the service name (/nemotron/v1/chat/completions,
+    /deepgram/v1/listen). Latency is the fixture's recorded time times
+    latency_scale, or latency_ms (+/- jitter_ms) when given; SSE responses
+    additionally wait chunk_delay_ms between events. A share of error_rate
+    requests gets error_status instead (429s carry retry-after-ms).
+    """
+
+    def __init__(
+        self,
+        fixtures_dir: Optional[Path] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: Optional[float] = None,
+        jitter_ms: float = 0.0,
+        latency_scale: float = 1.0,
+        chunk_delay_ms: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: int = 0
+    ):
+        self.fixtures_dir = Path(fixtures_dir or FIXTURES_DIR)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.latency_scale = latency_scale
+        self.chunk_delay_ms = chunk_delay_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.seed = seed
+
+        self._attempts: Counter = Counter()
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """Serve in a background thread; returns the base URL."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def _plan(self, key: str, fixture: Optional[Dict[str, Any]]) -> Tuple[float, bool]:
+        """(latency in seconds, inject error) for the next request with this key."""
+        with self._lock:
+            attempt = self._attempts[key]
+            self._attempts[key] += 1
+        rng = random.Random(f"{self.seed}:{key}:{attempt}")
+        if self.latency_ms is not None:
+            latency = self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)
+        else:
+            latency = (fixture or {}).get("elapsed_ms", 0.0) * self.latency_scale
+        return max(0.0, latency) / 1000.0, rng.random() < self.error_rate
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._replay()
+
+            def do_POST(self):
+                self._replay()
+
+            def log_message(self, format, *args):
+                pass  # Counted in stats instead
+
+            def _send(self, status: int, headers: Dict[str, str], content: bytes):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def _replay(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                url = urlsplit(self.path)
+                service, _, path = url.path.lstrip("/").partition("/")
+                if service not in SERVICES:
+                    server._count("unknown_service")
+                    self._send(404, {"Content-Type": "application/json"}, b'{"error": "unknown service"}')
+                    return
+
+                key = request_key(self.command, f"/{path}", url.query, body)
+                fixture = load_fixture(service, key, server.fixtures_dir)
+                latency, inject_error = server._plan(key, fixture)
+                time.sleep(latency)
+
+                if fixture is None:
+                    server._count("missing")
+                    print(f"[Replay] No fixture for {service} {self.command} /{path} ({key})")
+                    message = json.dumps({"error": {"message": f"No recorded response for request {key}"}})
+                    self._send(404, {"Content-Type": "application/json"}, message.encode("utf-8"))
+                    return
+                if inject_error:
+                    server._count("injected_errors")
+                    headers = {"Content-Type": "application/json"}
+                    if server.error_status == 429:
+                        headers["retry-after-ms"] = "100"
+                    message = json.dumps({"error": {"message": "Injected error", "code": server.error_status}})
+                    self._send(server.error_status, headers, message.encode("utf-8"))
+                    return
+
+                server._count(f"{service}_replayed")
+                response = fixture["response"]
+                content = _fixture_content(fixture)
+                headers = response.get("headers", {})
+                content_type = next((v for k, v in headers.items() if k.lower() == "content-type"), "")
+                if "text/event-stream" not in content_type or not server.chunk_delay_ms:
+                    self._send(response["status"], headers, content)
+                    return
+
+                # Stream event by event and close the connection to end the body
+                self.send_response(response["status"])
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for event in content.split(b"\n\n"):
+                    if event.strip():
+                        self.wfile.write(event + b"\n\n")
+                        self.wfile.flush()
+                        time.sleep(server.chunk_delay_ms / 1000.0)
+                self.close_connection = True
+
+        return Handler
@@ -0,0 +1,411 @@
+"""
+Audio normalization before transcription.
+
+Uploads are often stereo 48 kHz PCM: six times the samples Deepgram needs
+for speech. normalize_audio() decodes the upload to PCM, downmixes it to
+mono and resamples it to AUDIO_SAMPLE_RATE with NumPy, then re-encodes it:
+
+- opus: Ogg/Opus at AUDIO_OPUS_BITRATE (about 1/40 of 48 kHz stereo WAV)
+- flac: lossless 16 kHz mono
+- wav:  16-bit 16 kHz mono PCM (stdlib only)
+
+WAV (integer PCM) is decoded by the stdlib wave module while the upload
+streams in. Other containers (M4A, WebM, MP3, float WAV) and the opus/flac
+encoders need ffmpeg; without it WAV is still normalized (to wav) and
+other uploads are sent as they are. Normalization never fails a
+transcription: on any error, or when the result would not be smaller,
+the original upload is sent and the reason is reported.
+
+With trim_silence, long pauses are cut as well (see voice_activity); the
+offset map of the cuts maps transcript timestamps back to the upload.
+
+Audio is processed in blocks of BLOCK_SECONDS, so memory stays flat for
+long recordings; decoded and encoded audio go through temp files.
+
+Configuration (environment variables):
+- AUDIO_NORMALIZE: Normalize uploads unless the request says otherwise (default: true)
+- AUDIO_CODEC: opus, flac or wav (default: opus)
+- AUDIO_SAMPLE_RATE: Target sample rate in Hz (default: 16000)
+- AUDIO_OPUS_BITRATE: Opus bitrate (default: 24k)
+- FFMPEG_PATH: ffmpeg binary (default: ffmpeg on PATH)
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import wave
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+from app.services.voice_activity import OffsetMap, SilenceTrimmer
+
+AUDIO_NORMALIZE = os.getenv("AUDIO_NORMALIZE", "true").lower() == "true"
+AUDIO_CODEC = os.getenv("AUDIO_CODEC", "opus").lower()
+AUDIO_SAMPLE_RATE = int(os.getenv("AUDIO_SAMPLE_RATE", "16000"))
+AUDIO_OPUS_BITRATE = os.getenv("AUDIO_OPUS_BITRATE", "24k")
+FFMPEG_PATH = os.getenv("FFMPEG_PATH") or shutil.which("ffmpeg")
+
+CODECS = ("opus", "flac", "wav")
+CODEC_MIMETYPES = {"opus": "audio/ogg", "flac": "audio/flac", "wav": "audio/wav"}
+
+BLOCK_SECONDS = 10
+CHUNK_BYTES = 1024 * 1024
+FFMPEG_TIMEOUT_SECONDS = 600
+
+# Low-pass filter of the resampler: taps per unit of decimation ratio
+_TAPS_PER_RATIO = 32
+
+
+class AudioDecodeError(Exception):
+    """Raised when an upload cannot be decoded to PCM."""
+
+
+# ============================================================================
+# DECODING
+# ============================================================================
+
+class _ChunkReader:
+    """Read-only file object over an iterator of chunks (enough for wave.open)."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+        # Bytes handed out while parsing the header, to replay them if it is rejected
+        self.consumed: Optional[bytearray] = bytearray()
+
+    def replay(self) -> Iterator[bytes]:
+        """Everything read so far followed by the rest of the stream."""
+        yield bytes(self.consumed) + bytes(self._buffer)
+        yield from self._chunks
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        if self.consumed is not None:
+            self.consumed += data
+        return data
+
+
+def _to_float(frames: bytes, sample_width: int) -> np.ndarray:
+    """Interleaved integer PCM -> float32 in [-1, 1)."""
+    if sample_width == 1:
+        return (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if sample_width == 2:
+        return np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    if sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        samples = np.where(samples & 0x800000, samples - 0x1000000, samples)
+        return samples.astype(np.float32) / 8388608.0
+    if sample_width == 4:
+        return np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    raise AudioDecodeError(f"Unsupported sample width: {sample_width} bytes")
+
+
+class _PcmSource:
+    """Blocks of mono float32 samples from a WAV stream, plus its format."""
+
+    def __init__(self, stream: BinaryIO):
+        try:
+            self._wav = wave.open(stream, "rb")
+        except (wave.Error, EOFError) as e:
+            raise AudioDecodeError(f"Not a PCM WAV file: {str(e)}")
+        self.channels = self._wav.getnchannels()
+        self.sample_rate = self._wav.getframerate()
+        self.sample_width = self._wav.getsampwidth()
+
+    def blocks(self) -> Iterator[np.ndarray]:
+        frames_per_block = self.sample_rate * BLOCK_SECONDS
+        while True:
+            frames = self._wav.readframes(frames_per_block)
+            if not frames:
+                break
+            usable = len(frames) - len(frames) % (self.sample_width * self.channels)
+            samples = _to_float(frames[:usable], self.sample_width)
+            # Downmix: average the channels of each frame
+            yield samples.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+
+
+def _is_wav(head: bytes) -> bool:
+    return len(head) >= 12 and head[:4] == b"RIFF" and head[8:12] == b"WAVE"
+
+
+def _ffmpeg(args: list, **kwargs) -> subprocess.Popen:
+    return subprocess.Popen([FFMPEG_PATH, "-nostdin", "-hide_banner", "-loglevel", "error", "-y", *args], **kwargs)
+
+
+def _last_line(stderr: bytes) -> str:
+    lines = stderr.decode(errors="replace").strip().splitlines()
+    return lines[-1][:300] if lines else "no error output"
+
+
+def _decode_with_ffmpeg(chunks: Iterable[bytes], workdir: str) -> str:
+    """Decode any container ffmpeg reads into a 16-bit PCM WAV file; returns its path."""
+    # A file, not a pipe: M4A keeps its index at the end and needs seeking
+    source = os.path.join(workdir, "input")
+    with open(source, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    target = os.path.join(workdir, "decoded.wav")
+    process = _ffmpeg(["-i", source, "-vn", "-c:a", "pcm_s16le", "-f", "wav", target],
+                      stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, stderr = process.communicate(timeout=FFMPEG_TIMEOUT_SECONDS)
+    os.remove(source)
+    if process.returncode != 0:
+        raise AudioDecodeError(f"ffmpeg could not decode the upload: {_last_line(stderr)}")
+    return target
+
+
+# ============================================================================
+# RESAMPLING
+# ============================================================================
+
+class _Resampler:
+    """
+    Streaming resampler: windowed-sinc low-pass (when downsampling), then
+    linear interpolation at the output sample positions. State carries
+    across blocks so block boundaries leave no seams.
+    """
+
+    def __init__(self, source_rate: int, target_rate: int):
+        self.ratio = source_rate / target_rate
+        self.expected = 0.0            # Output samples owed for the input so far
+        self.produced = 0
+        if self.ratio > 1:
+            taps = int(_TAPS_PER_RATIO * np.ceil(self.ratio)) | 1
+            cutoff = 0.45 / self.ratio  # cycles per input sample, below the new Nyquist
+            n = np.arange(taps) - (taps - 1) / 2
+            kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+            self.kernel = (kernel / kernel.sum()).astype(np.float32)
+        else:
+            self.kernel = np.ones(1, dtype=np.float32)
+        self.delay = (len(self.kernel) - 1) / 2
+        self._tail = np.zeros(len(self.kernel) - 1, dtype=np.float32)
+        self._filtered = 0             # Filtered samples produced before the current block
+        self._previous = np.float32(0)  # Last filtered sample, for interpolation across blocks
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        self.expected += len(block) / self.ratio
+        return self._resample(block)
+
+    def flush(self) -> np.ndarray:
+        # Push the samples still inside the filter delay through, then cut the padding
+        owed = int(round(self.expected)) - self.produced
+        out = self._resample(np.zeros(len(self.kernel), dtype=np.float32))
+        return out[:max(0, owed)]
+
+    def _resample(self, block: np.ndarray) -> np.ndarray:
+        extended = np.concatenate([self._tail, block])
+        filtered = np.convolve(extended, self.kernel, mode="valid") if len(self.kernel) > 1 else block
+        self._tail = extended[len(extended) - (len(self.kernel) - 1):] if len(self.kernel) > 1 else self._tail
+
+        # buffer[0] is filtered sample (self._filtered - 1)
+        buffer = np.concatenate([[self._previous], filtered])
+        last = self._filtered + len(filtered) - 1
+        first_k = self.produced
+        last_k = int(np.floor((last - self.delay) / self.ratio)) if last >= self.delay else -1
+        if len(filtered):
+            self._previous = filtered[-1]
+        self._filtered += len(filtered)
+        if last_k < first_k:
+            return np.zeros(0, dtype=np.float32)
+        positions = np.arange(first_k, last_k + 1) * self.ratio + self.delay - (self._filtered - len(filtered) - 1)
+        self.produced = last_k + 1
+        return np.interp(positions, np.arange(len(buffer)), buffer).astype(np.float32)
+
+
+def _to_pcm16(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1.0, 32767 / 32768) * 32768.0).astype("<i2").tobytes()
+
+
+# ============================================================================
+# ENCODING
+# ============================================================================
+
+class _WavSink:
+    def __init__(self, out: BinaryIO, sample_rate: int):
+        self._wav = wave.open(out, "wb")
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(sample_rate)
+
+    def write(self, pcm: bytes):
+        self._wav.writeframesraw(pcm)
+
+    def close(self):
+        self._wav.close()  # Patches the header sizes (out is seekable)
+
+
+class _FfmpegSink:
+    def __init__(self, out: BinaryIO, sample_rate: int, codec: str):
+        encoder = (["-c:a", "libopus", "-b:a", AUDIO_OPUS_BITRATE, "-application", "voip", "-f", "ogg"]
+                   if codec == "opus" else ["-c:a", "flac", "-f", "flac"])
+        # stdout/stderr are files, so writing stdin cannot deadlock
+        self._stderr = tempfile.TemporaryFile()
+        self._process = _ffmpeg(
+            ["-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0", *encoder, "pipe:1"],
+            stdin=subprocess.PIPE, stdout=out, stderr=self._stderr,
+        )
+
+    def write(self, pcm: bytes):
+        self._process.stdin.write(pcm)
+
+    def close(self):
+        self._process.stdin.close()
+        returncode = self._process.wait(timeout=FFMPEG_TIMEOUT_SECONDS)
+        self._stderr.seek(0)
+        message = _last_line(self._stderr.read())
+        self._stderr.close()
+        if returncode != 0:
+            raise AudioDecodeError(f"ffmpeg could not encode the audio: {message}")
+
+    def abort(self):
+        self._process.kill()
+        self._process.wait()
+        self._stderr.close()
+
+
+# ============================================================================
+# NORMALIZATION
+# ============================================================================
+
+class NormalizedAudio:
+    """Normalized audio in a temp file; iterate it for the request body chunks."""
+
+    def __init__(self, file: BinaryIO, codec: str, stats: Dict[str, Any], offsets: Optional[OffsetMap] = None):
+        self.file = file
+        self.offsets = offsets  # Set when silence was trimmed
+        self.codec = codec
+        self.mimetype = CODEC_MIMETYPES[codec]
+        self.size = stats["sent_bytes"]
+        self.stats = stats
+
+    def __iter__(self) -> Iterator[bytes]:
+        self.file.seek(0)
+        while True:
+            chunk = self.file.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+
+def ffmpeg_available() -> bool:
+    return bool(FFMPEG_PATH)
+
+
+def resolve_codec(codec: Optional[str]) -> str:
+    """Requested codec (or AUDIO_CODEC), downgraded to wav when ffmpeg is missing."""
+    codec = (codec or AUDIO_CODEC).lower()
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}' (expected one of: {', '.join(CODECS)})")
+    if codec != "wav" and not ffmpeg_available():
+        return "wav"
+    return codec
+
+
+def normalize_audio(
+    chunks: Iterable[bytes],
+    original_bytes: int,
+    codec: Optional[str] = None,
+    sample_rate: int = AUDIO_SAMPLE_RATE,
+    trim_silence: bool = False,
+) -> NormalizedAudio:
+    """
+    Decode, downmix to mono, resample to sample_rate, optionally cut
+    silence, and re-encode.
+
+    Raises:
+        AudioDecodeError: If the audio cannot be decoded or encoded, or
+            trimming found no speech at all
+        ValueError: If codec is unknown
+    """
+    codec = resolve_codec(codec)
+    started = time.perf_counter()
+    chunks = iter(chunks)
+    head = next(chunks, b"")
+    rest = _prepend(head, chunks)
+
+    with tempfile.TemporaryDirectory(prefix="audio-normalize-") as workdir:
+        decoded = None
+        source = None
+        if _is_wav(head):
+            reader = _ChunkReader(rest)
+            try:
+                source = _PcmSource(reader)
+                reader.consumed = None
+            except AudioDecodeError:
+                # e.g. float WAV: let ffmpeg decode it, header included
+                if not ffmpeg_available():
+                    raise
+                rest = reader.replay()
+        if source is None:
+            if not ffmpeg_available():
+                raise AudioDecodeError("Only PCM WAV can be normalized without ffmpeg")
+            decoded = open(_decode_with_ffmpeg(rest, workdir), "rb")
+            source = _PcmSource(decoded)
+
+        out = tempfile.TemporaryFile()
+        sink = _WavSink(out, sample_rate) if codec == "wav" else _FfmpegSink(out, sample_rate, codec)
+        resampler = _Resampler(source.sample_rate, sample_rate)
+        trimmer = SilenceTrimmer(sample_rate) if trim_silence else None
+        samples = 0
+        try:
+            for block in source.blocks():
+                samples += len(block)
+                resampled = resampler.process(block)
+                sink.write(_to_pcm16(trimmer.process(resampled) if trimmer else resampled))
+            resampled = resampler.flush()
+            if trimmer:
+                sink.write(_to_pcm16(np.concatenate([trimmer.process(resampled), trimmer.flush()])))
+                if not trimmer.kept:
+                    # Rather send everything than nothing if the detector is wrong
+                    raise AudioDecodeError("No speech detected")
+            else:
+                sink.write(_to_pcm16(resampled))
+            sink.close()
+        except BaseException:
+            if isinstance(sink, _FfmpegSink):
+                sink.abort()
+            out.close()
+            raise
+        finally:
+            if decoded is not None:
+                decoded.close()
+
+    out.seek(0, os.SEEK_END)
+    sent_bytes = out.tell()
+    stats = {
+        "normalized": True,
+        "codec": codec,
+        "source_sample_rate": source.sample_rate,
+        "source_channels": source.channels,
+        "sample_rate": sample_rate,
+        "duration_seconds": round(samples / source.sample_rate, 2) if source.sample_rate else 0,
+        "original_bytes": original_bytes,
+        "sent_bytes": sent_bytes,
+        "bytes_saved": original_bytes - sent_bytes,
+        "compression_ratio": round(original_bytes / sent_bytes, 2) if sent_bytes else None,
+        "preprocess_seconds": round(time.perf_counter() - started, 3),
+    }
+    if trimmer:
+        stats["silence"] = trimmer.stats()
+    return NormalizedAudio(out, codec, stats, trimmer.offsets if trimmer else None)
+
+
+def _prepend(head: bytes, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    if head:
+        yield head
+    yield from chunks
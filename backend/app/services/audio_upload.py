@@ -0,0 +1,203 @@
+"""
+Streaming receipt of audio uploads.
+
+POST /api/voice/transcribe-file used to read the whole upload into memory
+(twice: Starlette's form parsing, then file.read()). Here the request body
+is consumed as it arrives: the multipart 'file' part (or a raw audio body)
+is written into a SpooledTemporaryFile, which moves to disk past
+UPLOAD_SPOOL_BYTES, while its SHA-256 is computed. Uploads over
+MAX_UPLOAD_BYTES are rejected from the Content-Length header before
+anything is read, or as soon as the streamed body crosses the limit.
+
+The spooled file is then mmap'd and handed to Deepgram as a chunked body,
+so no full copy of the audio is ever held in memory.
+
+Configuration (environment variables):
+- MAX_UPLOAD_BYTES: Largest accepted audio upload (default: 1 GiB)
+- UPLOAD_SPOOL_BYTES: Uploads up to this size stay in memory (default: 8 MiB)
+"""
+
+import hashlib
+import mmap
+import os
+import tempfile
+from typing import Dict, Iterator, Optional
+
+from starlette.requests import Request
+
+try:
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(1024 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(8 * 1024 * 1024)))
+CHUNK_BYTES = 1024 * 1024
+
+FILE_FIELD = "file"
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES."""
+
+
+class UploadFormatError(Exception):
+    """Raised when a request carries no audio to transcribe."""
+
+
+class SpooledAudio:
+    """An uploaded audio file in a spooled temp file, with size and SHA-256."""
+
+    def __init__(self, filename: Optional[str] = None, mimetype: Optional[str] = None):
+        self.filename = filename
+        self.mimetype = mimetype
+        self.size = 0
+        self.file = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+        self._hash = hashlib.sha256()
+        self.sha256: Optional[str] = None
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > MAX_UPLOAD_BYTES:
+            raise UploadTooLargeError(_too_large_message())
+        self._hash.update(data)
+        self.file.write(data)
+
+    def finish(self):
+        self.sha256 = self._hash.hexdigest()
+        self.file.flush()
+
+    def chunks(self, chunk_size: int = CHUNK_BYTES) -> Iterator[bytes]:
+        """The audio in chunks, read through an mmap once spooled to disk."""
+        if not self.size:
+            return
+        if self.size > UPLOAD_SPOOL_BYTES:
+            # Spooled to disk (SpooledTemporaryFile rolls over past max_size)
+            with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for offset in range(0, self.size, chunk_size):
+                    yield mapped[offset:offset + chunk_size]
+        else:
+            # Still in memory (at most UPLOAD_SPOOL_BYTES)
+            self.file.seek(0)
+            while True:
+                chunk = self.file.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def __iter__(self) -> Iterator[bytes]:
+        # Re-iterable, so the audio can be read again (e.g. after a failed normalization)
+        return self.chunks()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _too_large_message() -> str:
+    return f"Upload exceeds the {MAX_UPLOAD_BYTES / (1024 * 1024):.0f} MB limit"
+
+
+class _AudioPartParser:
+    """Multipart callbacks writing the 'file' part into a SpooledAudio."""
+
+    def __init__(self, boundary: bytes):
+        self.audio: Optional[SpooledAudio] = None
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._target: Optional[SpooledAudio] = None
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+        })
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._target = None
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name") != FILE_FIELD.encode() or self.audio is not None:
+            return  # Other form fields are ignored
+        filename = options.get(b"filename")
+        self.audio = SpooledAudio(
+            filename=filename.decode("utf-8", "replace") if filename else None,
+            mimetype=self._headers.get(b"content-type", b"").decode("latin-1") or None,
+        )
+        self._target = self.audio
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._target is not None:
+            self._target.write(data[start:end])
+
+
+async def receive_audio(request: Request) -> SpooledAudio:
+    """
+    Stream an audio upload (multipart 'file' field or raw audio body) into
+    a SpooledAudio. The caller must close() it.
+
+    Raises:
+        UploadTooLargeError: If the upload exceeds MAX_UPLOAD_BYTES
+        UploadFormatError: If the body is malformed, has no 'file' part or is empty
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise UploadTooLargeError(_too_large_message())
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type == b"multipart/form-data":
+        boundary = options.get(b"boundary")
+        if not boundary:
+            raise UploadFormatError("Missing multipart boundary")
+        part_parser = _AudioPartParser(boundary)
+        try:
+            async for chunk in request.stream():
+                part_parser.parser.write(chunk)
+            part_parser.parser.finalize()
+        except BaseException as e:
+            if part_parser.audio is not None:
+                part_parser.audio.close()
+            if isinstance(e, MultipartParseError):
+                raise UploadFormatError(f"Malformed multipart body: {str(e)}")
+            raise
+        audio = part_parser.audio
+        if audio is None:
+            raise UploadFormatError(f"No '{FILE_FIELD}' field in the upload")
+    else:
+        # Raw body, e.g. curl --data-binary @meeting.wav -H "Content-Type: audio/wav"
+        audio = SpooledAudio(mimetype=content_type.decode("latin-1") or None)
+        try:
+            async for chunk in request.stream():
+                audio.write(chunk)
+        except BaseException:
+            audio.close()
+            raise
+
+    audio.finish()
+    if not audio.size:
+        audio.close()
+        raise UploadFormatError("The uploaded file is empty")
+    return audio
@@ -0,0 +1,345 @@
+"""
+Batch processing of archived meeting transcripts (offline backfills).
+
+A batch is a list of transcripts, taken from a directory (every .txt/.md
+file, ID = path relative to the directory) or a manifest (.jsonl with one
+{"id", "path" | "transcript", "project_name"} object per line, paths
+relative to the manifest). Each transcript goes through the 3-agent
+workflow on a thread pool; LLM calls from all workers share the process
+wide NVIDIA rate limiter, so BATCH_WORKERS only bounds how many meetings
+are in progress, not the load on the endpoint.
+
+Results are appended to an NDJSON file, one record per meeting, flushed as
+each meeting finishes. The output file is also the checkpoint: running the
+same batch again skips every ID that already has a "done" record (and
+"failed" ones unless retry_failed is set), so an interrupted run resumes
+where it stopped.
+
+Configuration (environment variables):
+- BATCH_WORKERS: Meetings processed at the same time (default: 4)
+- BATCH_ROOT: Directory that API batches may read from (default: backend/batch)
+- BATCH_OUTPUT_DIR: Where API batches write results (default: backend/.cache/batches)
+"""
+
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from firebase_admin import firestore
+
+from app.services.agent_service import agent_service
+
+_BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+BATCH_ROOT = Path(os.getenv("BATCH_ROOT", str(_BACKEND_DIR / "batch")))
+BATCH_OUTPUT_DIR = Path(os.getenv("BATCH_OUTPUT_DIR", str(_BACKEND_DIR / ".cache" / "batches")))
+
+TRANSCRIPT_SUFFIXES = (".txt", ".md")
+MANIFEST_SUFFIXES = (".jsonl", ".ndjson")
+
+
+# ============================================================================
+# INPUTS AND CHECKPOINT
+# ============================================================================
+
+def load_items(source: Path) -> List[Dict[str, Any]]:
+    """
+    Batch items from a transcript directory or a .jsonl manifest.
+
+    Raises:
+        ValueError: If the source does not exist, has an unsupported type
+                    or a manifest line is invalid
+    """
+    source = Path(source)
+    if source.is_dir():
+        return [
+            {"id": path.relative_to(source).as_posix(), "path": str(path), "project_name": None}
+            for path in sorted(source.rglob("*"))
+            if path.is_file() and path.suffix.lower() in TRANSCRIPT_SUFFIXES
+        ]
+    if not source.is_file():
+        raise ValueError(f"{source} does not exist")
+    if source.suffix.lower() not in MANIFEST_SUFFIXES:
+        raise ValueError(f"Unsupported manifest type: {source.suffix} (expected .jsonl)")
+
+    items = []
+    with open(source, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{source}:{line_number}: {str(e)}")
+            if not isinstance(entry, dict) or not (entry.get("path") or entry.get("transcript")):
+                raise ValueError(f"{source}:{line_number}: expected an object with 'path' or 'transcript'")
+            path = entry.get("path")
+            if path and not Path(path).is_absolute():
+                path = str(source.parent / path)
+            items.append({
+                "id": str(entry.get("id") or path or line_number),
+                "path": path,
+                "transcript": entry.get("transcript"),
+                "project_name": entry.get("project_name"),
+            })
+    return items
+
+
+def completed_ids(output_path: Path, retry_failed: bool = False) -> Set[str]:
+    """IDs that already have a final record in an NDJSON output file."""
+    latest: Dict[str, str] = {}
+    if not Path(output_path).exists():
+        return set()
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partial last line of an interrupted run
+            if isinstance(record, dict) and "id" in record:
+                latest[record["id"]] = record.get("status")
+    skip = {"done"} if retry_failed else {"done", "failed"}
+    return {item_id for item_id, status in latest.items() if status in skip}
+
+
+def is_valid_batch_id(batch_id: str) -> bool:
+    """Batch IDs name files, so only letters, digits, '-' and '_' are allowed."""
+    return bool(batch_id) and batch_id.replace("-", "").replace("_", "").isalnum()
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+# ============================================================================
+# RUN
+# ============================================================================
+
+class BatchRun:
+    """One pass over a batch: processes pending items and appends results."""
+
+    def __init__(
+        self,
+        items: List[Dict[str, Any]],
+        output_path: Path,
+        workers: int = BATCH_WORKERS,
+        retry_failed: bool = False,
+        batch_id: Optional[str] = None
+    ):
+        self.id = batch_id or uuid.uuid4().hex[:12]
+        self.items = items
+        self.output_path = Path(output_path)
+        self.workers = max(1, workers)
+        self.retry_failed = retry_failed
+
+        self.status = "pending"
+        self.skipped = 0
+        self.done = 0
+        self.failed = 0
+        self.tickets_created = 0
+        self.tickets_updated = 0
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """Stop starting new meetings; the ones in progress still finish."""
+        self._cancelled.set()
+
+    def run(self, db: firestore.Client, on_progress: Optional[Callable[["BatchRun"], None]] = None):
+        """Process every pending item (blocking)."""
+        self.started_at = time.monotonic()
+        self.status = "running"
+        try:
+            finished = completed_ids(self.output_path, self.retry_failed)
+            pending = [item for item in self.items if item["id"] not in finished]
+            self.skipped = len(self.items) - len(pending)
+            if self.skipped:
+                print(f"[Batch {self.id}] Resuming: {self.skipped} of {len(self.items)} meetings already processed")
+
+            self.output_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.output_path, "a", encoding="utf-8") as out, \
+                    ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"batch-{self.id}") as pool:
+                if out.tell() > 0 and not _ends_with_newline(self.output_path):
+                    out.write("\n")  # Terminate a record cut off by an interruption
+                futures = [pool.submit(self._process, db, item) for item in pending]
+                for future in as_completed(futures):
+                    record = future.result()
+                    if record is None:
+                        continue
+                    out.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+                    out.flush()
+                    os.fsync(out.fileno())
+                    with self._lock:
+                        if record["status"] == "done":
+                            self.done += 1
+                            self.tickets_created += record["ticket_count"]
+                            self.tickets_updated += record.get("updated_count", 0)
+                        else:
+                            self.failed += 1
+                    if on_progress is not None:
+                        on_progress(self)
+            self.status = "cancelled" if self._cancelled.is_set() else "finished"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            traceback.print_exc()
+        finally:
+            self.finished_at = time.monotonic()
+            print(f"[Batch {self.id}] {self.status}: {self.progress_line()}")
+
+    def _process(self, db: firestore.Client, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Run one meeting; returns its output record (None if cancelled before starting)."""
+        if self._cancelled.is_set():
+            return None
+        started = time.monotonic()
+        record: Dict[str, Any] = {"id": item["id"]}
+        try:
+            transcript = item.get("transcript")
+            if transcript is None:
+                transcript = Path(item["path"]).read_text(encoding="utf-8")
+            result = agent_service.process_meeting_transcript(db, transcript, item.get("project_name"))
+            if result["success"]:
+                data = result["data"]
+                record.update({
+                    "status": "done",
+                    "project_id": data["project"]["id"],
+                    "project_name": data["project"]["name"],
+                    "ticket_count": data["ticket_count"],
+                    "updated_count": data["updated_count"],
+                    "ticket_ids": [ticket["id"] for ticket in data["tickets"]],
+                })
+            else:
+                record.update({"status": "failed", "stage": result.get("stage"), "error": result["error"]})
+        except Exception as e:
+            record.update({"status": "failed", "stage": "input", "error": str(e)})
+        record["seconds"] = round(time.monotonic() - started, 3)
+        record["finished_at"] = datetime.now(timezone.utc).isoformat()
+        return record
+
+    def meetings_per_minute(self) -> Optional[float]:
+        """Throughput of this run (resumed items are not counted)."""
+        if self.started_at is None:
+            return None
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        processed = self.done + self.failed
+        return round(processed / (elapsed / 60.0), 2) if elapsed > 0 and processed else 0.0
+
+    def progress_line(self) -> str:
+        total = len(self.items)
+        processed = self.skipped + self.done + self.failed
+        return (
+            f"{processed}/{total} meetings ({self.done} done, {self.failed} failed, "
+            f"{self.skipped} from checkpoint), {self.meetings_per_minute()} meetings/min"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = None
+            if self.started_at is not None:
+                elapsed = round((self.finished_at or time.monotonic()) - self.started_at, 1)
+            return {
+                "id": self.id,
+                "status": self.status,
+                "total": len(self.items),
+                "skipped": self.skipped,
+                "done": self.done,
+                "failed": self.failed,
+                "remaining": len(self.items) - self.skipped - self.done - self.failed,
+                "tickets_created": self.tickets_created,
+                "tickets_updated": self.tickets_updated,
+                "elapsed_seconds": elapsed,
+                "meetings_per_minute": self.meetings_per_minute(),
+                "workers": self.workers,
+                "output": str(self.output_path),
+                "error": self.error,
+            }
+
+
+# ============================================================================
+# API BATCHES
+# ============================================================================
+
+class BatchService:
+    """Runs batches submitted over the API in background threads."""
+
+    def __init__(self):
+        self._runs: Dict[str, BatchRun] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def resolve_input(relative_path: str) -> Path:
+        """
+        Resolve a directory/manifest path below BATCH_ROOT.
+
+        Raises:
+            ValueError: If the path escapes BATCH_ROOT
+        """
+        root = BATCH_ROOT.resolve()
+        path = (root / relative_path).resolve()
+        if path != root and root not in path.parents:
+            raise ValueError(f"Batch input must be inside {root}")
+        return path
+
+    def output_path(self, batch_id: str) -> Path:
+        return BATCH_OUTPUT_DIR / f"{batch_id}.ndjson"
+
+    def start(
+        self,
+        db: firestore.Client,
+        items: List[Dict[str, Any]],
+        batch_id: Optional[str] = None,
+        workers: Optional[int] = None,
+        retry_failed: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Start (or resume, when batch_id names an earlier batch) a batch.
+
+        Raises:
+            ValueError: If a batch with this ID is still running, or the ID is invalid
+        """
+        if batch_id is not None and not is_valid_batch_id(batch_id):
+            raise ValueError("Batch ID may only contain letters, digits, '-' and '_'")
+        with self._lock:
+            existing = self._runs.get(batch_id) if batch_id else None
+            if existing is not None and existing.status in ("pending", "running"):
+                raise ValueError(f"Batch {batch_id} is already running")
+            batch_id = batch_id or uuid.uuid4().hex[:12]
+            run = BatchRun(items, self.output_path(batch_id), workers or BATCH_WORKERS, retry_failed, batch_id)
+            self._runs[run.id] = run
+
+        threading.Thread(target=run.run, args=(db,), name=f"batch-{run.id}", daemon=True).start()
+        print(f"[Batch {run.id}] Started with {len(items)} meetings")
+        return run.stats()
+
+    def get(self, batch_id: str) -> Optional[BatchRun]:
+        with self._lock:
+            return self._runs.get(batch_id)
+
+    def list_batches(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            runs = list(self._runs.values())
+        return [run.stats() for run in runs]
+
+    def shutdown(self):
+        """Cancel running batches; they resume from their output when restarted."""
+        with self._lock:
+            runs = list(self._runs.values())
+        for run in runs:
+            run.cancel()
+
+
+# Singleton instance
+batch_service = BatchService()
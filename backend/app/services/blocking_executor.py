@@ -0,0 +1,240 @@
+"""
+Shared, bounded executor for blocking work called from async routes.
+
+Deepgram transcription, the meeting workflow and live-meeting extraction
+are synchronous. Routes used to create a ThreadPoolExecutor() per request
+(min(32, cpu + 4) threads each, torn down afterwards), so there was no
+limit across requests and a burst of uploads could start hundreds of
+threads that all fought over the same rate-limited APIs.
+
+Now one pool of BLOCKING_WORKERS threads is started and stopped by the
+application lifespan. Up to BLOCKING_QUEUE_LIMIT more tasks may wait for a
+thread. Beyond that, run() fails fast with ExecutorSaturatedError, which
+routes turn into 503 with a Retry-After estimated from the queue length
+and recent task durations. Work that was already accepted (finishing a
+live meeting) can be queued past the limit with bounded=False.
+
+Queue depth, active threads, queue wait and rejections are exported as
+Prometheus metrics and via GET /api/voice/executor.
+
+Configuration (environment variables):
+- BLOCKING_WORKERS: Worker threads (default: 8)
+- BLOCKING_QUEUE_LIMIT: Tasks allowed to wait for a thread (default: 16)
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.services import metrics
+
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "8"))
+BLOCKING_QUEUE_LIMIT = int(os.getenv("BLOCKING_QUEUE_LIMIT", "16"))
+
+# Bounds of the Retry-After hint, in seconds
+RETRY_AFTER_MIN_SECONDS = 1
+RETRY_AFTER_MAX_SECONDS = 120
+
+# Recent task durations and queue waits kept for the estimate and stats
+_SAMPLES = 200
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when every worker is busy and the queue is full."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BlockingExecutor:
+    """Thread pool with a bounded queue, saturation rejection and metrics."""
+
+    def __init__(self, workers: int = BLOCKING_WORKERS, queue_limit: int = BLOCKING_QUEUE_LIMIT):
+        self.workers = max(1, workers)
+        self.queue_limit = max(0, queue_limit)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self._durations: deque = deque(maxlen=_SAMPLES)
+        self._waits: deque = deque(maxlen=_SAMPLES)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="blocking")
+                print(f"[Executor] Started {self.workers} worker(s), queue limit {self.queue_limit}")
+
+    def shutdown(self):
+        """Stop accepting work and drop queued tasks; running tasks finish in the background."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+
+    @property
+    def saturated(self) -> bool:
+        return self.active + self.queued >= self.workers + self.queue_limit
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: queued work spread over the workers."""
+        with self._lock:
+            durations = list(self._durations)
+            backlog = self.queued + 1
+        average = sum(durations) / len(durations) if durations else 5.0
+        estimate = math.ceil(average * backlog / self.workers)
+        return max(RETRY_AFTER_MIN_SECONDS, min(RETRY_AFTER_MAX_SECONDS, estimate))
+
+    def _reject(self, name: str):
+        self.rejected += 1
+        metrics.EXECUTOR_REJECTIONS.inc()
+        print(f"[Executor] Rejected {name}: {self.active} running, {self.queued} queued")
+
+    def check_capacity(self, name: str = "request"):
+        """
+        Raise ExecutorSaturatedError now if a task would be rejected, for
+        work that should not start at all without a worker (e.g. before
+        accepting a WebSocket).
+        """
+        with self._lock:
+            saturated = self.saturated
+            if saturated:
+                self._reject(name)
+        if saturated:
+            raise ExecutorSaturatedError("Server is busy, try again later", self.retry_after())
+
+    async def run(
+        self,
+        fn: Callable,
+        *args,
+        timeout: Optional[float] = None,
+        bounded: bool = True,
+        on_done: Optional[Callable[[], None]] = None
+    ) -> Any:
+        """
+        Run fn(*args) on a worker thread and await its result.
+
+        on_done is called once fn has returned, or when it will never run
+        (rejected or cancelled while queued). A timeout does not stop a
+        started task, so resources it reads (e.g. an upload) are released
+        in on_done rather than by the awaiting caller.
+
+        Raises:
+            ExecutorSaturatedError: If bounded and workers and queue are full
+            RuntimeError: If the executor has not been started
+            asyncio.TimeoutError: If timeout elapses (a started task keeps running)
+        """
+        name = getattr(fn, "__name__", "task")
+        with self._lock:
+            if self._executor is None:
+                if on_done is not None:
+                    on_done()
+                raise RuntimeError("Blocking executor is not running")
+            saturated = bounded and self.saturated
+            if saturated:
+                self._reject(name)
+            else:
+                self.queued += 1
+                self.max_queue_depth = max(self.max_queue_depth, self.queued)
+                metrics.EXECUTOR_QUEUE_DEPTH.inc()
+                executor = self._executor
+        if saturated:
+            if on_done is not None:
+                on_done()
+            raise ExecutorSaturatedError("Server is busy, try again later", self.retry_after())
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self._waits.append(started - submitted)
+            metrics.EXECUTOR_QUEUE_DEPTH.dec()
+            metrics.EXECUTOR_ACTIVE_THREADS.inc()
+            metrics.EXECUTOR_WAIT_SECONDS.observe(started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+                    self._durations.append(time.perf_counter() - started)
+                metrics.EXECUTOR_ACTIVE_THREADS.dec()
+
+        def release(future):
+            # Cancelled while queued (timeout, client gone, shutdown): task() never ran
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+                metrics.EXECUTOR_QUEUE_DEPTH.dec()
+            if on_done is not None:
+                try:
+                    on_done()
+                except Exception as e:
+                    print(f"[Executor] Cleanup after {name} failed: {str(e)}")
+
+        try:
+            future = executor.submit(task)
+        except RuntimeError:
+            # Shut down between the check and the submit
+            with self._lock:
+                self.queued -= 1
+            metrics.EXECUTOR_QUEUE_DEPTH.dec()
+            if on_done is not None:
+                on_done()
+            raise RuntimeError("Blocking executor is not running")
+        future.add_done_callback(release)
+
+        # Cancelling the await (timeout or disconnect) drops the task if it has not started
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            durations = list(self._durations)
+
+            def percentile(p: float) -> Optional[float]:
+                if not waits:
+                    return None
+                return round(waits[min(len(waits) - 1, int(p * len(waits)))], 4)
+
+            return {
+                "running": self._executor is not None,
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "active_threads": self.active,
+                "queue_depth": self.queued,
+                "max_queue_depth": self.max_queue_depth,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_p50_seconds": percentile(0.5),
+                "wait_p95_seconds": percentile(0.95),
+                "avg_task_seconds": round(sum(durations) / len(durations), 3) if durations else None,
+            }
+
+
+# Singleton instance, started by the application lifespan
+blocking_executor = BlockingExecutor()
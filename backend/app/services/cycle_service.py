@@ -3,6 +3,7 @@ Cycle service for Firestore operations.
 
 This service handles CRUD operations for cycles (sprints) in Firestore.
 Collection: /cycles/{cycleId}
+    (or /projects/{projectId}/cycles/{cycleId}, see data_layout)
 """
 
 from firebase_admin import firestore
@@ -11,6 +12,7 @@ from typing import List, Optional
 from datetime import datetime
 
 from app.models.schemas import CycleCreate, CycleUpdate
+from app.services import data_layout, aggregations, ticket_events
 
 
 class CycleService:
@@ -26,8 +28,8 @@ class CycleService:
         cycle_dict["updated_at"] = now
 
         # Create document with auto-generated ID
-        doc_ref = db.collection(CycleService.COLLECTION).document()
-        doc_ref.set(cycle_dict)
+        doc_ref = data_layout.new_document(db, CycleService.COLLECTION, cycle_dict["project_id"])
+        doc_ref.set(data_layout.with_layout_fields(cycle_dict, doc_ref.id))
 
         # Return created cycle with ID
         cycle_dict["id"] = doc_ref.id
@@ -39,13 +41,7 @@ class CycleService:
     @staticmethod
     def get_all_cycles(db: firestore.Client, project_id: Optional[str] = None) -> List[dict]:
         """Get all cycles, optionally filtered by project, ordered by start_date (desc)."""
-        cycles_ref = db.collection(CycleService.COLLECTION)
-
-        if project_id is not None:
-            query = cycles_ref.where(filter=FieldFilter("project_id", "==", project_id))
-            docs = query.stream()
-        else:
-            docs = cycles_ref.stream()
+        docs = data_layout.project_query(db, CycleService.COLLECTION, project_id).stream()
 
         cycles = []
         for doc in docs:
@@ -58,13 +54,17 @@ class CycleService:
 
         return cycles
 
+    @staticmethod
+    def count_cycles(db: firestore.Client, project_id: Optional[str] = None) -> int:
+        """Count cycles, optionally filtered by project, using an aggregation query."""
+        return aggregations.count(data_layout.project_query(db, CycleService.COLLECTION, project_id))
+
     @staticmethod
     def get_cycle_by_id(db: firestore.Client, cycle_id: str) -> Optional[dict]:
         """Get a single cycle by ID."""
-        doc_ref = db.collection(CycleService.COLLECTION).document(cycle_id)
-        doc = doc_ref.get()
+        doc = data_layout.get_document(db, CycleService.COLLECTION, cycle_id)
 
-        if not doc.exists:
+        if doc is None:
             return None
 
         cycle = doc.to_dict()
@@ -74,11 +74,12 @@ class CycleService:
     @staticmethod
     def update_cycle(db: firestore.Client, cycle_id: str, update_data: CycleUpdate) -> Optional[dict]:
         """Update a cycle."""
-        doc_ref = db.collection(CycleService.COLLECTION).document(cycle_id)
+        doc = data_layout.get_document(db, CycleService.COLLECTION, cycle_id)
 
         # Check if cycle exists
-        if not doc_ref.get().exists:
+        if doc is None:
             return None
+        doc_ref = doc.reference
 
         update_dict = update_data.model_dump(exclude_unset=True)
         update_dict["updated_at"] = firestore.SERVER_TIMESTAMP
@@ -99,14 +100,15 @@ class CycleService:
 
         Note: This sets cycle_id to null in all tickets belonging to this cycle.
         """
-        doc_ref = db.collection(CycleService.COLLECTION).document(cycle_id)
+        doc = data_layout.get_document(db, CycleService.COLLECTION, cycle_id)
 
         # Check if cycle exists
-        if not doc_ref.get().exists:
+        if doc is None:
             return False
+        doc_ref = doc.reference
 
         # Update all tickets in this cycle (set cycle_id to null)
-        tickets_ref = db.collection("tickets")
+        tickets_ref = data_layout.scoped_collection(db, "tickets", doc.get("project_id"))
         query = tickets_ref.where(filter=FieldFilter("cycle_id", "==", cycle_id))
         tickets = list(query.stream())
 
@@ -121,6 +123,12 @@ class CycleService:
 
         # Delete cycle
         doc_ref.delete()
+        flat = data_layout.flat_original(db, CycleService.COLLECTION, doc_ref)
+        if flat is not None:
+            flat.delete()
+
+        if tickets:
+            ticket_events.reset(doc.get("project_id"))
 
         return True
 
@@ -0,0 +1,160 @@
+"""
+Firestore data layout helpers.
+
+The backend supports two layouts for project-owned entities
+(tickets, labels, cycles, modules):
+
+- "flat" (default): top-level collections filtered by project_id
+    /tickets/{ticketId}
+- "subcollections": documents nested under their project
+    /projects/{projectId}/tickets/{ticketId}
+
+Select the layout with the FIRESTORE_LAYOUT environment variable.
+In the nested layout, cross-project views use collection-group queries
+and every document carries its own "id" field so it can be looked up
+without knowing its project. Entities without a project_id are kept in
+the top-level collection, which collection-group queries also cover.
+
+Documents written for the nested layout are also marked with
+layout="subcollections". Until the migration's cleanup phase, the flat
+originals of migrated documents still sit in the top-level collections,
+where a collection-group query would find them next to their nested
+copies; cross-project queries only match marked documents to skip them.
+Deleting a nested document deletes its flat original as well, so the
+migration's sync phase cannot bring it back.
+
+Use migration/migrate_to_subcollections.py to move existing data.
+"""
+
+import os
+from firebase_admin import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+from typing import Optional
+
+PROJECTS_COLLECTION = "projects"
+
+# Collections that belong to a project and can be nested under it
+PROJECT_SCOPED_COLLECTIONS = ("tickets", "labels", "cycles", "modules")
+
+FLAT = "flat"
+SUBCOLLECTIONS = "subcollections"
+
+# Marks documents written for the nested layout (see module docstring)
+LAYOUT_FIELD = "layout"
+# Set by the migration on nested copies of flat documents; the sync phase
+# deletes such copies when their flat original was deleted
+MIGRATED_FIELD = "migrated_from_flat"
+
+
+def get_layout() -> str:
+    """Get the configured layout (read fresh from environment)."""
+    layout = os.getenv("FIRESTORE_LAYOUT", FLAT).strip().lower()
+    if layout not in (FLAT, SUBCOLLECTIONS):
+        raise ValueError(
+            f"Invalid FIRESTORE_LAYOUT '{layout}'. Expected '{FLAT}' or '{SUBCOLLECTIONS}'."
+        )
+    return layout
+
+
+def uses_subcollections() -> bool:
+    """Whether project-owned entities are stored under projects/{id}/..."""
+    return get_layout() == SUBCOLLECTIONS
+
+
+def scoped_collection(db: firestore.Client, name: str, project_id: Optional[str]):
+    """
+    Get the collection that holds (or should hold) documents of a project.
+
+    Args:
+        db: Firestore client
+        name: Collection name (e.g. "tickets")
+        project_id: Owning project, or None for unscoped documents
+
+    Returns:
+        CollectionReference for writes and project-scoped reads
+    """
+    if project_id and uses_subcollections():
+        return (
+            db.collection(PROJECTS_COLLECTION)
+            .document(project_id)
+            .collection(name)
+        )
+    return db.collection(name)
+
+
+def project_query(db: firestore.Client, name: str, project_id: Optional[str] = None):
+    """
+    Build a query over a project's documents, or over all projects.
+
+    Flat layout filters the top-level collection by project_id. The nested
+    layout reads the project's subcollection directly, and falls back to a
+    collection-group query when no project is given.
+    """
+    if uses_subcollections():
+        if project_id is not None:
+            return scoped_collection(db, name, project_id)
+        return _current_documents(db, name)
+
+    col_ref = db.collection(name)
+    if project_id is not None:
+        return col_ref.where(filter=FieldFilter("project_id", "==", project_id))
+    return col_ref
+
+
+def cross_project_query(db: firestore.Client, name: str):
+    """Query spanning every project (collection group in the nested layout)."""
+    if uses_subcollections():
+        return _current_documents(db, name)
+    return db.collection(name)
+
+
+def _current_documents(db: firestore.Client, name: str):
+    """Collection group without the not yet cleaned up flat originals."""
+    return db.collection_group(name).where(filter=FieldFilter(LAYOUT_FIELD, "==", SUBCOLLECTIONS))
+
+
+def flat_original(db: firestore.Client, name: str, doc_ref):
+    """
+    Top-level pre-migration copy of a nested document (None in the flat
+    layout or for top-level documents). Delete it with the document.
+    """
+    if not uses_subcollections() or doc_ref.parent.parent is None:
+        return None
+    return db.collection(name).document(doc_ref.id)
+
+
+def get_document(db: firestore.Client, name: str, doc_id: str):
+    """
+    Fetch a document snapshot by ID regardless of its owning project.
+
+    Returns:
+        DocumentSnapshot, or None if no such document exists
+    """
+    if not uses_subcollections():
+        doc = db.collection(name).document(doc_id).get()
+        return doc if doc.exists else None
+
+    # Nested documents store their own ID so a collection-group lookup works
+    query = db.collection_group(name).where(filter=FieldFilter("id", "==", doc_id)).limit(1)
+    docs = list(query.stream())
+    if docs:
+        return docs[0]
+
+    # Documents written before the migration may lack the "id" field
+    doc = db.collection(name).document(doc_id).get()
+    return doc if doc.exists else None
+
+
+def new_document(db: firestore.Client, name: str, project_id: Optional[str]):
+    """Create a new document reference in the right place for the layout."""
+    return scoped_collection(db, name, project_id).document()
+
+
+def with_layout_fields(data: dict, doc_id: str) -> dict:
+    """Add fields the nested layout relies on (the document's own ID and the layout marker)."""
+    if uses_subcollections():
+        data["id"] = doc_id
+        data[LAYOUT_FIELD] = SUBCOLLECTIONS
+        # Written by the app (e.g. a moved ticket), no longer a migration copy
+        data.pop(MIGRATED_FIELD, None)
+    return data
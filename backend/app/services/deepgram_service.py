@@ -5,121 +5,359 @@ This service handles both:
 1. Live audio streaming transcription (WebSocket)
 2. Pre-recorded file transcription (REST API)
 
-Requires DEEPGRAM_API_KEY in environment variables.
+Requires DEEPGRAM_API_KEY in environment variables. The client and its
+connection pool are reused until the key changes and closed on shutdown.
+
+Uploads are normalized before they are sent (mono, 16 kHz, Opus by
+default; see audio_preprocess), per call or with AUDIO_NORMALIZE, and
+long silences are cut (voice_activity, VAD_ENABLED). Word timestamps
+are mapped back to the uploaded recording.
+
+With API_REPLAY_MODE=record or replay (see api_replay), file transcription
+calls the REST endpoint directly so the exchange can be recorded or served
+by the stand-in server; the request is the one the SDK sends.
+
+Configuration (environment variables):
+- DEEPGRAM_API_KEY: API key (read on every use, so it can be rotated)
+- DEEPGRAM_TIMEOUT_SECONDS: Read timeout of transcription requests (default: 120)
+- DEEPGRAM_LIVE_URL: Live transcription WebSocket (default: wss://api.deepgram.com/v1/listen)
 """
 
 import os
-from typing import Dict, Any
+import threading
+import time
+from urllib.parse import urlencode
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import httpx
 from deepgram import DeepgramClient
 
+from app.services import api_replay
+from app.services import audio_preprocess
+from app.services import voice_activity
+
+DEEPGRAM_URL = "https://api.deepgram.com"
+# Read timeout of transcription requests (the route gives up after 2 minutes)
+DEEPGRAM_TIMEOUT_SECONDS = float(os.getenv("DEEPGRAM_TIMEOUT_SECONDS", "120"))
+
+# Options for pre-recorded transcription (SDK keyword arguments and REST query)
+TRANSCRIBE_OPTIONS = {
+    "model": "nova-2",
+    "smart_format": True,
+    "diarize": True,
+    "punctuate": True,
+    "paragraphs": True,
+    "utterances": True,
+    "language": "en",
+}
+
+
+# Live (WebSocket) transcription: interim results for display, finals for extraction
+DEEPGRAM_LIVE_URL = os.getenv("DEEPGRAM_LIVE_URL", "wss://api.deepgram.com/v1/listen")
+LIVE_OPTIONS = {
+    "model": "nova-2",
+    "smart_format": True,
+    "punctuate": True,
+    "diarize": True,
+    "interim_results": True,
+    "language": "en",
+}
+# Audio format options a live client may set (raw PCM needs encoding and sample_rate)
+LIVE_CLIENT_OPTIONS = ("encoding", "sample_rate", "channels", "language")
+
+
+def _field(obj, name: str):
+    """Attribute of an SDK response object or key of a REST JSON response."""
+    if obj is None:
+        return None
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
 
 class DeepgramService:
     """Service for handling Deepgram transcription operations."""
     
     def __init__(self):
         """Initialize Deepgram service (client created lazily on first use)."""
-        self._client = None  # Lazy initialization
-        # Don't cache API key - read it fresh each time from environment
+        # One client (and connection pool) per configured key; the key itself
+        # is read fresh from the environment so a changed key takes effect
+        self._current: Optional[Tuple[str, DeepgramClient]] = None  # (key, client), swapped atomically
+        self._http: Optional[httpx.Client] = None
+        self._retired: List[httpx.Client] = []  # Pools of replaced clients, closed in close()
+        self._lock = threading.Lock()
 
     @property
     def api_key(self):
         """Get API key from environment (fresh read each time)."""
         return os.getenv("DEEPGRAM_API_KEY")
+
+    def has_api_key(self) -> bool:
+        """Whether a key is configured (no client is built)."""
+        return bool(self.api_key)
     
     @property
     def client(self):
-        """Lazy-load Deepgram client on first use."""
-        # Always recreate client to get fresh API key from environment
-        if not self.api_key:
+        """Deepgram client for the current key, built on first use and after a key change."""
+        api_key = self.api_key
+        if not api_key:
             raise ValueError(
                 "DEEPGRAM_API_KEY not found in environment variables. "
                 "Please add it to your .env file."
             )
-        print(f"[Deepgram] Initializing client with key: {self.api_key[:8] if self.api_key else 'None'}...")
-        self._client = DeepgramClient(api_key=self.api_key)
-        print("[Deepgram] Client initialized successfully")
-        return self._client
+        current = self._current
+        if current is not None and current[0] == api_key:
+            return current[1]
+
+        with self._lock:
+            if self._current is not None and self._current[0] == api_key:
+                return self._current[1]
+            if self._http is not None:
+                # Requests may still be in flight on the old pool
+                self._retired.append(self._http)
+                print("[Deepgram] API key changed, rebuilding client")
+            print(f"[Deepgram] Initializing client with key: {api_key[:8]}...")
+            self._http = httpx.Client(timeout=httpx.Timeout(DEEPGRAM_TIMEOUT_SECONDS, connect=10.0))
+            client = DeepgramClient(api_key=api_key, httpx_client=self._http)
+            self._current = (api_key, client)
+            print("[Deepgram] Client initialized successfully")
+            return client
 
     def _ensure_client(self):
         """Ensure client is initialized before use."""
         # Trigger lazy initialization by accessing the property
         _ = self.client
+
+    def close(self):
+        """Close the client's connection pools (app shutdown)."""
+        with self._lock:
+            pools = self._retired + ([self._http] if self._http is not None else [])
+            self._current = None
+            self._http = None
+            self._retired = []
+        for pool in pools:
+            pool.close()
     
     def transcribe_file(
         self, 
-        file_content: bytes, 
-        mimetype: str = "audio/wav"
+        file_content: Union[bytes, Iterable[bytes]], 
+        mimetype: str = "audio/wav",
+        size: Optional[int] = None,
+        normalize: Optional[bool] = None,
+        codec: Optional[str] = None,
+        trim_silence: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
         Transcribe a pre-recorded audio file.
         
         Args:
-            file_content: Audio file bytes
+            file_content: Audio file bytes, or chunks that are sent as a
+                          chunked request body. Normalization needs content
+                          it can read twice (bytes or a re-iterable such as
+                          SpooledAudio) to fall back to the original.
             mimetype: MIME type of the audio file (e.g., 'audio/wav', 'audio/mp3')
+            size: Total bytes when file_content is an iterator (for logging)
+            normalize: Downmix/resample/re-encode first (default: AUDIO_NORMALIZE)
+            codec: opus, flac or wav (default: AUDIO_CODEC)
+            trim_silence: Cut long pauses while normalizing (default: VAD_ENABLED)
         
         Returns:
-            Dict containing transcript and metadata
+            Dict containing transcript, words (timestamps in the original
+            audio) and metadata (with a 'preprocess' report: bytes saved,
+            silence removed and the time it took)
+        
+        Raises:
+            ValueError: If the API key is missing or codec is unknown
         """
-        self._ensure_client()
+        if isinstance(file_content, (bytes, bytearray)):
+            size = len(file_content)
+        if normalize is None:
+            normalize = audio_preprocess.AUDIO_NORMALIZE
+        if normalize:
+            # Unknown codecs are a caller error, not a reason to skip normalization
+            audio_preprocess.resolve_codec(codec)
+
+        if trim_silence is None:
+            trim_silence = voice_activity.VAD_ENABLED
+
+        prepared, report = (
+            self._normalize(file_content, size, codec, trim_silence) if normalize
+            else (None, {"normalized": False, "reason": "disabled"})
+        )
+        if prepared is not None:
+            file_content, mimetype, size = prepared, prepared.mimetype, prepared.size
+        try:
+            started = time.perf_counter()
+            result = self._transcribe(file_content, mimetype, size)
+            transcribe_seconds = time.perf_counter() - started
+        finally:
+            if prepared is not None:
+                prepared.close()
+
+        if result["success"]:
+            metadata = result["data"]["metadata"]
+            if prepared is not None and prepared.offsets is not None:
+                self._restore_timestamps(result["data"], prepared.offsets, report["silence"], transcribe_seconds)
+            metadata["preprocess"] = report
+            metadata["transcribe_seconds"] = round(transcribe_seconds, 3)
+        return result
+
+    @staticmethod
+    def _restore_timestamps(data: Dict[str, Any], offsets, silence: Dict[str, Any], transcribe_seconds: float):
+        """Map word times of trimmed audio to the original and estimate the time saved."""
+        for word in data.get("words", []):
+            word["start"] = round(offsets.to_original(word["start"]), 3)
+            word["end"] = round(offsets.to_original(word["end"]), 3)
+        data["metadata"]["transcribed_duration"] = data["metadata"]["duration"]
+        data["metadata"]["duration"] = silence["original_seconds"]
+        # Transcription time grows with audio length: extrapolate to the untrimmed audio
+        if silence["kept_seconds"]:
+            saved = transcribe_seconds * silence["removed_seconds"] / silence["kept_seconds"]
+            silence["transcribe_seconds_saved"] = round(saved, 3)
+
+    @staticmethod
+    def _normalize(
+        file_content: Union[bytes, Iterable[bytes]], size: Optional[int], codec: Optional[str], trim_silence: bool
+    ) -> Tuple[Optional[audio_preprocess.NormalizedAudio], Dict[str, Any]]:
+        """Normalized audio and its report, or (None, reason) to send the original."""
+        if not isinstance(file_content, (bytes, bytearray)) and iter(file_content) is file_content:
+            return None, {"normalized": False, "reason": "one-shot stream cannot fall back to the original"}
+        chunks = [file_content] if isinstance(file_content, (bytes, bytearray)) else file_content
+        try:
+            prepared = audio_preprocess.normalize_audio(chunks, size or 0, codec, trim_silence=trim_silence)
+        except audio_preprocess.AudioDecodeError as e:
+            print(f"Audio not normalized: {str(e)}")
+            return None, {"normalized": False, "reason": str(e)}
+        except Exception as e:
+            print(f"Audio normalization failed: {str(e)}")
+            return None, {"normalized": False, "reason": f"{type(e).__name__}: {str(e)}"}
+
+        report = prepared.stats
+        if size and prepared.size >= size:
+            prepared.close()
+            return None, {**report, "normalized": False, "reason": "not smaller than the upload", "sent_bytes": size, "bytes_saved": 0}
+        print(f"Normalized audio: {size} -> {prepared.size} bytes ({prepared.codec}, "
+              f"{report['source_channels']}ch {report['source_sample_rate']} Hz -> mono {report['sample_rate']} Hz) "
+              f"in {report['preprocess_seconds']}s")
+        if "silence" in report:
+            silence = report["silence"]
+            print(f"Trimmed silence: {silence['removed_seconds']}s of {silence['original_seconds']}s "
+                  f"({silence['reduction_ratio']:.0%}, {silence['cuts']} cuts)")
+        return prepared, report
+
+    def _transcribe(self, file_content: Union[bytes, Iterable[bytes]], mimetype: str, size: Optional[int]) -> Dict[str, Any]:
+        """One transcription request with the SDK (or plain HTTP when recording/replaying)."""
+        if api_replay.recording() or api_replay.replaying():
+            return self._transcribe_http(file_content, mimetype)
+
+        client = self.client
         
         try:
-            print(f"Transcribing {len(file_content)} bytes of audio...")
+            print(f"Transcribing {size if size is not None else 'streamed'} bytes of audio...")
             
             # Transcribe using Deepgram v5 API (synchronous call)
             # v5 API structure: client.listen.v1.media.transcribe_file()
-            response = self.client.listen.v1.media.transcribe_file(
-                request=file_content,
-                model="nova-2",
-                smart_format=True,
-                diarize=True,
-                punctuate=True,
-                paragraphs=True,
-                utterances=True,
-                language="en"
+            response = client.listen.v1.media.transcribe_file(
+                request=file_content if isinstance(file_content, (bytes, bytearray)) else iter(file_content),
+                **TRANSCRIBE_OPTIONS
             )
             
             print("Deepgram response received")
             print(f"Response type: {type(response)}")
+            return self._parse_response(response)
             
-            # Parse response - v5 uses object attributes, not dict
-            if not response.results or not response.results.channels:
-                return {
-                    "success": False,
-                    "error": "No transcription results returned"
-                }
-            
-            channel = response.results.channels[0]
-            if not channel.alternatives:
-                return {
-                    "success": False,
-                    "error": "No transcript alternatives found"
-                }
-            
-            alternative = channel.alternatives[0]
-            transcript_text = alternative.transcript or ""
-            
-            print(f"Transcript length: {len(transcript_text)} characters")
-            
-            # Build simplified response with just the essentials
-            transcript_data = {
-                "transcript": transcript_text,
-                "metadata": {
-                    "duration": getattr(response.metadata, "duration", 0) if response.metadata else 0,
-                    "channels": getattr(response.metadata, "channels", 1) if response.metadata else 1,
-                },
-            }
-            
+        except Exception as e:
             return {
-                "success": True,
-                "data": transcript_data,
+                "success": False,
+                "error": str(e),
             }
-            
+
+    def _transcribe_http(self, file_content: Union[bytes, Iterable[bytes]], mimetype: str) -> Dict[str, Any]:
+        """transcribe_file over plain HTTP, recorded or replayed by api_replay."""
+        if not isinstance(file_content, (bytes, bytearray)):
+            # Fixtures are keyed by the whole body; benchmark inputs are small
+            file_content = b"".join(file_content)
+        api_key = self.api_key
+        if not api_key:
+            if not api_replay.replaying():
+                raise ValueError(
+                    "DEEPGRAM_API_KEY not found in environment variables. "
+                    "Please add it to your .env file."
+                )
+            api_key = "replay"
+
+        try:
+            print(f"Transcribing {len(file_content)} bytes of audio ({api_replay.MODE} mode)...")
+            params = {k: str(v).lower() if isinstance(v, bool) else v for k, v in TRANSCRIBE_OPTIONS.items()}
+            with api_replay.http_client("deepgram", timeout=DEEPGRAM_TIMEOUT_SECONDS) as http:
+                response = http.post(
+                    f"{api_replay.base_url('deepgram', DEEPGRAM_URL)}/v1/listen",
+                    params=params,
+                    content=file_content,
+                    headers={"Authorization": f"Token {api_key}", "Content-Type": mimetype},
+                )
+            response.raise_for_status()
+            return self._parse_response(response.json())
+
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
             }
+
+    @staticmethod
+    def _parse_response(response) -> Dict[str, Any]:
+        """Transcript and metadata from an SDK response object or REST JSON."""
+        # Parse response - v5 uses object attributes, the REST API plain JSON
+        results = _field(response, "results")
+        channels = _field(results, "channels")
+        if not results or not channels:
+            return {
+                "success": False,
+                "error": "No transcription results returned"
+            }
+        
+        alternatives = _field(channels[0], "alternatives")
+        if not alternatives:
+            return {
+                "success": False,
+                "error": "No transcript alternatives found"
+            }
+        
+        transcript_text = _field(alternatives[0], "transcript") or ""
+        words = [
+            {
+                "word": _field(word, "punctuated_word") or _field(word, "word"),
+                "start": _field(word, "start"),
+                "end": _field(word, "end"),
+                "speaker": _field(word, "speaker"),
+            }
+            for word in (_field(alternatives[0], "words") or [])
+        ]
+        
+        print(f"Transcript length: {len(transcript_text)} characters")
+        
+        # Build simplified response with just the essentials
+        metadata = _field(response, "metadata")
+        transcript_data = {
+            "transcript": transcript_text,
+            "words": words,
+            "metadata": {
+                "duration": (_field(metadata, "duration") or 0) if metadata else 0,
+                "channels": (_field(metadata, "channels") or 1) if metadata else 1,
+            },
+        }
+        
+        return {
+            "success": True,
+            "data": transcript_data,
+        }
     
+    def live_url(self, **options) -> str:
+        """URL of the live transcription WebSocket with LIVE_OPTIONS plus client audio options."""
+        params = dict(LIVE_OPTIONS)
+        params.update({k: v for k, v in options.items() if k in LIVE_CLIENT_OPTIONS and v})
+        query = urlencode({k: str(v).lower() if isinstance(v, bool) else v for k, v in params.items()})
+        return f"{DEEPGRAM_LIVE_URL}?{query}"
+
     def get_client(self) -> DeepgramClient:
         """
         Get Deepgram client for live streaming.
@@ -0,0 +1,343 @@
+"""
+Ticket dependency graph engine.
+
+Tickets list the tickets they depend on in dependency_ids. For each
+project an in-memory DAG is loaded once and then kept current from
+ticket_events (each write touches only that ticket's edges), so
+critical-path queries never rescan Firestore.
+
+Provides:
+- Cycle detection
+- Topological order
+- Critical path (CPM) weighted by remaining estimated_hours, with earliest
+  and latest start/finish and slack for every ticket, plus the matching
+  business-day dates from an anchor date
+"""
+
+import heapq
+import threading
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+from firebase_admin import firestore
+
+from app.services import ticket_events
+from app.services.ticket_service import ticket_service, DONE_STATUSES
+
+# Working hours in a day when converting hour offsets to dates
+HOURS_PER_DAY = 8.0
+
+# Floating point tolerance when deciding whether slack is zero
+_EPSILON = 1e-9
+
+# Loads restarted by a reset mid-load before the scan is used uncached
+GRAPH_LOAD_ATTEMPTS = 3
+
+
+class DependencyCycleError(ValueError):
+    """Raised when the dependency graph contains a cycle."""
+
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__(f"Dependency cycle detected (each ticket depends on the next): {' -> '.join(cycle)}")
+
+
+def _status_value(status) -> Optional[str]:
+    return status.value if hasattr(status, "value") else status
+
+
+class ProjectGraph:
+    """Dependency DAG of one project's tickets."""
+
+    def __init__(self):
+        self.nodes: Dict[str, dict] = {}
+        # ticket -> tickets it depends on (as written on the ticket)
+        self.depends_on: Dict[str, Set[str]] = {}
+        # ticket -> tickets that depend on it
+        self.dependents: Dict[str, Set[str]] = {}
+
+    def upsert(self, ticket: dict):
+        """Add or replace a ticket and its outgoing dependency edges."""
+        ticket_id = ticket["id"]
+        hours = ticket.get("estimated_hours")
+        self.nodes[ticket_id] = {
+            "id": ticket_id,
+            "title": ticket.get("title"),
+            "status": _status_value(ticket.get("status")),
+            "estimated_hours": hours,
+            "assignee_id": ticket.get("assignee_id"),
+        }
+
+        new_deps = set(ticket.get("dependency_ids") or []) - {ticket_id}
+        old_deps = self.depends_on.get(ticket_id, set())
+        for dep in old_deps - new_deps:
+            self.dependents.get(dep, set()).discard(ticket_id)
+        for dep in new_deps - old_deps:
+            self.dependents.setdefault(dep, set()).add(ticket_id)
+        self.depends_on[ticket_id] = new_deps
+
+    def remove(self, ticket_id: str):
+        """Remove a ticket and its outgoing edges (incoming edges dangle harmlessly)."""
+        self.nodes.pop(ticket_id, None)
+        for dep in self.depends_on.pop(ticket_id, set()):
+            self.dependents.get(dep, set()).discard(ticket_id)
+
+    def apply(self, project_id: str, ticket: Optional[dict], previous: Optional[dict]):
+        """Apply a ticket write (see ticket_events) as seen by this project."""
+        if previous is not None and previous.get("project_id") == project_id:
+            if ticket is None or ticket.get("project_id") != project_id:
+                self.remove(previous["id"])
+        if ticket is not None and ticket.get("project_id") == project_id:
+            self.upsert(ticket)
+
+    def _predecessors(self, ticket_id: str) -> List[str]:
+        """Dependencies that are tickets of this project."""
+        return [d for d in self.depends_on.get(ticket_id, ()) if d in self.nodes]
+
+    def _successors(self, ticket_id: str) -> List[str]:
+        return [d for d in self.dependents.get(ticket_id, ()) if d in self.nodes]
+
+    def find_cycle(self) -> Optional[List[str]]:
+        """
+        Find a dependency cycle, if any (iterative DFS).
+
+        Returns:
+            Ticket IDs forming the cycle, each depending on the next
+            (first ID repeated at the end), or None
+        """
+        WHITE, GREY, BLACK = 0, 1, 2
+        color = {node: WHITE for node in self.nodes}
+
+        for root in sorted(self.nodes):
+            if color[root] != WHITE:
+                continue
+            path = [root]
+            stack = [iter(sorted(self._predecessors(root)))]
+            color[root] = GREY
+            while stack:
+                nxt = next(stack[-1], None)
+                if nxt is None:
+                    color[path.pop()] = BLACK
+                    stack.pop()
+                elif color[nxt] == GREY:
+                    return path[path.index(nxt):] + [nxt]
+                elif color[nxt] == WHITE:
+                    color[nxt] = GREY
+                    path.append(nxt)
+                    stack.append(iter(sorted(self._predecessors(nxt))))
+        return None
+
+    def topological_order(self) -> List[str]:
+        """
+        Tickets ordered so every ticket comes after its dependencies.
+
+        Ties are broken by ticket ID for a stable order.
+
+        Raises:
+            DependencyCycleError: If the graph has a cycle
+        """
+        in_degree = {node: len(self._predecessors(node)) for node in self.nodes}
+        ready = [node for node, degree in in_degree.items() if degree == 0]
+        heapq.heapify(ready)
+
+        order = []
+        while ready:
+            node = heapq.heappop(ready)
+            order.append(node)
+            for succ in self._successors(node):
+                in_degree[succ] -= 1
+                if in_degree[succ] == 0:
+                    heapq.heappush(ready, succ)
+
+        if len(order) != len(self.nodes):
+            raise DependencyCycleError(self.find_cycle() or [])
+        return order
+
+    def critical_path(self, anchor: Optional[date] = None, hours_per_day: float = HOURS_PER_DAY) -> Dict[str, Any]:
+        """
+        Critical path analysis over remaining work.
+
+        Each ticket's duration is its estimated_hours (0 when unknown or
+        already done). Earliest start/finish are forward-pass values, latest
+        start/finish backward-pass values; zero-slack tickets are critical.
+        Hour offsets become business-day dates counted from anchor.
+
+        Raises:
+            DependencyCycleError: If the graph has a cycle
+        """
+        order = self.topological_order()
+        anchor = anchor or datetime.now(timezone.utc).date()
+        index = {node: i for i, node in enumerate(order)}
+        n = len(order)
+
+        duration = np.zeros(n)
+        for node, i in index.items():
+            info = self.nodes[node]
+            hours = info["estimated_hours"]
+            if info["status"] not in DONE_STATUSES and isinstance(hours, (int, float)) and hours > 0:
+                duration[i] = float(hours)
+
+        # Forward pass
+        earliest_start = np.zeros(n)
+        for i, node in enumerate(order):
+            preds = [index[p] for p in self._predecessors(node)]
+            if preds:
+                earliest_start[i] = max(earliest_start[p] + duration[p] for p in preds)
+        earliest_finish = earliest_start + duration
+        project_duration = float(earliest_finish.max()) if n else 0.0
+
+        # Backward pass
+        latest_finish = np.full(n, project_duration)
+        for i in range(n - 1, -1, -1):
+            succs = [index[s] for s in self._successors(order[i])]
+            if succs:
+                latest_finish[i] = min(latest_finish[s] - duration[s] for s in succs)
+        latest_start = latest_finish - duration
+        slack = latest_start - earliest_start
+        critical = np.abs(slack) <= _EPSILON
+
+        # Trace one critical chain back from the ticket that finishes last
+        path = []
+        if n:
+            current = int(np.argmax(earliest_finish))
+            while current is not None:
+                path.append(order[current])
+                preds = [
+                    index[p] for p in self._predecessors(order[current])
+                    if critical[index[p]] and abs(earliest_finish[index[p]] - earliest_start[current]) <= _EPSILON
+                ]
+                current = min(preds, key=lambda p: order[p]) if preds else None
+            path.reverse()
+
+        # Hour offsets -> business-day dates from the anchor
+        anchor64 = np.datetime64(anchor, "D")
+        es_dates = np.busday_offset(anchor64, np.floor(earliest_start / hours_per_day).astype(np.int64), roll="forward")
+        ls_dates = np.busday_offset(anchor64, np.floor(latest_start / hours_per_day).astype(np.int64), roll="forward")
+        finish_offset = np.ceil(project_duration / hours_per_day)
+        finish_date = np.busday_offset(anchor64, int(max(finish_offset - 1, 0)), roll="forward")
+
+        tickets = [
+            {
+                **self.nodes[node],
+                "dependency_ids": sorted(self._predecessors(node)),
+                "duration_hours": float(duration[i]),
+                "earliest_start_hours": float(earliest_start[i]),
+                "earliest_finish_hours": float(earliest_finish[i]),
+                "latest_start_hours": float(latest_start[i]),
+                "latest_finish_hours": float(latest_finish[i]),
+                "slack_hours": float(slack[i]),
+                "earliest_start_date": es_dates[i].astype(date),
+                "latest_start_date": ls_dates[i].astype(date),
+                "is_critical": bool(critical[i]),
+            }
+            for i, node in enumerate(order)
+        ]
+
+        return {
+            "anchor_date": anchor,
+            "hours_per_day": hours_per_day,
+            "duration_hours": project_duration,
+            "estimated_finish_date": finish_date.astype(date) if n else anchor,
+            "critical_path": path,
+            "topological_order": order,
+            "tickets": tickets,
+        }
+
+
+class DependencyGraphService:
+    """Per-project dependency graphs kept current from ticket writes."""
+
+    def __init__(self):
+        self._graphs: Dict[str, ProjectGraph] = {}
+        self._results: Dict[str, tuple] = {}
+        # project -> writes seen while its graph was loading (None after a
+        # reset: the scan is stale as a whole)
+        self._loading: Dict[str, Optional[List[tuple]]] = {}
+        self._lock = threading.RLock()
+
+    def get_graph(self, db: firestore.Client, project_id: str) -> ProjectGraph:
+        """Get a project's graph, building it from Firestore on first use."""
+        for attempt in range(GRAPH_LOAD_ATTEMPTS):
+            with self._lock:
+                graph = self._graphs.get(project_id)
+                if graph is not None:
+                    return graph
+                self._loading.setdefault(project_id, [])
+
+            # Load outside the lock so other projects are not blocked on I/O
+            tickets = ticket_service.get_all_tickets(db, project_id)
+
+            with self._lock:
+                pending = self._loading.pop(project_id, None)
+                if project_id in self._graphs:
+                    return self._graphs[project_id]
+                graph = ProjectGraph()
+                for ticket in tickets:
+                    graph.upsert(ticket)
+                if pending is not None:
+                    # Writes that arrived mid-load, applied over the scan
+                    for ticket, previous in pending:
+                        graph.apply(project_id, ticket, previous)
+                    self._graphs[project_id] = graph
+                    return graph
+
+        # Reset during every load: answer from the last scan, without caching it
+        print(f"[Graph] Project {project_id} kept changing while loading, graph not cached")
+        return graph
+
+    def get_critical_path(self, db: firestore.Client, project_id: str, anchor: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Critical path of a project, cached until one of its tickets changes.
+
+        Raises:
+            DependencyCycleError: If the project's dependencies form a cycle
+        """
+        anchor = anchor or datetime.now(timezone.utc).date()
+        graph = self.get_graph(db, project_id)
+
+        with self._lock:
+            cached = self._results.get(project_id)
+            if cached is not None and cached[0] == anchor:
+                return cached[1]
+            result = {"project_id": project_id, **graph.critical_path(anchor)}
+            # An uncached graph (or one replaced meanwhile) may be stale: don't keep its result
+            if self._graphs.get(project_id) is graph:
+                self._results[project_id] = (anchor, result)
+            return result
+
+    def invalidate(self, project_id: Optional[str] = None):
+        """Drop a project's graph (or every graph) so it is rebuilt."""
+        with self._lock:
+            if project_id is None:
+                self._graphs.clear()
+                self._results.clear()
+            else:
+                self._graphs.pop(project_id, None)
+                self._results.pop(project_id, None)
+
+    def on_ticket_event(self, event: str, ticket: Optional[dict], previous: Optional[dict]):
+        """ticket_events listener: apply the change to loaded graphs."""
+        if event == "reset":
+            project_id = ticket.get("project_id") if ticket else None
+            self.invalidate(project_id)
+            with self._lock:
+                for loading in self._loading:
+                    if project_id is None or loading == project_id:
+                        self._loading[loading] = None
+            return
+
+        with self._lock:
+            for project_id in ticket_events.affected_projects(ticket, previous):
+                graph = self._graphs.get(project_id)
+                if graph is not None:
+                    graph.apply(project_id, ticket, previous)
+                self._results.pop(project_id, None)
+                pending = self._loading.get(project_id)
+                if pending is not None:
+                    pending.append((ticket, previous))
+
+
+# Singleton instance
+dependency_graph_service = DependencyGraphService()
+ticket_events.subscribe(dependency_graph_service.on_ticket_event)
@@ -0,0 +1,420 @@
+"""
+Background jobs for the meeting-processing workflow.
+
+POST /api/voice/jobs stores a job in Firestore and returns immediately; the
+3-agent workflow then runs on a bounded worker pool. The job document is
+updated at every stage (queued → analyzing → creating → diagramming → done,
+or failed), with per-stage timings, so clients can poll it or follow it
+over SSE and the work survives a client disconnect.
+
+Collection: /meeting_jobs/{jobId}
+
+Restart recovery: on startup every job that is not done or failed is
+queued again. Analysis output (ticket_specs) and the IDs of tickets created
+so far are persisted as the job runs, so a recovered job resumes after the
+last completed step instead of creating duplicate tickets. Recovery
+assumes a single backend process owns the job queue.
+
+Configuration (environment variables):
+- JOB_WORKERS: Jobs processed at the same time (default: 2)
+- JOB_QUEUE_LIMIT: Maximum unfinished jobs in this process (default: 100)
+- JOB_MAX_ATTEMPTS: Runs (including recoveries) before a job is failed (default: 3)
+"""
+
+import os
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+from firebase_admin import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from app.models.enums import JobStatus
+from app.services.agent_service import AgentService, TicketCreationSession
+from app.services.ticket_service import ticket_service
+from app.services.single_flight import SingleFlight, request_key, COALESCE_WINDOW_SECONDS
+from app.services import metrics
+
+COLLECTION = "meeting_jobs"
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "100"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+FINISHED_STATUSES = (JobStatus.done.value, JobStatus.failed.value)
+UNFINISHED_STATUSES = (
+    JobStatus.queued.value,
+    JobStatus.analyzing.value,
+    JobStatus.creating.value,
+    JobStatus.diagramming.value,
+)
+
+# Seconds between keep-alive checks on a job event stream
+_WATCH_INTERVAL = 15.0
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are waiting to run."""
+
+
+def _public(job: dict) -> dict:
+    """Job as returned by the API (the transcript can be large)."""
+    return {key: value for key, value in job.items() if key not in ("transcript", "ticket_specs", "input_key")}
+
+
+class JobService:
+    """Runs meeting jobs on a worker pool and tracks them in Firestore."""
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._db: Optional[firestore.Client] = None
+        self._active: set = set()
+        # Input key -> (job ID, finished_at or None while unfinished)
+        self._jobs_by_key: Dict[str, tuple] = {}
+        # Makes concurrent identical submissions create a single job
+        self._submit_flight = SingleFlight("job-submit", window_seconds=0)
+        self._listeners: Dict[str, List[queue.Queue]] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self, db: firestore.Client):
+        """Start the worker pool and re-queue jobs interrupted by a restart."""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._db = db
+            self._executor = ThreadPoolExecutor(max_workers=max(1, JOB_WORKERS), thread_name_prefix="meeting-job")
+
+        recovered = 0
+        docs = db.collection(COLLECTION).where(
+            filter=FieldFilter("status", "in", list(UNFINISHED_STATUSES))
+        ).stream()
+        for doc in docs:
+            job = doc.to_dict()
+            job["id"] = doc.id
+            if job.get("attempts", 0) >= JOB_MAX_ATTEMPTS:
+                self._fail(job["id"], job.get("status"), "Job was interrupted too many times")
+                continue
+            self._schedule(job["id"], job.get("input_key"))
+            recovered += 1
+        if recovered:
+            print(f"[Jobs] Recovered {recovered} unfinished job(s)")
+
+    def shutdown(self):
+        """Stop accepting work; running jobs are recovered on next start."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(
+        self,
+        db: firestore.Client,
+        transcript: str,
+        project_name: Optional[str] = None,
+        stylised_diagram: bool = False
+    ) -> dict:
+        """
+        Persist a new job and queue it.
+
+        Resubmitting the same normalized transcript and options while that
+        job is unfinished (or finished within COALESCE_WINDOW_SECONDS)
+        returns the existing job instead of creating a duplicate.
+
+        Raises:
+            JobQueueFullError: If JOB_QUEUE_LIMIT jobs are already unfinished
+            RuntimeError: If the worker pool has not been started
+        """
+        with self._lock:
+            if self._executor is None:
+                raise RuntimeError("Job workers are not running")
+            if len(self._active) >= JOB_QUEUE_LIMIT:
+                raise JobQueueFullError(f"{len(self._active)} jobs are already queued or running")
+
+        input_key = request_key("process_meeting", transcript, (project_name or "").casefold(), stylised_diagram)
+        return self._submit_flight.do(
+            input_key, self._create_job, db, transcript, project_name, stylised_diagram, input_key
+        )
+
+    def _create_job(
+        self,
+        db: firestore.Client,
+        transcript: str,
+        project_name: Optional[str],
+        stylised_diagram: bool,
+        input_key: str
+    ) -> dict:
+        """Return the matching existing job, or persist and queue a new one."""
+        existing_id = self._existing_job(input_key)
+        if existing_id is not None:
+            existing = self.get_job(db, existing_id)
+            if existing is not None and existing["status"] != JobStatus.failed.value:
+                print(f"[Jobs] Duplicate submission, returning job {existing_id}")
+                return existing
+
+        now = datetime.now(timezone.utc)
+        job = {
+            "status": JobStatus.queued.value,
+            "transcript": transcript,
+            "project_name": project_name,
+            "stylised_diagram": stylised_diagram,
+            "input_key": input_key,
+            "stage_timings": {},
+            "attempts": 0,
+            "tickets_created": 0,
+            "tickets_updated": 0,
+            "ticket_ids": [],
+            "updated_ticket_ids": [],
+            "project_id": None,
+            "result": None,
+            "error": None,
+            "failed_stage": None,
+            "created_at": now,
+            "updated_at": now,
+            "started_at": None,
+            "finished_at": None,
+        }
+        doc_ref = db.collection(COLLECTION).document()
+        doc_ref.set(job)
+        job["id"] = doc_ref.id
+
+        print(f"[Jobs] Queued job {doc_ref.id} ({len(transcript)} chars)")
+        self._schedule(doc_ref.id, input_key)
+        return _public(job)
+
+    def get_job(self, db: firestore.Client, job_id: str) -> Optional[dict]:
+        """Get a job's current state."""
+        doc = db.collection(COLLECTION).document(job_id).get()
+        if not doc.exists:
+            return None
+        job = doc.to_dict()
+        job["id"] = doc.id
+        return _public(job)
+
+    def watch(self, db: firestore.Client, job_id: str) -> Iterator[dict]:
+        """
+        Follow a job until it finishes.
+
+        Yields the current state first, then every update. Updates come from
+        the worker in this process; Firestore is re-read periodically so jobs
+        run by another process are followed too.
+        """
+        listener: queue.Queue = queue.Queue()
+        with self._lock:
+            self._listeners.setdefault(job_id, []).append(listener)
+        try:
+            job = self.get_job(db, job_id)
+            if job is None:
+                return
+            last_updated = job.get("updated_at")
+            yield job
+            while job["status"] not in FINISHED_STATUSES:
+                try:
+                    job = listener.get(timeout=_WATCH_INTERVAL)
+                except queue.Empty:
+                    latest = self.get_job(db, job_id)
+                    if latest is None:
+                        return
+                    job = latest
+                    if job.get("updated_at") == last_updated:
+                        yield {"id": job_id, "status": job["status"], "keepalive": True}
+                        continue
+                last_updated = job.get("updated_at")
+                yield job
+        finally:
+            with self._lock:
+                listeners = self._listeners.get(job_id, [])
+                if listener in listeners:
+                    listeners.remove(listener)
+                if not listeners:
+                    self._listeners.pop(job_id, None)
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _existing_job(self, input_key: str) -> Optional[str]:
+        """ID of an unfinished or just-finished job with the same inputs."""
+        with self._lock:
+            now = time.monotonic()
+            for key, (_, finished_at) in list(self._jobs_by_key.items()):
+                if finished_at is not None and now - finished_at > COALESCE_WINDOW_SECONDS:
+                    del self._jobs_by_key[key]
+            entry = self._jobs_by_key.get(input_key)
+            return entry[0] if entry else None
+
+    def _schedule(self, job_id: str, input_key: Optional[str] = None):
+        with self._lock:
+            if self._executor is None or job_id in self._active:
+                return
+            self._active.add(job_id)
+            if input_key:
+                self._jobs_by_key[input_key] = (job_id, None)
+            self._executor.submit(self._run, job_id, input_key)
+
+    def _update(self, job_id: str, **fields) -> dict:
+        """Persist job fields and notify watchers."""
+        fields["updated_at"] = datetime.now(timezone.utc)
+        doc_ref = self._db.collection(COLLECTION).document(job_id)
+        doc_ref.update(fields)
+
+        with self._lock:
+            listeners = list(self._listeners.get(job_id, []))
+        if listeners:
+            snapshot = doc_ref.get()
+            job = snapshot.to_dict()
+            job["id"] = job_id
+            job = _public(job)
+            for listener in listeners:
+                listener.put(job)
+        return fields
+
+    def _fail(self, job_id: str, stage: Optional[str], error: str):
+        print(f"[Jobs] Job {job_id} failed at {stage}: {error}")
+        self._update(
+            job_id,
+            status=JobStatus.failed.value,
+            failed_stage=stage,
+            error=error,
+            finished_at=datetime.now(timezone.utc),
+        )
+
+    def _run(self, job_id: str, input_key: Optional[str] = None):
+        """Run (or resume) one job through the remaining stages."""
+        with metrics.meeting("job") as trace:
+            self._run_stages(job_id, input_key, trace)
+
+    def _run_stages(self, job_id: str, input_key: Optional[str], trace: metrics.MeetingTrace):
+        stage = None
+        try:
+            doc = self._db.collection(COLLECTION).document(job_id).get()
+            if not doc.exists:
+                trace.discard()
+                return
+            job = doc.to_dict()
+            if job.get("status") in FINISHED_STATUSES:
+                trace.discard()
+                return
+            print(f"[Jobs] Running job {job_id} (trace {trace.trace_id})")
+
+            timings = dict(job.get("stage_timings") or {})
+            self._update(
+                job_id,
+                attempts=job.get("attempts", 0) + 1,
+                started_at=job.get("started_at") or datetime.now(timezone.utc),
+            )
+
+            # Agent 1 (skipped when resuming a job that already has specs)
+            ticket_specs = job.get("ticket_specs")
+            if ticket_specs is None:
+                stage = JobStatus.analyzing.value
+                self._update(job_id, status=stage)
+                started = time.perf_counter()
+                analysis = AgentService.analyze_meeting(job["transcript"])
+                if not analysis["success"]:
+                    self._fail(job_id, stage, analysis["error"])
+                    return
+                ticket_specs = analysis["data"]
+                timings["analysis"] = round(time.perf_counter() - started, 3)
+                self._update(job_id, ticket_specs=ticket_specs, stage_timings=timings)
+
+            # Agent 2, resuming after the tickets already created
+            stage = JobStatus.creating.value
+            self._update(job_id, status=stage)
+            started = time.perf_counter()
+            session = TicketCreationSession(
+                self._db, job.get("project_name") or ticket_specs.get("project_name")
+            )
+            specs = ticket_specs.get("tickets") or []
+            ticket_ids = list(job.get("ticket_ids") or [])
+            if ticket_ids:
+                # Deleted tickets stay as None so every ticket keeps its spec index
+                existing = [ticket_service.get_ticket_by_id(self._db, tid) for tid in ticket_ids]
+                recreated = session.resume(specs, existing, job.get("updated_ticket_ids") or [])
+                if recreated:
+                    for idx, ticket in recreated.items():
+                        ticket_ids[idx] = ticket["id"]
+                    self._update(
+                        job_id,
+                        ticket_ids=ticket_ids,
+                        updated_ticket_ids=sorted(session.updated_ticket_ids),
+                        tickets_created=session.created_count,
+                        tickets_updated=session.updated_count,
+                    )
+                print(f"[Jobs] Job {job_id}: resuming after {len(session.created_tickets)} created ticket(s)")
+            self._update(job_id, project_id=session.project_id)
+
+            for spec in specs[len(session.created_tickets):]:
+                ticket = session.add_ticket(spec)
+                ticket_ids.append(ticket["id"])
+                self._update(
+                    job_id,
+                    ticket_ids=ticket_ids,
+                    updated_ticket_ids=sorted(session.updated_ticket_ids),
+                    tickets_created=session.created_count,
+                    tickets_updated=session.updated_count,
+                )
+            session.finish()
+            timings["creation"] = round(time.perf_counter() - started, 3)
+            metrics.observe_stage("creation", timings["creation"])
+
+            # Agent 3 (optional - don't fail the job if it errors)
+            stage = JobStatus.diagramming.value
+            self._update(job_id, status=stage, stage_timings=timings)
+            started = time.perf_counter()
+            diagram_result = AgentService.generate_diagram(
+                session.created_tickets,
+                session.project["name"],
+                stylised=job.get("stylised_diagram", False),
+                assignee_names=session.assignee_names()
+            )
+            timings["diagram"] = round(time.perf_counter() - started, 3)
+            if not diagram_result["success"]:
+                print(f"[Jobs] Job {job_id}: diagram generation failed: {diagram_result.get('error')}")
+
+            self._update(
+                job_id,
+                status=JobStatus.done.value,
+                stage_timings=timings,
+                finished_at=datetime.now(timezone.utc),
+                result={
+                    "project": session.project,
+                    "ticket_ids": [t["id"] for t in session.created_tickets],
+                    "diagram": diagram_result.get("diagram"),
+                    "summary": session.summary(),
+                    "ticket_count": session.created_count,
+                    "updated_count": session.updated_count,
+                },
+            )
+            trace.finish(success=True, ticket_count=session.created_count)
+            print(f"[Jobs] ✓ Job {job_id} finished: {session.summary()}")
+
+        except Exception as e:
+            traceback.print_exc()
+            if stage == JobStatus.creating.value:
+                # Analysis and diagram failures are counted by their agent
+                metrics.record_failure("creation", type(e).__name__)
+            try:
+                self._fail(job_id, stage, str(e))
+            except Exception:
+                traceback.print_exc()
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+                if input_key and self._jobs_by_key.get(input_key, (None,))[0] == job_id:
+                    self._jobs_by_key[input_key] = (job_id, time.monotonic())
+
+
+# Singleton instance
+job_service = JobService()
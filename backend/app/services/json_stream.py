@@ -0,0 +1,371 @@
+"""
+Incremental JSON parsing for streamed LLM output.
+
+The meeting analyzer returns one JSON object:
+
+    {"project_name": "...", "tickets": [{...}, {...}, ...]}
+
+TicketStreamParser is fed the completion text chunk by chunk and emits
+each ticket object the moment its closing brace arrives, so tickets can be
+created while the model is still generating. Text before the first "{"
+(code fences, prose) and after the root object closes is ignored.
+
+parse_analysis() handles a complete response: a strict parse first, then
+repairs (trailing commas, raw control characters in strings), and finally
+salvaging the valid prefix (project name and every ticket that closed) of
+truncated output. Tickets are validated against TicketSpec; parse outcomes
+are counted in parse_stats.
+"""
+
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.models.schemas import TicketSpec
+
+# Event types returned by TicketStreamParser.feed()
+PROJECT_NAME = "project_name"
+TICKET = "ticket"
+
+# Outcomes of parse_analysis()
+CLEAN = "clean"
+REPAIRED = "repaired"
+FAILED = "failed"
+
+
+def strip_trailing_commas(text: str) -> str:
+    """Remove commas directly before a closing brace/bracket (outside strings)."""
+    out = []
+    in_string = escape = False
+    for pos, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == ",":
+            rest = text[pos + 1:pos + 64].lstrip()
+            if rest[:1] in ("}", "]"):
+                continue
+        out.append(char)
+    return "".join(out)
+
+
+def loads_lenient(text: str) -> Optional[Any]:
+    """json.loads that tolerates trailing commas and raw newlines in strings; None if still invalid."""
+    for attempt in (text, strip_trailing_commas(text)):
+        try:
+            return json.loads(attempt, strict=False)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+class TicketStreamParser:
+    """
+    Character-level scanner that tracks JSON nesting without building the
+    whole document, extracting top-level "project_name" and each element of
+    the top-level "tickets" array as soon as it is complete.
+    """
+
+    def __init__(self, validate: bool = False):
+        """
+        Args:
+            validate: Check tickets against TicketSpec; invalid tickets are
+                      counted in invalid_tickets instead of being emitted
+        """
+        self.buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+
+        # Root-object key/value tracking
+        self._expect_key = False
+        self._current_key: Optional[str] = None
+        self._tickets_depth: Optional[int] = None
+        self._ticket_start: Optional[int] = None
+
+        self.project_name: Optional[str] = None
+        self.tickets: List[Dict[str, Any]] = []
+        self.invalid_tickets = 0
+        self.complete = False
+        self._validator = TicketValidator() if validate else None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume more text.
+
+        Returns:
+            List of (event, value) pairs completed by this chunk, where event
+            is PROJECT_NAME (value: str) or TICKET (value: dict)
+        """
+        events = []
+        self.buffer += chunk
+        buffer = self.buffer
+
+        while self._pos < len(buffer) and not self.complete:
+            char = buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._on_string_end(buffer, events)
+            elif not self._started:
+                if char == "{":
+                    self._started = True
+                    self._stack.append("{")
+                    self._expect_key = True
+            elif char == '"':
+                self._in_string = True
+                self._string_start = self._pos
+            elif char in "{[":
+                self._on_open(char)
+            elif char in "}]":
+                self._on_close(buffer, events)
+            elif len(self._stack) == 1:
+                if char == ":":
+                    self._expect_key = False
+                elif char == ",":
+                    self._expect_key = True
+                    self._current_key = None
+
+            self._pos += 1
+
+        return events
+
+    def _on_string_end(self, buffer: str, events: list):
+        if len(self._stack) != 1:
+            return
+        text = buffer[self._string_start:self._pos + 1]
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            return
+        if self._expect_key:
+            self._current_key = value
+        elif self._current_key == "project_name":
+            self.project_name = value
+            events.append((PROJECT_NAME, value))
+
+    def _on_open(self, char: str):
+        self._stack.append(char)
+        depth = len(self._stack)
+        if char == "[" and depth == 2 and self._current_key == "tickets":
+            self._tickets_depth = depth
+        elif char == "{" and self._tickets_depth is not None and depth == self._tickets_depth + 1:
+            self._ticket_start = self._pos
+
+    def _on_close(self, buffer: str, events: list):
+        if self._stack:
+            self._stack.pop()
+        depth = len(self._stack)
+
+        if self._ticket_start is not None and depth == self._tickets_depth:
+            text = buffer[self._ticket_start:self._pos + 1]
+            self._ticket_start = None
+            ticket = loads_lenient(text)
+            if ticket is None:
+                self.invalid_tickets += 1
+                if self._validator is not None:
+                    self._validator.skip()
+                return
+            if self._validator is not None:
+                ticket = self._validator.add(ticket)
+                if ticket is None:
+                    self.invalid_tickets += 1
+                    return
+            if isinstance(ticket, dict):
+                self.tickets.append(ticket)
+                events.append((TICKET, ticket))
+        elif self._tickets_depth is not None and depth < self._tickets_depth:
+            self._tickets_depth = None
+
+        if depth == 0:
+            self.complete = True
+
+    def result(self) -> Dict[str, Any]:
+        """Everything extracted so far, in the analyzer's output shape."""
+        return {"project_name": self.project_name, "tickets": list(self.tickets)}
+
+
+def _dependency_index(dep: str) -> Optional[int]:
+    if dep.startswith("ticket:"):
+        try:
+            return int(dep.split(":")[1])
+        except (ValueError, IndexError):
+            return None
+    return None
+
+
+def _remap_dependencies(ticket: Dict[str, Any], index_map: Dict[int, int], shift: int = 0):
+    """
+    Point "ticket:N" references at positions after dropped tickets were removed.
+
+    References to dropped tickets are removed; indices not in index_map
+    (tickets not seen yet) move down by shift.
+    """
+    dependencies = []
+    for dep in ticket["dependencies"]:
+        idx = _dependency_index(dep)
+        if idx is None:
+            dependencies.append(dep)
+        elif idx in index_map:
+            if index_map[idx] is not None:
+                dependencies.append(f"ticket:{index_map[idx]}")
+        elif idx - shift >= 0:
+            dependencies.append(f"ticket:{idx - shift}")
+    ticket["dependencies"] = dependencies
+
+
+def _validate(raw: Any) -> Optional[Dict[str, Any]]:
+    try:
+        return TicketSpec.model_validate(raw).model_dump()
+    except ValidationError:
+        return None
+
+
+def validate_tickets(raw_tickets: List[Any]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Validate ticket objects against TicketSpec, dropping invalid ones.
+
+    Returns:
+        (valid ticket dicts with dependency indices remapped, number dropped)
+    """
+    validated = [_validate(raw) for raw in raw_tickets]
+    dropped = sum(1 for ticket in validated if ticket is None)
+    tickets = [ticket for ticket in validated if ticket is not None]
+    if dropped:
+        index_map: Dict[int, Optional[int]] = {}
+        kept = 0
+        for idx, ticket in enumerate(validated):
+            index_map[idx] = None if ticket is None else kept
+            kept += ticket is not None
+        for ticket in tickets:
+            _remap_dependencies(ticket, index_map)
+    return tickets, dropped
+
+
+class TicketValidator:
+    """Incremental validate_tickets() for tickets arriving one at a time."""
+
+    def __init__(self):
+        self.index_map: Dict[int, Optional[int]] = {}
+        self.kept = 0
+        self.dropped = 0
+
+    def skip(self):
+        """Record a ticket position that could not be parsed at all."""
+        self.index_map[len(self.index_map)] = None
+        self.dropped += 1
+
+    def add(self, raw: Any) -> Optional[Dict[str, Any]]:
+        """The validated ticket, or None if it was dropped."""
+        ticket = _validate(raw)
+        if ticket is None:
+            self.skip()
+            return None
+        self.index_map[len(self.index_map)] = self.kept
+        self.kept += 1
+        if self.dropped:
+            _remap_dependencies(ticket, self.index_map, shift=self.dropped)
+        return ticket
+
+
+def _salvage(text: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """(analysis dict, whether it needed repair) from a complete response text."""
+    start = text.find("{")
+    array_start = text.find("[")
+    if array_start != -1 and (start == -1 or array_start < start):
+        # A bare ticket array instead of the wrapping object
+        tickets = loads_lenient(text[array_start:text.rfind("]") + 1])
+        if isinstance(tickets, list):
+            return {"project_name": None, "tickets": tickets}, True
+    if start == -1:
+        return None, False
+
+    candidate = text[start:text.rfind("}") + 1]
+    try:
+        data = json.loads(candidate)
+        if isinstance(data, dict):
+            return data, False
+    except json.JSONDecodeError:
+        pass
+    data = loads_lenient(candidate)
+    if isinstance(data, dict):
+        return data, True
+
+    # Truncated or broken further in: keep everything that closed properly
+    parser = TicketStreamParser()
+    parser.feed(text[start:])
+    if parser.project_name is None and not parser.tickets:
+        return None, False
+    return parser.result(), True
+
+
+def parse_analysis(text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Parse a complete analyzer response, repairing it where possible.
+
+    Returns:
+        (analysis dict with 'project_name' and validated 'tickets', outcome)
+        where outcome is CLEAN, REPAIRED or FAILED (dict is None)
+    """
+    data, repaired = _salvage(text)
+    if data is None:
+        parse_stats.record(FAILED)
+        return None, FAILED
+
+    raw_tickets = data.get("tickets")
+    if not isinstance(raw_tickets, list):
+        raw_tickets = []
+        repaired = repaired or "tickets" in data
+    project_name = data.get("project_name")
+    if project_name is not None and not isinstance(project_name, str):
+        project_name, repaired = str(project_name), True
+
+    tickets, dropped = validate_tickets(raw_tickets)
+    outcome = REPAIRED if repaired or dropped else CLEAN
+    parse_stats.record(outcome, dropped=dropped)
+    return {"project_name": project_name, "tickets": tickets}, outcome
+
+
+class ParseStats:
+    """Counts of clean, repaired and unusable analyzer responses."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {CLEAN: 0, REPAIRED: 0, FAILED: 0}
+        self.dropped_tickets = 0
+
+    def record(self, outcome: str, dropped: int = 0):
+        with self._lock:
+            self.counts[outcome] += 1
+            self.dropped_tickets += dropped
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self.counts.values())
+            return {
+                "responses": total,
+                **self.counts,
+                "repair_rate": round(self.counts[REPAIRED] / total, 4) if total else None,
+                "failure_rate": round(self.counts[FAILED] / total, 4) if total else None,
+                "dropped_tickets": self.dropped_tickets,
+            }
+
+
+# Singleton instance
+parse_stats = ParseStats()
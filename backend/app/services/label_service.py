@@ -3,6 +3,7 @@ Label service for Firestore operations.
 
 This service handles CRUD operations for labels in Firestore.
 Collection: /labels/{labelId}
+    (or /projects/{projectId}/labels/{labelId}, see data_layout)
 """
 
 from firebase_admin import firestore
@@ -11,6 +12,7 @@ from typing import List, Optional
 from datetime import datetime
 
 from app.models.schemas import LabelCreate, LabelUpdate
+from app.services import data_layout, aggregations, ticket_events
 
 
 class LabelService:
@@ -25,8 +27,8 @@ class LabelService:
         label_dict["created_at"] = now
 
         # Create document with auto-generated ID
-        doc_ref = db.collection(LabelService.COLLECTION).document()
-        doc_ref.set(label_dict)
+        doc_ref = data_layout.new_document(db, LabelService.COLLECTION, label_dict["project_id"])
+        doc_ref.set(data_layout.with_layout_fields(label_dict, doc_ref.id))
 
         # Return created label with ID
         label_dict["id"] = doc_ref.id
@@ -37,13 +39,7 @@ class LabelService:
     @staticmethod
     def get_all_labels(db: firestore.Client, project_id: Optional[str] = None) -> List[dict]:
         """Get all labels, optionally filtered by project, ordered by name."""
-        labels_ref = db.collection(LabelService.COLLECTION)
-
-        if project_id is not None:
-            query = labels_ref.where(filter=FieldFilter("project_id", "==", project_id))
-            docs = query.stream()
-        else:
-            docs = labels_ref.stream()
+        docs = data_layout.project_query(db, LabelService.COLLECTION, project_id).stream()
 
         labels = []
         for doc in docs:
@@ -56,13 +52,17 @@ class LabelService:
 
         return labels
 
+    @staticmethod
+    def count_labels(db: firestore.Client, project_id: Optional[str] = None) -> int:
+        """Count labels, optionally filtered by project, using an aggregation query."""
+        return aggregations.count(data_layout.project_query(db, LabelService.COLLECTION, project_id))
+
     @staticmethod
     def get_label_by_id(db: firestore.Client, label_id: str) -> Optional[dict]:
         """Get a single label by ID."""
-        doc_ref = db.collection(LabelService.COLLECTION).document(label_id)
-        doc = doc_ref.get()
+        doc = data_layout.get_document(db, LabelService.COLLECTION, label_id)
 
-        if not doc.exists:
+        if doc is None:
             return None
 
         label = doc.to_dict()
@@ -72,11 +72,12 @@ class LabelService:
     @staticmethod
     def update_label(db: firestore.Client, label_id: str, update_data: LabelUpdate) -> Optional[dict]:
         """Update a label."""
-        doc_ref = db.collection(LabelService.COLLECTION).document(label_id)
+        doc = data_layout.get_document(db, LabelService.COLLECTION, label_id)
 
         # Check if label exists
-        if not doc_ref.get().exists:
+        if doc is None:
             return None
+        doc_ref = doc.reference
 
         update_dict = update_data.model_dump(exclude_unset=True)
 
@@ -96,14 +97,15 @@ class LabelService:
 
         Note: This removes the label from all tickets' label_ids arrays.
         """
-        doc_ref = db.collection(LabelService.COLLECTION).document(label_id)
+        doc = data_layout.get_document(db, LabelService.COLLECTION, label_id)
 
         # Check if label exists
-        if not doc_ref.get().exists:
+        if doc is None:
             return False
+        doc_ref = doc.reference
 
         # Find all tickets with this label and remove it from their label_ids
-        tickets_ref = db.collection("tickets")
+        tickets_ref = data_layout.scoped_collection(db, "tickets", doc.get("project_id"))
         query = tickets_ref.where(filter=FieldFilter("label_ids", "array_contains", label_id))
         tickets = list(query.stream())
 
@@ -125,6 +127,12 @@ class LabelService:
 
         # Delete label
         doc_ref.delete()
+        flat = data_layout.flat_original(db, LabelService.COLLECTION, doc_ref)
+        if flat is not None:
+            flat.delete()
+
+        if tickets:
+            ticket_events.reset(doc.get("project_id"))
 
         return True
 
@@ -0,0 +1,336 @@
+"""
+Live meeting transcription with incremental ticket extraction.
+
+The /api/voice/live WebSocket forwards microphone audio to Deepgram's live
+API and relays interim and final transcripts back. Finalized segments are
+collected into the meeting transcript, and every LIVE_WINDOW_CHARS of new
+text (or LIVE_EXTRACT_INTERVAL_SECONDS, whichever comes first) Agent 1
+runs on just that window, prefixed with LIVE_CONTEXT_CHARS of earlier
+text for context. Windows are merged with TicketMerger, the same way as
+the chunks of a long transcript, and new tickets are created right away,
+so they show up while the meeting is still going. Tickets that a later
+window adds details or dependencies to are updated (ticket_updated).
+
+When the meeting ends only the text since the last pass is analyzed, and
+the forward dependencies and diagram are finished. That takes seconds
+instead of a run of the batch pipeline over the whole transcript.
+
+Protocol (JSON text frames, audio as binary frames):
+- client -> server: audio chunks; {"type": "stop"} ends the meeting
+- server -> client: ready, transcript {text, is_final, speaker, start},
+  project, ticket, ticket_updated, done {summary, ticket_count,
+  updated_count, tickets, diagram, transcript}, error
+
+Configuration (environment variables):
+- LIVE_WINDOW_CHARS: New transcript text per extraction pass (default: 3000)
+- LIVE_CONTEXT_CHARS: Earlier text included for context (default: 800)
+- LIVE_EXTRACT_INTERVAL_SECONDS: Extract at least this often while text arrives (default: 90)
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import websockets
+from fastapi import WebSocket
+from firebase_admin import firestore
+
+from app.services import metrics
+from app.services.agent_service import AgentService, TicketCreationSession
+from app.services.blocking_executor import blocking_executor, ExecutorSaturatedError
+from app.services.deepgram_service import deepgram_service
+from app.services.transcript_chunker import TicketMerger
+
+LIVE_WINDOW_CHARS = int(os.getenv("LIVE_WINDOW_CHARS", "3000"))
+LIVE_CONTEXT_CHARS = int(os.getenv("LIVE_CONTEXT_CHARS", "800"))
+LIVE_EXTRACT_INTERVAL_SECONDS = float(os.getenv("LIVE_EXTRACT_INTERVAL_SECONDS", "90"))
+
+# Deepgram closes idle streams after ~10s without audio
+KEEPALIVE_SECONDS = 5.0
+
+Event = Tuple[str, Any]
+
+
+class LiveMeeting:
+    """
+    Transcript and ticket state of one live meeting.
+
+    add_final() is called from the event loop; extract() and finish() run
+    in a worker thread, one at a time.
+    """
+
+    def __init__(self, db: firestore.Client, project_name: Optional[str] = None):
+        self.db = db
+        self.project_name = project_name
+        self.finals: List[str] = []
+        self.merger = TicketMerger()
+        self.session: Optional[TicketCreationSession] = None
+        self.trace = metrics.MeetingTrace("live")
+        self.passes = 0
+        self._covered = 0            # finals already analyzed
+        self._pending_chars = 0
+        self._last_pass = time.monotonic()
+        self._pass_lock = threading.Lock()
+        # Merged tickets whose later details are not written yet (see _sync_tickets)
+        self._stale: Set[int] = set()
+
+    @property
+    def transcript(self) -> str:
+        return "\n".join(self.finals)
+
+    def add_final(self, text: str, speaker: Optional[int] = None):
+        line = f"Speaker {speaker}: {text}" if speaker is not None else text
+        self.finals.append(line)
+        self._pending_chars += len(line) + 1
+
+    def extraction_due(self) -> bool:
+        if not self._pending_chars:
+            return False
+        return (
+            self._pending_chars >= LIVE_WINDOW_CHARS
+            or time.monotonic() - self._last_pass >= LIVE_EXTRACT_INTERVAL_SECONDS
+        )
+
+    def _window(self, end: int) -> str:
+        """Finals covered..end, preceded by up to LIVE_CONTEXT_CHARS of earlier text."""
+        context: List[str] = []
+        size = 0
+        for line in reversed(self.finals[:self._covered]):
+            if size + len(line) > LIVE_CONTEXT_CHARS:
+                break
+            context.insert(0, line)
+            size += len(line) + 1
+        return "\n".join(context + self.finals[self._covered:end])
+
+    def extract(self) -> List[Event]:
+        """Analyze the text that arrived since the last pass, create its new tickets and update merged ones."""
+        with self._pass_lock:
+            end = len(self.finals)
+            if end == self._covered:
+                return self._sync_tickets()
+            window = self._window(end)
+            pending = sum(len(line) + 1 for line in self.finals[self._covered:end])
+            self._last_pass = time.monotonic()
+
+            print(f"[Live] Extraction pass {self.passes + 1} over {len(window)} characters")
+            result = AgentService.analyze_meeting(window)
+            if not result["success"]:
+                # Keep the text: it is analyzed again with the next window
+                print(f"[Live] Extraction pass failed: {result['error']}")
+                return self._sync_tickets()
+            self._covered = end
+            self._pending_chars = max(0, self._pending_chars - pending)
+            self.passes += 1
+
+            self.merger.add_chunk(self.passes, result["data"])
+            self._stale.update(self.merger.updated)
+            return self._sync_tickets()
+
+    def _sync_tickets(self) -> List[Event]:
+        """
+        Bring the created tickets up to date with the merger (caller holds
+        the pass lock).
+
+        Merger ticket i is always session ticket i, so dependency indices
+        hold. Tickets are created in index order and changed tickets updated;
+        a write that fails stops this pass and is retried by the next one
+        (or by finish()), so no merged ticket is lost.
+        """
+        events: List[Event] = []
+        try:
+            if self.session is None:
+                if not self.merger.tickets:
+                    return events
+                events.append(("project", self._open_session()))
+            while len(self.session.created_tickets) < len(self.merger.tickets):
+                index = len(self.session.created_tickets)
+                spec = self.merger.tickets[index]
+                print(f"[Agent 2] Processing ticket {index + 1}: {spec.get('title', 'Untitled')}")
+                ticket = self.session.add_ticket(spec)
+                # Created from the merged spec: nothing left to update
+                self._stale.discard(index)
+                events.append(("ticket", {
+                    **ticket, "index": index, "existing": ticket["id"] in self.session.updated_ticket_ids
+                }))
+            # Details and dependencies later windows added to tickets created earlier
+            for index in sorted(self._stale):
+                ticket = self.session.update_ticket(index, self.merger.tickets[index])
+                self._stale.discard(index)
+                if ticket is not None:
+                    events.append(("ticket_updated", ticket))
+        except Exception as e:
+            print(f"[Live] Could not write tickets, retrying with the next pass: {str(e)}")
+            metrics.record_failure("creation", type(e).__name__)
+        return events
+
+    def _open_session(self) -> Dict[str, Any]:
+        self.session = TicketCreationSession(self.db, self.project_name or self.merger.project_name)
+        return self.session.project
+
+    def finish(self) -> List[Event]:
+        """Extract from the remaining text, link dependencies and draw the diagram."""
+        events = self.extract()
+        with self._pass_lock:
+            # One more try for tickets a failed write left behind
+            events += self._sync_tickets()
+            missing = len(self.merger.tickets) - (len(self.session.created_tickets) if self.session else 0)
+        if missing:
+            raise RuntimeError(f"{missing} ticket(s) of the meeting could not be created")
+        if self.session is None:
+            self.trace.finish(success=True, ticket_count=0)
+            return events + [("done", {
+                "summary": "No tickets found in the meeting",
+                "ticket_count": 0,
+                "updated_count": 0,
+                "tickets": [],
+                "diagram": None,
+                "transcript": self.transcript,
+            })]
+
+        with self._pass_lock:
+            for ticket in self.session.finish():
+                events.append(("ticket_updated", ticket))
+            tickets = self.session.created_tickets
+            diagram_result = AgentService.generate_diagram(
+                tickets, self.session.project["name"], assignee_names=self.session.assignee_names()
+            )
+        self.trace.finish(success=True, ticket_count=self.session.created_count)
+        print(f"[Live] Meeting finished after {self.passes} extraction passes: {self.session.summary()}")
+        events.append(("done", {
+            "summary": self.session.summary(),
+            "ticket_count": self.session.created_count,
+            "updated_count": self.session.updated_count,
+            "tickets": tickets,
+            "diagram": diagram_result.get("diagram"),
+            "transcript": self.transcript,
+        }))
+        return events
+
+
+def _parse_results(message: str) -> Optional[Dict[str, Any]]:
+    """Transcript update from a Deepgram live message (None for other message types)."""
+    try:
+        data = json.loads(message)
+    except ValueError:
+        return None
+    if data.get("type") != "Results":
+        return None
+    alternatives = (data.get("channel") or {}).get("alternatives") or []
+    if not alternatives:
+        return None
+    words = alternatives[0].get("words") or []
+    return {
+        "text": alternatives[0].get("transcript") or "",
+        "is_final": bool(data.get("is_final")),
+        "speaker": words[0].get("speaker") if words else None,
+        "start": data.get("start"),
+        "duration": data.get("duration"),
+    }
+
+
+async def run_live_meeting(client: WebSocket, db: firestore.Client, project_name: Optional[str], options: Dict[str, str]):
+    """Proxy one live meeting between an accepted client WebSocket and Deepgram."""
+    meeting = LiveMeeting(db, project_name)
+    connected = True
+    extraction: Optional[asyncio.Future] = None
+
+    async def send(event: str, data: Any = None):
+        nonlocal connected
+        if not connected:
+            return
+        try:
+            await client.send_text(json.dumps({"type": event, "data": data}, default=str))
+        except Exception:
+            connected = False  # Keep processing; the tickets still get created
+
+    async def send_events(events: List[Event]):
+        for event, data in events:
+            await send(event, data)
+
+    async def run_extraction():
+        try:
+            await send_events(await blocking_executor.run(meeting.extract))
+        except ExecutorSaturatedError:
+            # The text stays pending and is picked up by the next pass
+            print("[Live] Executor busy, extraction pass deferred")
+        except Exception as e:
+            # The text of a failed analysis stays pending; unwritten tickets
+            # are retried by the next pass or finish()
+            print(f"[Live] Extraction pass failed: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            metrics.record_failure("live", type(e).__name__)
+
+    async def forward_audio(upstream):
+        """Client audio -> Deepgram, until the client stops or disconnects."""
+        nonlocal connected
+        while True:
+            try:
+                message = await asyncio.wait_for(client.receive(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                await upstream.send(json.dumps({"type": "KeepAlive"}))
+                continue
+            if message["type"] == "websocket.disconnect":
+                connected = False
+                break
+            if message.get("bytes"):
+                await upstream.send(message["bytes"])
+            elif message.get("text"):
+                try:
+                    command = json.loads(message["text"])
+                except ValueError:
+                    command = {}
+                if command.get("type") == "stop":
+                    break
+        # Deepgram flushes the final results and then closes the stream
+        await upstream.send(json.dumps({"type": "CloseStream"}))
+
+    async def relay_transcripts(upstream):
+        """Deepgram results -> client; finals feed the extraction."""
+        nonlocal extraction
+        async for message in upstream:
+            if isinstance(message, bytes):
+                continue
+            update = _parse_results(message)
+            if update is None or not update["text"]:
+                continue
+            await send("transcript", update)
+            if update["is_final"]:
+                meeting.add_final(update["text"], update["speaker"])
+                if meeting.extraction_due() and (extraction is None or extraction.done()):
+                    extraction = asyncio.ensure_future(run_extraction())
+
+    url = deepgram_service.live_url(**options)
+    print(f"[Live] Meeting started (trace {meeting.trace.trace_id})")
+    try:
+        async with websockets.connect(url, subprotocols=["token", deepgram_service.api_key], max_size=None) as upstream:
+            await send("ready")
+            sender = asyncio.ensure_future(forward_audio(upstream))
+            try:
+                await relay_transcripts(upstream)
+            finally:
+                sender.cancel()
+        if extraction is not None:
+            await extraction
+        # Accepted work: queue the final pass even when the executor is saturated
+        await send_events(await blocking_executor.run(meeting.finish, bounded=False))
+    except Exception as e:
+        print(f"[Live] Meeting failed: {str(e)}")
+        metrics.record_failure("live", type(e).__name__)
+        meeting.trace.finish(success=False)
+        await send("error", {"error": str(e)})
+        if meeting.finals:
+            # Keep what was said: create the remaining tickets anyway
+            try:
+                await blocking_executor.run(meeting.finish, bounded=False)
+            except Exception as finish_error:
+                print(f"[Live] Could not finish the meeting: {str(finish_error)}")
+    finally:
+        if connected:
+            try:
+                await client.close()
+            except Exception:
+                pass
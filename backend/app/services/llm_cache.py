@@ -0,0 +1,210 @@
+"""
+Content-addressed on-disk cache for LLM responses.
+
+Every Nemotron chat completion goes through nemotron_service, which looks
+the request up here first. The key is a SHA-256 of the model, messages,
+temperature and max_tokens, so any change to a prompt template (the system
+prompt is part of the messages) naturally misses. CACHE_VERSION is part of
+the key too; bump it when the way responses are used changes.
+
+Entries live in a local SQLite file with a total size cap; the least
+recently used entries are evicted first.
+
+Configuration (environment variables):
+- LLM_CACHE_ENABLED: "false" disables the cache (default: enabled)
+- LLM_CACHE_PATH: SQLite file (default: backend/.cache/llm_cache.sqlite3)
+- LLM_CACHE_MAX_BYTES: Size cap for cached responses (default: 64 MB)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Bump to invalidate every cached response
+CACHE_VERSION = 1
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_PATH = os.path.join(_BACKEND_DIR, ".cache", "llm_cache.sqlite3")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def cache_key(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    extra: Optional[Dict[str, Any]] = None
+) -> str:
+    """Hash of everything that determines a completion (extra: other request parameters)."""
+    request = {
+        "version": CACHE_VERSION,
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    if extra:
+        request["extra"] = extra
+    payload = json.dumps(
+        request,
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """SQLite-backed LRU cache of completion texts."""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None, enabled: Optional[bool] = None):
+        self.path = path or os.getenv("LLM_CACHE_PATH", DEFAULT_PATH)
+        self.max_bytes = max_bytes or int(os.getenv("LLM_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        if enabled is None:
+            enabled = os.getenv("LLM_CACHE_ENABLED", "true").strip().lower() not in ("0", "false", "no")
+        self.enabled = enabled
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use (caller holds the lock)."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+            conn.commit()
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached completion for a key (None on miss), marking it recently used."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+                self.hits += 1
+                return row[0]
+            except (sqlite3.Error, OSError) as e:
+                # The cache must never break a request
+                print(f"[LLM Cache] Read failed: {str(e)}")
+                self.misses += 1
+                return None
+
+    def put(self, key: str, content: str):
+        """Store a completion, evicting least recently used entries over the cap."""
+        if not self.enabled or not content:
+            return
+        size = len(content.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            try:
+                conn = self._connect()
+                now = time.time()
+                old = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, content, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, content, size, now, now),
+                )
+                self._total_bytes += size - (old[0] if old else 0)
+                self.stores += 1
+                self._evict(conn)
+                conn.commit()
+            except (sqlite3.Error, OSError) as e:
+                print(f"[LLM Cache] Write failed: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop oldest entries until the total size is under the cap."""
+        while self._total_bytes > self.max_bytes:
+            rows = conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access ASC LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+
+    def clear(self) -> int:
+        """Delete every entry. Returns the number removed (0 when disabled or on error)."""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            try:
+                conn = self._connect()
+                removed = conn.execute("DELETE FROM responses").rowcount
+                conn.commit()
+                self._total_bytes = 0
+                return removed
+            except (sqlite3.Error, OSError) as e:
+                print(f"[LLM Cache] Clear failed: {str(e)}")
+                return 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and size metrics since startup."""
+        with self._lock:
+            entries = 0
+            if self.enabled:
+                try:
+                    entries = self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                except (sqlite3.Error, OSError):
+                    pass
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "path": self.path,
+                "version": CACHE_VERSION,
+                "entries": entries,
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Singleton instance
+llm_cache = LLMResponseCache()
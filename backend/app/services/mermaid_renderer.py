@@ -0,0 +1,118 @@
+"""
+Deterministic Mermaid flowchart rendering for tickets.
+
+Builds the "graph TD" text for a ticket list directly: one node per ticket,
+an arrow from each dependency to the ticket that depends on it, a dotted
+arrow from parent to subtask, fill colour by priority, and optional
+subgraphs per module or assignee. The same tickets always give the same
+diagram.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from app.models.enums import Priority
+
+# Fill colours by priority (same palette the LLM prompt asked for)
+PRIORITY_STYLES = {
+    Priority.urgent.value: "fill:#ff6b6b,stroke:#c92a2a,color:#ffffff",
+    Priority.high.value: "fill:#ffa94d,stroke:#d9480f,color:#000000",
+    Priority.medium.value: "fill:#ffd93d,stroke:#f08c00,color:#000000",
+    Priority.low.value: "fill:#6bcf7f,stroke:#2b8a3e,color:#000000",
+    Priority.none.value: "fill:#ced4da,stroke:#868e96,color:#000000",
+}
+
+MAX_TITLE_LENGTH = 40
+
+# Characters that would end or break a quoted Mermaid label
+_ESCAPES = {
+    '"': "#quot;",
+    "<": "#lt;",
+    ">": "#gt;",
+    "#": "#35;",
+    "\n": " ",
+    "\r": " ",
+    "\t": " ",
+}
+
+
+def escape_label(text: Any, max_length: int = MAX_TITLE_LENGTH) -> str:
+    """Shorten and escape text for use inside a quoted Mermaid label."""
+    text = " ".join(str(text or "").split())
+    if len(text) > max_length:
+        text = text[:max_length - 1].rstrip() + "…"
+    return "".join(_ESCAPES.get(char, char) for char in text)
+
+
+def _value(value) -> Optional[str]:
+    return value.value if hasattr(value, "value") else value
+
+
+def render_ticket_diagram(
+    tickets: List[Dict[str, Any]],
+    group_by: Optional[str] = None,
+    group_names: Optional[Dict[str, str]] = None,
+    direction: str = "TD",
+) -> str:
+    """
+    Render tickets as a Mermaid flowchart.
+
+    Args:
+        tickets: Ticket dicts (id, title, priority, estimated_hours,
+                 dependency_ids, parent_ticket_id, module_id, assignee_id)
+        group_by: "module" or "assignee" to draw a subgraph per group
+        group_names: Display names of group IDs (module or user names)
+        direction: Flowchart direction (TD or LR)
+
+    Returns:
+        Mermaid diagram text
+    """
+    node_ids = {ticket["id"]: f"T{idx}" for idx, ticket in enumerate(tickets)}
+    group_names = group_names or {}
+    group_field = {"module": "module_id", "assignee": "assignee_id"}.get(group_by)
+
+    lines = [f"graph {direction}"]
+
+    def node(ticket: dict) -> str:
+        label = escape_label(ticket.get("title") or "Untitled")
+        hours = ticket.get("estimated_hours")
+        if isinstance(hours, (int, float)) and not isinstance(hours, bool):
+            label += f" ({hours:g}h)"
+        return f'{node_ids[ticket["id"]]}["{label}"]'
+
+    # Nodes, grouped into subgraphs in order of first appearance
+    groups: Dict[str, List[dict]] = {}
+    for ticket in tickets:
+        key = ticket.get(group_field) if group_field else None
+        groups.setdefault(key, []).append(ticket)
+
+    for ticket in groups.pop(None, []):
+        lines.append(f"    {node(ticket)}")
+    for idx, (key, members) in enumerate(groups.items()):
+        lines.append(f'    subgraph G{idx} ["{escape_label(group_names.get(key, key))}"]')
+        for ticket in members:
+            lines.append(f"        {node(ticket)}")
+        lines.append("    end")
+
+    # Edges: dependency --> dependent, parent -.-> subtask
+    for ticket in tickets:
+        target = node_ids[ticket["id"]]
+        dependencies = [d for d in ticket.get("dependency_ids") or [] if d in node_ids and d != ticket["id"]]
+        for dep in dict.fromkeys(dependencies):
+            lines.append(f"    {node_ids[dep]} --> {target}")
+        parent = ticket.get("parent_ticket_id")
+        if parent in node_ids and parent != ticket["id"] and parent not in dependencies:
+            lines.append(f"    {node_ids[parent]} -.-> {target}")
+
+    # Priority colours
+    by_priority: Dict[str, List[str]] = {}
+    for ticket in tickets:
+        priority = _value(ticket.get("priority")) or Priority.none.value
+        if priority not in PRIORITY_STYLES:
+            priority = Priority.none.value
+        by_priority.setdefault(priority, []).append(node_ids[ticket["id"]])
+    for priority, style in PRIORITY_STYLES.items():
+        if priority in by_priority:
+            lines.append(f"    classDef priority_{priority} {style}")
+            lines.append(f"    class {','.join(by_priority[priority])} priority_{priority}")
+
+    return "\n".join(lines)
@@ -0,0 +1,300 @@
+"""
+Prometheus metrics for the meeting pipeline.
+
+Exposed at GET /metrics in the Prometheus text format, or as OpenMetrics
+(which carries exemplars) when the scraper asks for it.
+
+- catalyst_agent_stage_seconds{stage}: analysis / creation / diagram latency
+- catalyst_meeting_seconds{mode}: whole workflow (sync, stream, job)
+- catalyst_meetings_total{mode,outcome}
+- catalyst_tickets_per_meeting
+- catalyst_agent_stage_failures_total{stage,reason}
+- catalyst_llm_tokens_total{stage,kind}: prompt / completion tokens sent
+- catalyst_firestore_operations_total{stage,op}: document reads and writes
+- catalyst_executor_queue_depth / catalyst_executor_active_threads: shared
+  blocking-work pool (see blocking_executor.py)
+- catalyst_executor_wait_seconds: time a task waited for a worker thread
+- catalyst_executor_rejections_total: requests turned away with 503
+
+Every meeting gets a trace ID (logged at the start of the workflow); the
+latency and ticket observations carry it as an exemplar, so a slow bucket
+can be traced back to the meeting that landed in it.
+
+The current stage and trace ID live in context variables. They follow a
+request through ordinary calls but not into worker threads or across the
+yields of a streamed response, so streaming code reports its timings
+explicitly (observe_stage / MeetingTrace.finish).
+"""
+
+import contextvars
+import functools
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.openmetrics.exposition import (
+    CONTENT_TYPE_LATEST as OPENMETRICS_CONTENT_TYPE,
+    generate_latest as generate_openmetrics,
+)
+
+_STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+_MEETING_BUCKETS = (1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, 180, 300, 600)
+
+STAGE_SECONDS = Histogram(
+    "catalyst_agent_stage_seconds",
+    "Latency of one agent stage of the meeting workflow",
+    ["stage"],
+    buckets=_STAGE_BUCKETS,
+)
+MEETING_SECONDS = Histogram(
+    "catalyst_meeting_seconds",
+    "Latency of the whole meeting workflow",
+    ["mode"],
+    buckets=_MEETING_BUCKETS,
+)
+MEETINGS = Counter(
+    "catalyst_meetings",
+    "Meetings processed, by outcome",
+    ["mode", "outcome"],
+)
+TICKETS_PER_MEETING = Histogram(
+    "catalyst_tickets_per_meeting",
+    "Tickets created per successfully processed meeting",
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+STAGE_FAILURES = Counter(
+    "catalyst_agent_stage_failures",
+    "Failed agent stages, by reason",
+    ["stage", "reason"],
+)
+LLM_TOKENS = Counter(
+    "catalyst_llm_tokens",
+    "LLM tokens sent to the endpoint (cache hits excluded)",
+    ["stage", "kind"],
+)
+FIRESTORE_OPERATIONS = Counter(
+    "catalyst_firestore_operations",
+    "Firestore document reads and writes",
+    ["stage", "op"],
+)
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "catalyst_executor_queue_depth",
+    "Blocking tasks waiting for a worker thread",
+)
+EXECUTOR_ACTIVE_THREADS = Gauge(
+    "catalyst_executor_active_threads",
+    "Worker threads currently running a blocking task",
+)
+EXECUTOR_WAIT_SECONDS = Histogram(
+    "catalyst_executor_wait_seconds",
+    "Time a blocking task waited in the queue before starting",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+EXECUTOR_REJECTIONS = Counter(
+    "catalyst_executor_rejections",
+    "Blocking tasks rejected because the executor was saturated",
+)
+
+_stage: contextvars.ContextVar[str] = contextvars.ContextVar("metrics_stage", default="other")
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("metrics_trace_id", default=None)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_stage() -> str:
+    return _stage.get()
+
+
+def _exemplar(trace_id: Optional[str] = None) -> Optional[Dict[str, str]]:
+    trace_id = trace_id or _trace_id.get()
+    return {"trace_id": trace_id} if trace_id else None
+
+
+# ============================================================================
+# STAGES
+# ============================================================================
+
+def observe_stage(stage: str, seconds: float, trace_id: Optional[str] = None):
+    STAGE_SECONDS.labels(stage=stage).observe(seconds, exemplar=_exemplar(trace_id))
+
+
+def record_failure(stage: str, reason: str):
+    STAGE_FAILURES.labels(stage=stage, reason=reason or "error").inc()
+
+
+@contextmanager
+def stage(name: str, timed: bool = True):
+    """
+    Attribute Firestore operations inside the block to a stage and, when
+    timed, observe its latency. An exception is counted as a failure with
+    the exception class as reason.
+    """
+    token = _stage.set(name)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        if timed:
+            record_failure(name, type(e).__name__)
+        raise
+    finally:
+        _stage.reset(token)
+        if timed:
+            observe_stage(name, time.perf_counter() - started)
+
+
+def in_stage(name: str) -> Callable:
+    """Decorator attributing a function's Firestore operations to a stage (not timed)."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name, timed=False):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_stage(name: str) -> Callable:
+    """
+    Decorator for agent stages that return {"success": bool, ...} dicts:
+    times the call and counts {"success": False} results as failures
+    (reason: the result's 'reason', default "error").
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                result = fn(*args, **kwargs)
+            if isinstance(result, dict) and result.get("success") is False:
+                record_failure(name, result.get("reason") or "error")
+            return result
+        return wrapper
+    return decorator
+
+
+# ============================================================================
+# MEETINGS
+# ============================================================================
+
+class MeetingTrace:
+    """Times one meeting workflow and records its outcome."""
+
+    def __init__(self, mode: str, trace_id: Optional[str] = None):
+        self.mode = mode
+        self.trace_id = trace_id or new_trace_id()
+        self.started = time.perf_counter()
+        self.finished = False
+
+    def discard(self):
+        """Record nothing for this trace (no meeting was actually processed)."""
+        self.finished = True
+
+    def finish(self, success: bool, ticket_count: Optional[int] = None):
+        if self.finished:
+            return
+        self.finished = True
+        exemplar = _exemplar(self.trace_id)
+        MEETING_SECONDS.labels(mode=self.mode).observe(time.perf_counter() - self.started, exemplar=exemplar)
+        MEETINGS.labels(mode=self.mode, outcome="success" if success else "failure").inc()
+        if success and ticket_count is not None:
+            TICKETS_PER_MEETING.observe(ticket_count, exemplar=exemplar)
+
+
+@contextmanager
+def meeting(mode: str):
+    """
+    Trace a synchronous meeting workflow.
+
+    Yields the MeetingTrace; call finish() with the outcome (an exception
+    or a missing finish() counts as a failure).
+    """
+    trace = MeetingTrace(mode)
+    token = _trace_id.set(trace.trace_id)
+    try:
+        yield trace
+    finally:
+        _trace_id.reset(token)
+        trace.finish(success=False)
+
+
+# ============================================================================
+# LLM TOKENS
+# ============================================================================
+
+def record_tokens(stage_name: str, prompt_tokens: int, completion_tokens: int):
+    LLM_TOKENS.labels(stage=stage_name, kind="prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(stage=stage_name, kind="completion").inc(completion_tokens)
+
+
+# ============================================================================
+# FIRESTORE
+# ============================================================================
+
+_firestore_instrumented = False
+
+
+def _count(op: str, amount: int = 1):
+    if amount:
+        FIRESTORE_OPERATIONS.labels(stage=_stage.get(), op=op).inc(amount)
+
+
+def _counting(method: Callable, op: str, amount: Callable[[Any], int] = lambda self: 1) -> Callable:
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        _count(op, amount(self))
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _counting_stream(method: Callable) -> Callable:
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        for snapshot in method(self, *args, **kwargs):
+            _count("read")
+            yield snapshot
+    return wrapper
+
+
+def instrument_firestore():
+    """
+    Count Firestore reads and writes per stage by wrapping the client
+    classes (once per process): document get/set/update/delete, query
+    streams (one read per document), aggregation queries (one read) and
+    batch commits (one write per operation).
+    """
+    global _firestore_instrumented
+    if _firestore_instrumented:
+        return
+    _firestore_instrumented = True
+
+    from google.cloud.firestore_v1.document import DocumentReference
+    from google.cloud.firestore_v1.query import Query
+    from google.cloud.firestore_v1.batch import WriteBatch
+
+    DocumentReference.get = _counting(DocumentReference.get, "read")
+    for name in ("create", "set", "update", "delete"):
+        setattr(DocumentReference, name, _counting(getattr(DocumentReference, name), "write"))
+    # CollectionReference.stream()/get() and Query.get() run through Query.stream()
+    Query.stream = _counting_stream(Query.stream)
+    WriteBatch.commit = _counting(WriteBatch.commit, "write", lambda batch: len(getattr(batch, "_write_pbs", [])))
+    try:
+        from google.cloud.firestore_v1.aggregation import AggregationQuery
+        AggregationQuery.get = _counting(AggregationQuery.get, "read")
+    except ImportError:
+        pass
+    print("[Metrics] Firestore operations are being counted")
+
+
+# ============================================================================
+# EXPOSITION
+# ============================================================================
+
+def exposition(accept: Optional[str]) -> tuple:
+    """(body, content type) for a scrape; OpenMetrics (with exemplars) when accepted."""
+    if accept and "application/openmetrics-text" in accept:
+        return generate_openmetrics(REGISTRY), OPENMETRICS_CONTENT_TYPE
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
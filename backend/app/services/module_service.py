@@ -3,6 +3,7 @@ Module service for Firestore operations.
 
 This service handles CRUD operations for modules (feature groups) in Firestore.
 Collection: /modules/{moduleId}
+    (or /projects/{projectId}/modules/{moduleId}, see data_layout)
 """
 
 from firebase_admin import firestore
@@ -11,6 +12,7 @@ from typing import List, Optional
 from datetime import datetime
 
 from app.models.schemas import ModuleCreate, ModuleUpdate
+from app.services import data_layout, aggregations, ticket_events
 
 
 class ModuleService:
@@ -26,8 +28,8 @@ class ModuleService:
         module_dict["updated_at"] = now
 
         # Create document with auto-generated ID
-        doc_ref = db.collection(ModuleService.COLLECTION).document()
-        doc_ref.set(module_dict)
+        doc_ref = data_layout.new_document(db, ModuleService.COLLECTION, module_dict["project_id"])
+        doc_ref.set(data_layout.with_layout_fields(module_dict, doc_ref.id))
 
         # Return created module with ID
         module_dict["id"] = doc_ref.id
@@ -39,13 +41,7 @@ class ModuleService:
     @staticmethod
     def get_all_modules(db: firestore.Client, project_id: Optional[str] = None) -> List[dict]:
         """Get all modules, optionally filtered by project, ordered by name."""
-        modules_ref = db.collection(ModuleService.COLLECTION)
-
-        if project_id is not None:
-            query = modules_ref.where(filter=FieldFilter("project_id", "==", project_id))
-            docs = query.stream()
-        else:
-            docs = modules_ref.stream()
+        docs = data_layout.project_query(db, ModuleService.COLLECTION, project_id).stream()
 
         modules = []
         for doc in docs:
@@ -58,13 +54,17 @@ class ModuleService:
 
         return modules
 
+    @staticmethod
+    def count_modules(db: firestore.Client, project_id: Optional[str] = None) -> int:
+        """Count modules, optionally filtered by project, using an aggregation query."""
+        return aggregations.count(data_layout.project_query(db, ModuleService.COLLECTION, project_id))
+
     @staticmethod
     def get_module_by_id(db: firestore.Client, module_id: str) -> Optional[dict]:
         """Get a single module by ID."""
-        doc_ref = db.collection(ModuleService.COLLECTION).document(module_id)
-        doc = doc_ref.get()
+        doc = data_layout.get_document(db, ModuleService.COLLECTION, module_id)
 
-        if not doc.exists:
+        if doc is None:
             return None
 
         module = doc.to_dict()
@@ -74,11 +74,12 @@ class ModuleService:
     @staticmethod
     def update_module(db: firestore.Client, module_id: str, update_data: ModuleUpdate) -> Optional[dict]:
         """Update a module."""
-        doc_ref = db.collection(ModuleService.COLLECTION).document(module_id)
+        doc = data_layout.get_document(db, ModuleService.COLLECTION, module_id)
 
         # Check if module exists
-        if not doc_ref.get().exists:
+        if doc is None:
             return None
+        doc_ref = doc.reference
 
         update_dict = update_data.model_dump(exclude_unset=True)
         update_dict["updated_at"] = firestore.SERVER_TIMESTAMP
@@ -99,14 +100,15 @@ class ModuleService:
 
         Note: This sets module_id to null in all tickets belonging to this module.
         """
-        doc_ref = db.collection(ModuleService.COLLECTION).document(module_id)
+        doc = data_layout.get_document(db, ModuleService.COLLECTION, module_id)
 
         # Check if module exists
-        if not doc_ref.get().exists:
+        if doc is None:
             return False
+        doc_ref = doc.reference
 
         # Update all tickets in this module (set module_id to null)
-        tickets_ref = db.collection("tickets")
+        tickets_ref = data_layout.scoped_collection(db, "tickets", doc.get("project_id"))
         query = tickets_ref.where(filter=FieldFilter("module_id", "==", module_id))
         tickets = list(query.stream())
 
@@ -121,6 +123,12 @@ class ModuleService:
 
         # Delete module
         doc_ref.delete()
+        flat = data_layout.flat_original(db, ModuleService.COLLECTION, doc_ref)
+        if flat is not None:
+            flat.delete()
+
+        if tickets:
+            ticket_events.reset(doc.get("project_id"))
 
         return True
 
@@ -1,31 +1,310 @@
 import os
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import openai
 from openai import OpenAI
-from typing import Optional
+from typing import Any, Dict, Generator, Iterator, List, Optional, Tuple
 import httpx
 
+from app.services.llm_cache import llm_cache, cache_key
+from app.services.single_flight import mermaid_flight, request_key
+from app.services import api_replay, rate_limiter
+from app.services.token_budget import count_tokens, count_message_tokens, token_usage, MERMAID_MAX_TOKENS
+
+DEFAULT_MODEL = "meta/llama-3.1-70b-instruct"
+
+# How a JSON schema is passed for guided decoding:
+#   "nvext"           - NIM extension: extra_body={"nvext": {"guided_json": schema}}
+#   "response_format" - OpenAI-style response_format of type json_schema
+#   "off"             - prompt-only JSON
+GUIDED_DECODING = os.getenv("LLM_GUIDED_DECODING", "nvext").lower()
+_guided_decoding_supported = True
+# An error mentioning one of these rejected the guided decoding parameters themselves
+_GUIDED_PARAM_NAMES = ("nvext", "guided_json", "response_format")
+
 # Initialize NVIDIA Nemotron client
 # NVIDIA API is compatible with OpenAI SDK
 def get_nemotron_client():
     api_key = os.getenv("NVIDIA_API_KEY")
     if not api_key:
-        raise ValueError("NVIDIA_API_KEY environment variable is not set")
+        if not api_replay.replaying():
+            raise ValueError("NVIDIA_API_KEY environment variable is not set")
+        api_key = "replay"  # The stand-in server does not check credentials
     
-    base_url = "https://integrate.api.nvidia.com/v1"
+    # Recorded (API_REPLAY_MODE=record) or served by the stand-in server (replay)
+    base_url = api_replay.base_url("nemotron", "https://integrate.api.nvidia.com/v1")
     
     # Explicitly create httpx client to avoid proxies compatibility issue
     # httpx 0.28+ removed proxies argument, so we create client without it
-    http_client = httpx.Client(timeout=60.0)
+    http_client = api_replay.http_client("nemotron", timeout=60.0)
     
     return OpenAI(
         base_url=base_url,
         api_key=api_key,
-        http_client=http_client
+        http_client=http_client,
+        max_retries=0  # Retries are handled by nvidia_limiter
     )
 
 
+def _retry_after_seconds(headers) -> Optional[float]:
+    """Parse retry-after-ms / Retry-After (seconds or HTTP date) headers."""
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _classify_error(error: BaseException) -> Tuple[bool, bool, Optional[float]]:
+    """(retryable, overloaded, retry_after) for an NVIDIA API error."""
+    if isinstance(error, openai.APIStatusError):
+        status = error.status_code
+        retry_after = _retry_after_seconds(getattr(error.response, "headers", None))
+        overloaded = status == 429 or status >= 500
+        return overloaded or status in (408, 409), overloaded, retry_after
+    if isinstance(error, (openai.APIConnectionError, httpx.TransportError)):
+        return True, False, None
+    return False, False, None
+
+
+# Shared limiter for every call to the NVIDIA endpoint
+nvidia_limiter = rate_limiter.from_env("nvidia", "NVIDIA", classify=_classify_error)
+
+
+def _guided_params(json_schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Request parameters constraining the output to json_schema."""
+    if not json_schema or not _guided_decoding_supported or GUIDED_DECODING == "off":
+        return {}
+    if GUIDED_DECODING == "response_format":
+        return {"response_format": {
+            "type": "json_schema",
+            "json_schema": {"name": json_schema.get("title", "response"), "schema": json_schema},
+        }}
+    return {"extra_body": {"nvext": {"guided_json": json_schema}}}
+
+
+def _guided_request_failed(error: openai.APIStatusError):
+    """
+    Turn guided decoding off for the rest of the process only if the error
+    body says its parameters are not supported; any other 400/422 (e.g. a
+    too long prompt) is retried once without them and leaves it on.
+    """
+    global _guided_decoding_supported
+    detail = f"{error.message} {error.body}".lower()
+    if any(name in detail for name in _GUIDED_PARAM_NAMES):
+        print(f"[Nemotron] Guided decoding rejected ({error.status_code}), continuing without it")
+        _guided_decoding_supported = False
+    else:
+        print(f"[Nemotron] Guided request failed ({error.status_code}), retrying once without guided decoding")
+
+
+def _send(send, guided: Dict[str, Any], estimated_tokens: int, usage=None):
+    """
+    Send a request through nvidia_limiter with guided decoding parameters.
+
+    If it fails with 400/422 the request is sent again without them (see
+    _guided_request_failed).
+    """
+    try:
+        return nvidia_limiter.call(lambda: send(**guided), estimated_tokens=estimated_tokens, usage=usage)
+    except (openai.BadRequestError, openai.UnprocessableEntityError) as e:
+        if not guided:
+            raise
+        _guided_request_failed(e)
+    return nvidia_limiter.call(lambda: send(), estimated_tokens=estimated_tokens, usage=usage)
+
+
+def _send_stream(send, guided: Dict[str, Any], estimated_tokens: int) -> Iterator[Any]:
+    """Streaming counterpart of _send()."""
+    received = False
+    try:
+        for chunk in nvidia_limiter.stream(lambda: send(**guided), estimated_tokens=estimated_tokens):
+            received = True
+            yield chunk
+        return
+    except (openai.BadRequestError, openai.UnprocessableEntityError) as e:
+        if not guided or received:
+            raise
+        _guided_request_failed(e)
+    yield from nvidia_limiter.stream(lambda: send(), estimated_tokens=estimated_tokens)
+
+
+def _usage_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None) if usage else None
+
+
+def chat_completion_details(
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    model: str = DEFAULT_MODEL,
+    use_cache: bool = True,
+    stage: str = "other",
+    json_schema: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Run a chat completion and return the text with call details.
+
+    Identical requests (same model, messages, temperature, max_tokens and
+    schema) are answered from the on-disk LLM response cache. Token usage
+    is recorded under stage. With json_schema the output is constrained to
+    it (guided decoding, see GUIDED_DECODING).
+
+    Returns:
+        Dict with 'content', 'finish_reason' ("length" when max_tokens cut
+        the output short; None for cache hits), 'prompt_tokens',
+        'completion_tokens' and 'cached'
+    """
+    estimated_prompt = count_message_tokens(messages)
+    guided = _guided_params(json_schema)
+    key = cache_key(model, messages, temperature, max_tokens, guided)
+    if use_cache:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            print("[Nemotron] Cache hit")
+            token_usage.record(stage, estimated_prompt, 0, max_tokens, estimated_prompt, cached=True)
+            return {
+                "content": cached,
+                "finish_reason": None,
+                "prompt_tokens": estimated_prompt,
+                "completion_tokens": count_tokens(cached),
+                "cached": True,
+            }
+
+    client = get_nemotron_client()
+    response = _send(
+        lambda **params: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **params
+        ),
+        guided,
+        estimated_tokens=estimated_prompt + max_tokens,
+        usage=_usage_tokens
+    )
+    choice = response.choices[0]
+    content = choice.message.content or ""
+    finish_reason = getattr(choice, "finish_reason", None)
+
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or estimated_prompt
+    completion_tokens = getattr(usage, "completion_tokens", None) or count_tokens(content)
+    truncated = finish_reason == "length"
+    token_usage.record(stage, prompt_tokens, completion_tokens, max_tokens, estimated_prompt, truncated=truncated)
+    if truncated:
+        print(f"[Nemotron] Warning: {stage} output hit max_tokens={max_tokens}")
+
+    # A truncated answer would be replayed forever, so it is not cached
+    if use_cache and not truncated:
+        llm_cache.put(key, content)
+    return {
+        "content": content,
+        "finish_reason": finish_reason,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cached": False,
+    }
+
+
+def create_chat_completion(
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    model: str = DEFAULT_MODEL,
+    use_cache: bool = True,
+    stage: str = "other",
+    json_schema: Optional[Dict[str, Any]] = None
+) -> str:
+    """Run a chat completion and return the message text (see chat_completion_details)."""
+    return chat_completion_details(messages, temperature, max_tokens, model, use_cache, stage, json_schema)["content"]
+
+
+def stream_chat_completion(
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    model: str = DEFAULT_MODEL,
+    use_cache: bool = True,
+    stage: str = "other",
+    json_schema: Optional[Dict[str, Any]] = None
+) -> Generator[str, None, Optional[str]]:
+    """
+    Stream a chat completion as text chunks.
+
+    A cached response is replayed as a single chunk; a streamed response is
+    cached only once it has been received completely.
+
+    Returns:
+        The finish_reason, as the generator's return value ("length" when
+        max_tokens cut the output short; None for cache hits), e.g.
+        finish_reason = yield from stream_chat_completion(...)
+    """
+    estimated_prompt = count_message_tokens(messages)
+    guided = _guided_params(json_schema)
+    key = cache_key(model, messages, temperature, max_tokens, guided)
+    if use_cache:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            print("[Nemotron] Cache hit")
+            token_usage.record(stage, estimated_prompt, 0, max_tokens, estimated_prompt, cached=True)
+            yield cached
+            return None
+
+    client = get_nemotron_client()
+    stream = _send_stream(
+        lambda **params: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            **params
+        ),
+        guided,
+        estimated_tokens=estimated_prompt + max_tokens
+    )
+
+    parts = []
+    finish_reason = None
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        finish_reason = getattr(choice, "finish_reason", None) or finish_reason
+        content = choice.delta.content
+        if content:
+            parts.append(content)
+            yield content
+
+    text = "".join(parts)
+    truncated = finish_reason == "length"
+    token_usage.record(stage, estimated_prompt, count_tokens(text), max_tokens, estimated_prompt, truncated=truncated)
+    if truncated:
+        print(f"[Nemotron] Warning: {stage} output hit max_tokens={max_tokens}")
+    if use_cache and not truncated:
+        llm_cache.put(key, text)
+    return finish_reason
+
+
 def generate_mermaid_from_prompt(prompt: str) -> str:
     """
     Convert a text prompt to Mermaid diagram syntax using NVIDIA Nemotron.
+
+    Concurrent requests with the same (whitespace-normalized) prompt share
+    one model call.
     
     Args:
         prompt: The user's text description of what they want to draw
@@ -33,8 +312,11 @@ def generate_mermaid_from_prompt(prompt: str) -> str:
     Returns:
         Mermaid diagram syntax as a string
     """
-    client = get_nemotron_client()
-    
+    return mermaid_flight.do(request_key("mermaid", prompt), _generate_mermaid, prompt)
+
+
+def _generate_mermaid(prompt: str) -> str:
+    """Run one Mermaid generation (see generate_mermaid_from_prompt)."""
     system_prompt = """You are a Mermaid diagram generator. Convert user descriptions into valid Mermaid diagram syntax.
     
 Rules:
@@ -52,17 +334,15 @@ Examples:
     user_prompt = f"Convert this description into a Mermaid diagram: {prompt}"
     
     try:
-        response = client.chat.completions.create(
-            model="meta/llama-3.1-70b-instruct",
+        mermaid_code = create_chat_completion(
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             temperature=0.3,
-            max_tokens=1000
-        )
-        
-        mermaid_code = response.choices[0].message.content.strip()
+            max_tokens=MERMAID_MAX_TOKENS,
+            stage="mermaid"
+        ).strip()
         
         # Clean up the response - remove markdown code blocks if present
         if mermaid_code.startswith("```"):
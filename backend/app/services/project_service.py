@@ -11,6 +11,7 @@ from typing import List, Optional
 from datetime import datetime
 
 from app.models.schemas import ProjectCreate, ProjectUpdate
+from app.services import data_layout, aggregations, ticket_events
 
 
 class ProjectService:
@@ -63,6 +64,11 @@ class ProjectService:
 
         return projects
 
+    @staticmethod
+    def count_projects(db: firestore.Client) -> int:
+        """Count projects using an aggregation query."""
+        return aggregations.count(db.collection(ProjectService.COLLECTION))
+
     @staticmethod
     def get_project_by_id(db: firestore.Client, project_id: str) -> Optional[dict]:
         """Get a single project by ID."""
@@ -143,6 +149,9 @@ class ProjectService:
         """
         Delete a project and cascade delete all related entities.
 
+        With the subcollection layout this is one recursive delete of
+        projects/{project_id}; otherwise each collection is scanned.
+
         Deletes:
         - The project itself
         - All tickets belonging to this project
@@ -173,6 +182,16 @@ class ProjectService:
                     batch.delete(doc.reference)
                 batch.commit()
 
+        # Nested layout: everything lives under the project document,
+        # so a single recursive delete removes it all
+        if data_layout.uses_subcollections():
+            db.recursive_delete(doc_ref)
+            # Flat originals left by a migration that is not cleaned up yet
+            for name in data_layout.PROJECT_SCOPED_COLLECTIONS:
+                delete_collection_where(name, "project_id", project_id)
+            ticket_events.reset(project_id)
+            return True
+
         # Delete all related entities
         delete_collection_where("tickets", "project_id", project_id)
         delete_collection_where("labels", "project_id", project_id)
@@ -182,6 +201,8 @@ class ProjectService:
         # Finally, delete the project itself
         doc_ref.delete()
 
+        ticket_events.reset(project_id)
+
         return True
 
 
@@ -0,0 +1,315 @@
+"""
+Adaptive rate limiting for the NVIDIA (Nemotron) endpoint.
+
+Every LLM call acquires a permit from the shared limiter before it is sent:
+
+- Two token buckets: one for requests per minute, one for LLM tokens per
+  minute (prompt estimate + max_tokens, corrected with the reported usage
+  afterwards).
+- An AIMD concurrency window: the number of calls in flight grows by about
+  one per window of successful calls and halves when the endpoint answers
+  429 or 5xx. A Retry-After header pauses all new calls until it expires.
+- Retries of throttled/transient failures with full-jitter exponential
+  backoff (never shorter than Retry-After).
+
+Configuration (environment variables):
+- NVIDIA_RPM: Requests per minute (default: 40)
+- NVIDIA_TPM: Tokens per minute (default: 100000)
+- NVIDIA_MAX_CONCURRENCY / NVIDIA_MIN_CONCURRENCY: Window bounds (default: 8 / 1)
+- NVIDIA_INITIAL_CONCURRENCY: Starting window (default: 4)
+- NVIDIA_MAX_RETRIES: Retries per call (default: 4)
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+# Backoff for retries: full jitter in [0, min(cap, base * 2^attempt)]
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_CAP_SECONDS = 30.0
+
+# Concurrent failures within this interval only shrink the window once
+_DECREASE_COOLDOWN_SECONDS = 2.0
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations (callers sleep off any debt)."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount tokens (possibly going into debt); returns seconds to wait."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        self.tokens -= amount
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class Permit:
+    """One admitted call; released exactly once with its outcome."""
+
+    def __init__(self, limiter: "RateLimiter", reserved_tokens: float):
+        self.limiter = limiter
+        self.reserved_tokens = reserved_tokens
+        self.released = False
+
+    def settle_tokens(self, actual_tokens: Optional[int]):
+        """Correct the token bucket with the usage the endpoint reported."""
+        if actual_tokens is not None:
+            self.limiter._settle(self.reserved_tokens, actual_tokens)
+            self.reserved_tokens = actual_tokens
+
+    def release(self, overloaded: bool = False, retry_after: Optional[float] = None):
+        if not self.released:
+            self.released = True
+            self.limiter._release(overloaded, retry_after)
+
+
+class RateLimiter:
+    """Shared request/token budgets plus an AIMD concurrency window."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        initial_concurrency: float = 4,
+        min_concurrency: float = 1,
+        max_concurrency: float = 8,
+        max_retries: int = 4,
+        classify: Optional[Callable[[BaseException], Tuple[bool, bool, Optional[float]]]] = None,
+    ):
+        """
+        Args:
+            classify: Maps an exception to (retryable, overloaded, retry_after);
+                      exceptions are not retried when omitted
+        """
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.limit = float(initial_concurrency)
+        self.min_concurrency = float(min_concurrency)
+        self.max_concurrency = float(max_concurrency)
+        self.max_retries = max_retries
+        self.classify = classify or (lambda e: (False, False, None))
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+        # Metrics
+        self.admitted = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+        self.max_queue_depth = 0
+        self._waits = deque(maxlen=1000)
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+
+    def acquire(self, estimated_tokens: float) -> Permit:
+        """Block until a call may be sent, then return its permit."""
+        started = time.monotonic()
+        with self._cond:
+            self.waiting += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.waiting)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if now < self.paused_until:
+                        self._cond.wait(self.paused_until - now)
+                    elif self.in_flight >= int(self.limit):
+                        self._cond.wait()
+                    else:
+                        break
+                self.in_flight += 1
+                now = time.monotonic()
+                delay = max(self.requests.reserve(1, now), self.tokens.reserve(estimated_tokens, now))
+            finally:
+                self.waiting -= 1
+
+        if delay > 0:
+            # The slot and budgets are already held: give them back if the wait is interrupted
+            try:
+                time.sleep(delay)
+            except BaseException:
+                with self._cond:
+                    self.in_flight -= 1
+                    self.requests.refund(1)
+                    self.tokens.refund(min(estimated_tokens, self.tokens.capacity))
+                    self._cond.notify_all()
+                raise
+
+        with self._cond:
+            self.admitted += 1
+            self._waits.append(time.monotonic() - started)
+        return Permit(self, min(estimated_tokens, self.tokens.capacity))
+
+    def _settle(self, reserved: float, actual: float):
+        with self._cond:
+            if actual < reserved:
+                self.tokens.refund(reserved - actual)
+            else:
+                self.tokens.reserve(actual - reserved, time.monotonic())
+
+    def _release(self, overloaded: bool, retry_after: Optional[float]):
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if overloaded:
+                self.throttled += 1
+                if now - self._last_decrease >= _DECREASE_COOLDOWN_SECONDS:
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self._last_decrease = now
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / max(self.limit, 1.0))
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Calls with retries
+    # ------------------------------------------------------------------
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        delay = random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+        return max(delay, retry_after or 0.0)
+
+    def _handle_error(self, error: BaseException, permit: Permit, attempt: int) -> bool:
+        """Release the permit after a failed attempt; returns whether to retry."""
+        retryable, overloaded, retry_after = self.classify(error)
+        permit.release(overloaded=overloaded, retry_after=retry_after)
+        if not retryable or attempt >= self.max_retries:
+            with self._cond:
+                self.failures += 1
+            return False
+        delay = self._backoff(attempt, retry_after)
+        with self._cond:
+            self.retries += 1
+        print(f"[RateLimiter:{self.name}] {type(error).__name__}; retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        time.sleep(delay)
+        return True
+
+    def call(self, fn: Callable[[], Any], estimated_tokens: float, usage: Optional[Callable[[Any], Optional[int]]] = None) -> Any:
+        """
+        Run fn under the limiter, retrying throttled and transient failures.
+
+        Args:
+            fn: Sends the request and returns the response
+            estimated_tokens: Tokens to reserve before sending
+            usage: Extracts the actual token count from the response
+        """
+        attempt = 0
+        while True:
+            permit = self.acquire(estimated_tokens)
+            try:
+                result = fn()
+            except Exception as e:
+                if self._handle_error(e, permit, attempt):
+                    attempt += 1
+                    continue
+                raise
+            except BaseException:
+                # Interrupted (KeyboardInterrupt, SystemExit, ...): free the slot
+                permit.release()
+                raise
+            if usage is not None:
+                permit.settle_tokens(usage(result))
+            permit.release()
+            return result
+
+    def stream(self, fn: Callable[[], Iterator[Any]], estimated_tokens: float) -> Iterator[Any]:
+        """
+        Like call() for streaming responses: the permit is held until the
+        stream is exhausted or closed. Only opening the stream is retried.
+        """
+        attempt = 0
+        while True:
+            permit = self.acquire(estimated_tokens)
+            try:
+                stream = fn()
+                break
+            except Exception as e:
+                if self._handle_error(e, permit, attempt):
+                    attempt += 1
+                    continue
+                raise
+            except BaseException:
+                permit.release()
+                raise
+
+        try:
+            yield from stream
+        except Exception as e:
+            retryable, overloaded, retry_after = self.classify(e)
+            permit.release(overloaded=overloaded, retry_after=retry_after)
+            raise
+        finally:
+            permit.release()
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = sorted(self._waits)
+            now = time.monotonic()
+
+            def percentile(p: float) -> Optional[float]:
+                if not waits:
+                    return None
+                return round(waits[min(len(waits) - 1, int(p * len(waits)))], 4)
+
+            return {
+                "name": self.name,
+                "queue_depth": self.waiting,
+                "max_queue_depth": self.max_queue_depth,
+                "in_flight": self.in_flight,
+                "concurrency_limit": round(self.limit, 2),
+                "paused_for_seconds": round(max(0.0, self.paused_until - now), 2),
+                "admitted": self.admitted,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "failures": self.failures,
+                "wait_seconds": {
+                    "avg": round(sum(waits) / len(waits), 4) if waits else None,
+                    "p50": percentile(0.5),
+                    "p95": percentile(0.95),
+                    "max": round(waits[-1], 4) if waits else None,
+                },
+                "request_budget_remaining": round(self.requests.tokens, 1),
+                "token_budget_remaining": round(self.tokens.tokens, 1),
+            }
+
+
+def from_env(name: str, prefix: str, classify=None) -> RateLimiter:
+    """Build a limiter configured from <prefix>_RPM, <prefix>_TPM, ... variables."""
+    return RateLimiter(
+        name,
+        requests_per_minute=float(os.getenv(f"{prefix}_RPM", "40")),
+        tokens_per_minute=float(os.getenv(f"{prefix}_TPM", "100000")),
+        initial_concurrency=float(os.getenv(f"{prefix}_INITIAL_CONCURRENCY", "4")),
+        min_concurrency=float(os.getenv(f"{prefix}_MIN_CONCURRENCY", "1")),
+        max_concurrency=float(os.getenv(f"{prefix}_MAX_CONCURRENCY", "8")),
+        max_retries=int(os.getenv(f"{prefix}_MAX_RETRIES", "4")),
+        classify=classify,
+    )
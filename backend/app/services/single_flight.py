@@ -0,0 +1,132 @@
+"""
+Single-flight coalescing of identical requests.
+
+When the same work is requested again while it is still running (double
+submits, client retries), the later callers wait for the first call and
+share its result instead of starting a duplicate run. A successful result
+is also kept for a short window after completion, so a retry that arrives
+just after the first request finished gets the same answer.
+
+Keys are hashes of the normalized request inputs (see request_key).
+
+Configuration (environment variables):
+- COALESCE_WINDOW_SECONDS: How long a finished result is reused (default: 10)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+COALESCE_WINDOW_SECONDS = float(os.getenv("COALESCE_WINDOW_SECONDS", "10"))
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Collapse whitespace so trivially different submissions match."""
+    return " ".join((text or "").split())
+
+
+def request_key(*parts: Any) -> str:
+    """Hash of request inputs (strings are whitespace-normalized)."""
+    normalized = [normalize_text(p) if isinstance(p, str) else p for p in parts]
+    payload = json.dumps(normalized, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution."""
+
+    def __init__(self, name: str, window_seconds: float = COALESCE_WINDOW_SECONDS):
+        self.name = name
+        self.window_seconds = window_seconds
+        self._in_flight: Dict[str, Future] = {}
+        # key -> (finished_at, result)
+        self._recent: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def _prune(self, now: float):
+        expired = [k for k, (finished, _) in self._recent.items() if now - finished > self.window_seconds]
+        for key in expired:
+            del self._recent[key]
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[..., Any],
+        *args,
+        keep: Optional[Callable[[Any], bool]] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Run fn(*args, **kwargs), or join an identical call already running.
+
+        Args:
+            key: Request key (see request_key)
+            fn: The work to run
+            keep: Predicate deciding whether a result may be reused after
+                  completion (default: every result). Exceptions are shared
+                  with concurrent waiters but never reused.
+
+        Returns:
+            The result of fn, possibly from another caller's execution
+        """
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            self._prune(now)
+
+            recent = self._recent.get(key)
+            if recent is not None:
+                self.coalesced += 1
+                print(f"[SingleFlight:{self.name}] Reusing result finished {now - recent[0]:.1f}s ago")
+                return recent[1]
+
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            print(f"[SingleFlight:{self.name}] Joining identical in-flight request")
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if self.window_seconds > 0 and (keep is None or keep(result)):
+                self._recent[key] = (time.monotonic(), result)
+        future.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._in_flight),
+                "window_seconds": self.window_seconds,
+            }
+
+
+# Shared coalescers
+meeting_flight = SingleFlight("meeting")
+mermaid_flight = SingleFlight("mermaid")
@@ -0,0 +1,310 @@
+"""
+Near-duplicate detection of extracted tickets against a project's tickets.
+
+Reprocessing a meeting, or a follow-up meeting on the same topic, yields
+tickets that already exist. Agent 2 looks every extracted ticket up here
+first and updates the existing ticket instead of creating a copy.
+
+Each project's open tickets are indexed on first use with MinHash
+signatures over their title and summary features (normalized words plus
+title bigrams) and kept current from ticket_events. Candidates come from
+LSH buckets (bands of the signature), so a lookup touches only the tickets
+sharing a band with the query, not the whole project. Candidates are then
+scored exactly:
+
+    similarity = 0.6 * Jaccard(title features) + 0.4 * Jaccard(all features)
+
+and the best one at or above DEDUP_SIMILARITY is the duplicate. Resolved
+and closed tickets are not indexed: work that comes up again after it was
+finished gets a new ticket.
+
+Configuration (environment variables):
+- DEDUP_ENABLED: Check extracted tickets for duplicates (default: true)
+- DEDUP_SIMILARITY: Minimum similarity of a duplicate (default: 0.5)
+"""
+
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from firebase_admin import firestore
+
+from app.services import ticket_events
+from app.services.ticket_service import ticket_service, DONE_STATUSES
+
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() not in ("0", "false", "no")
+DEDUP_SIMILARITY = float(os.getenv("DEDUP_SIMILARITY", "0.5"))
+
+# Signature layout: NUM_BANDS bands of ROWS_PER_BAND hashes. Two rows per band
+# makes tickets with ~30% feature overlap likely (>90%) to share a bucket.
+NUM_BANDS = 32
+ROWS_PER_BAND = 2
+NUM_PERM = NUM_BANDS * ROWS_PER_BAND
+# Candidates (most shared bands first) scored exactly per lookup
+MAX_CANDIDATES = 25
+TITLE_WEIGHT = 0.6
+
+_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(20240601)  # Fixed seed: signatures are comparable across reloads
+_PERM_A = _rng.integers(1, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or our the this to up we with".split()
+)
+
+
+def _status_value(status) -> Optional[str]:
+    return status.value if hasattr(status, "value") else status
+
+
+def _words(text: Optional[str]) -> List[str]:
+    """Lowercase, accent-free words without stopwords; plural 's' dropped."""
+    if not text:
+        return []
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    text = text.lower()
+    words = []
+    for word in _NON_ALNUM.sub(" ", text).split():
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def features(title: Optional[str], summary: Optional[str]) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """(title features, all features) of a ticket."""
+    title_words = _words(title)
+    title_features = set(title_words)
+    title_features.update(f"{a} {b}" for a, b in zip(title_words, title_words[1:]))
+    return frozenset(title_features), frozenset(title_features.union(_words(summary)))
+
+
+def signature(feature_set: Iterable[str]) -> Optional[np.ndarray]:
+    """MinHash signature of a feature set (None when it is empty)."""
+    hashes = np.fromiter(
+        (zlib.crc32(feature.encode("utf-8")) for feature in feature_set), dtype=np.uint64
+    )
+    if not hashes.size:
+        return None
+    return ((np.outer(hashes, _PERM_A) + _PERM_B) % _PRIME).min(axis=0)
+
+
+def _bands(sig: np.ndarray) -> List[Tuple[int, tuple]]:
+    """LSH bucket keys: (band number, that band's rows of the signature)."""
+    return list(enumerate(map(tuple, sig.reshape(NUM_BANDS, ROWS_PER_BAND).tolist())))
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def similarity(a: Tuple[FrozenSet[str], FrozenSet[str]], b: Tuple[FrozenSet[str], FrozenSet[str]]) -> float:
+    return TITLE_WEIGHT * _jaccard(a[0], b[0]) + (1 - TITLE_WEIGHT) * _jaccard(a[1], b[1])
+
+
+def _indexable(ticket: Optional[dict]) -> bool:
+    return ticket is not None and _status_value(ticket.get("status")) not in DONE_STATUSES
+
+
+class _ProjectIndex:
+    """LSH buckets and features of one project's open tickets."""
+
+    def __init__(self):
+        self.loaded = False
+        self.pending: List[Tuple[str, Optional[dict]]] = []  # Writes seen while loading
+        self.tickets: Dict[str, dict] = {}
+        self.features: Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]] = {}
+        self.bands: Dict[str, List[Tuple[int, tuple]]] = {}
+        self.buckets: Dict[Tuple[int, tuple], Set[str]] = defaultdict(set)
+
+    def upsert(self, ticket: dict):
+        self.remove(ticket["id"])
+        if not _indexable(ticket):
+            return
+        ticket_features = features(ticket.get("title"), ticket.get("summary"))
+        sig = signature(ticket_features[1])
+        if sig is None:
+            return
+        ticket_id = ticket["id"]
+        self.tickets[ticket_id] = ticket
+        self.features[ticket_id] = ticket_features
+        self.bands[ticket_id] = _bands(sig)
+        for key in self.bands[ticket_id]:
+            self.buckets[key].add(ticket_id)
+
+    def remove(self, ticket_id: str):
+        if ticket_id not in self.tickets:
+            return
+        for key in self.bands.pop(ticket_id):
+            ids = self.buckets.get(key)
+            if ids is not None:
+                ids.discard(ticket_id)
+                if not ids:
+                    del self.buckets[key]
+        del self.tickets[ticket_id]
+        del self.features[ticket_id]
+
+    def apply_pending(self):
+        for ticket_id, ticket in self.pending:
+            if ticket is None:
+                self.remove(ticket_id)
+            else:
+                self.upsert(ticket)
+        self.pending = []
+
+    def best_match(
+        self,
+        query: Tuple[FrozenSet[str], FrozenSet[str]],
+        exclude: Set[str],
+        threshold: float
+    ) -> Tuple[Optional[str], float]:
+        sig = signature(query[1])
+        if sig is None:
+            return None, 0.0
+        counts: Counter = Counter()
+        for key in _bands(sig):
+            ids = self.buckets.get(key)
+            if ids:
+                counts.update(ids)
+
+        best_id, best_score = None, threshold
+        for ticket_id, _ in counts.most_common(MAX_CANDIDATES + len(exclude)):
+            if ticket_id in exclude:
+                continue
+            score = similarity(query, self.features[ticket_id])
+            if score >= best_score:
+                best_id, best_score = ticket_id, score
+        return best_id, best_score
+
+
+class TicketDedupIndex:
+    """Per-project MinHash/LSH indexes of open tickets kept current from ticket writes."""
+
+    def __init__(self, threshold: float = DEDUP_SIMILARITY):
+        self.threshold = threshold
+        self._projects: Dict[str, _ProjectIndex] = {}
+        self._lock = threading.RLock()
+        self._lookups = 0
+        self._duplicates = 0
+
+    def _ensure_loaded(self, db: firestore.Client, project_id: str) -> Optional[_ProjectIndex]:
+        with self._lock:
+            index = self._projects.get(project_id)
+            if index is not None and index.loaded:
+                return index
+            if index is None:
+                # Register before loading so writes during the load are queued
+                index = _ProjectIndex()
+                self._projects[project_id] = index
+
+        # Load outside the lock so lookups in other projects continue
+        started = time.perf_counter()
+        tickets = ticket_service.get_all_tickets(db, project_id)
+
+        with self._lock:
+            if self._projects.get(project_id) is not index:
+                return None  # Invalidated while loading: skip the check this time
+            if not index.loaded:
+                for ticket in tickets:
+                    index.upsert(ticket)
+                index.loaded = True
+                print(
+                    f"[Dedup] Indexed {len(index.tickets)} open tickets of project {project_id} "
+                    f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+                )
+            index.apply_pending()
+            return index
+
+    def find_duplicate(
+        self,
+        db: firestore.Client,
+        project_id: str,
+        title: Optional[str],
+        summary: Optional[str],
+        exclude: Iterable[str] = ()
+    ) -> Optional[Tuple[dict, float]]:
+        """
+        The open ticket of the project that the given title/summary duplicates.
+
+        Args:
+            exclude: Ticket IDs that may not match (e.g. created by the same meeting)
+
+        Returns:
+            (ticket, similarity) or None
+        """
+        if not DEDUP_ENABLED:
+            return None
+        index = self._ensure_loaded(db, project_id)
+        if index is None:
+            return None
+        query = features(title, summary)
+        with self._lock:
+            self._lookups += 1
+            ticket_id, score = index.best_match(query, set(exclude), self.threshold)
+            if ticket_id is None:
+                return None
+            self._duplicates += 1
+            return index.tickets[ticket_id], score
+
+    def invalidate(self, project_id: Optional[str] = None):
+        """Drop one project's index (or all of them) so it reloads."""
+        with self._lock:
+            if project_id is None:
+                self._projects.clear()
+            else:
+                self._projects.pop(project_id, None)
+
+    def on_ticket_event(self, event: str, ticket: Optional[dict], previous: Optional[dict]):
+        """ticket_events listener: update the indexes of affected projects."""
+        if event == "reset":
+            self.invalidate(ticket.get("project_id") if ticket else None)
+            return
+
+        with self._lock:
+            # A ticket that moved projects leaves the old index
+            if previous is not None and (ticket is None or ticket.get("project_id") != previous.get("project_id")):
+                self._apply(previous.get("project_id"), previous["id"], None)
+            if ticket is not None:
+                self._apply(ticket.get("project_id"), ticket["id"], ticket)
+
+    def _apply(self, project_id: Optional[str], ticket_id: str, ticket: Optional[dict]):
+        index = self._projects.get(project_id)
+        if index is None:
+            return
+        if not index.loaded:
+            index.pending.append((ticket_id, ticket))
+        elif ticket is None:
+            index.remove(ticket_id)
+        else:
+            index.upsert(ticket)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "enabled": DEDUP_ENABLED,
+                "threshold": self.threshold,
+                "projects": sum(1 for index in self._projects.values() if index.loaded),
+                "tickets": sum(len(index.tickets) for index in self._projects.values()),
+                "lookups": self._lookups,
+                "duplicates": self._duplicates,
+            }
+
+
+# Singleton instance
+ticket_dedup = TicketDedupIndex()
+ticket_events.subscribe(ticket_dedup.on_ticket_event)
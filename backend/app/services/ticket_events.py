@@ -0,0 +1,53 @@
+"""
+In-process ticket change notifications.
+
+Services that keep derived state about tickets (analytics snapshots,
+caches, indexes) subscribe here instead of being called directly by
+TicketService, which keeps the write path free of import cycles.
+
+Events:
+- "created":  ticket is the new ticket, previous is None
+- "updated":  ticket is the new state, previous the old state
+- "deleted":  ticket is None, previous is the deleted ticket
+- "reset":    bulk change; drop derived state for ticket["project_id"]
+              (or for every project when ticket is None)
+
+Listeners run synchronously on the writing thread and must be cheap.
+State is per process: with several workers, each keeps its own copy.
+"""
+
+from typing import Callable, List, Optional
+
+TicketListener = Callable[[str, Optional[dict], Optional[dict]], None]
+
+_listeners: List[TicketListener] = []
+
+
+def subscribe(listener: TicketListener) -> TicketListener:
+    """Register a listener. Returns it so this can be used as a decorator."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+    return listener
+
+
+def publish(event: str, ticket: Optional[dict] = None, previous: Optional[dict] = None):
+    """Notify every listener. Listener errors are logged, never raised."""
+    for listener in list(_listeners):
+        try:
+            listener(event, ticket, previous)
+        except Exception as e:
+            print(f"[TicketEvents] Listener {getattr(listener, '__name__', listener)} failed on {event}: {str(e)}")
+
+
+def reset(project_id: Optional[str] = None):
+    """Publish a bulk-change event for one project, or for all of them."""
+    publish("reset", {"project_id": project_id} if project_id else None, None)
+
+
+def affected_projects(ticket: Optional[dict], previous: Optional[dict]) -> set:
+    """Project IDs touched by an event (both before and after a move)."""
+    return {
+        t.get("project_id")
+        for t in (ticket, previous)
+        if t is not None
+    }
@@ -3,11 +3,15 @@ Ticket service for Firestore operations.
 
 This service handles CRUD operations for tickets in Firestore.
 Collection: /tickets/{ticketId}
+    (or /projects/{projectId}/tickets/{ticketId}, see data_layout)
 
 Key features:
 - Labels stored as label_ids array field
 - Parent-child ticket relationships
-- Cascade delete to subtasks
+- Multi-ticket dependencies stored as dependency_ids array field
+- Cascade delete to subtasks; deleted IDs are removed from dependency_ids
+- resolved_at stamped when a ticket moves into a done status
+- Every write is published to ticket_events listeners
 """
 
 from firebase_admin import firestore
@@ -16,6 +20,16 @@ from typing import List, Optional
 from datetime import datetime, timezone
 
 from app.models.schemas import TicketCreate, TicketUpdate
+from app.models.enums import TicketStatus
+from app.services import data_layout, aggregations, ticket_events
+
+# Statuses that count as finished work (for resolved_at and analytics)
+DONE_STATUSES = (TicketStatus.resolved.value, TicketStatus.closed.value)
+
+
+def _status_value(status) -> Optional[str]:
+    """Plain string value of a status (enum or str)."""
+    return status.value if hasattr(status, "value") else status
 
 
 class TicketService:
@@ -38,30 +52,31 @@ class TicketService:
 
         # Store labels as array field
         ticket_dict["label_ids"] = label_ids
+        ticket_dict["dependency_ids"] = list(dict.fromkeys(ticket_dict.get("dependency_ids") or []))
         ticket_dict["created_at"] = now
         ticket_dict["updated_at"] = now
+        is_done = _status_value(ticket_dict.get("status")) in DONE_STATUSES
+        ticket_dict["resolved_at"] = now if is_done else None
 
         # Create document with auto-generated ID
-        doc_ref = db.collection(TicketService.COLLECTION).document()
-        doc_ref.set(ticket_dict)
+        doc_ref = data_layout.new_document(db, TicketService.COLLECTION, ticket_dict.get("project_id"))
+        doc_ref.set(data_layout.with_layout_fields(ticket_dict, doc_ref.id))
 
         # Return created ticket with ID
         ticket_dict["id"] = doc_ref.id
         ticket_dict["created_at"] = datetime.utcnow()
         ticket_dict["updated_at"] = datetime.utcnow()
+        if is_done:
+            ticket_dict["resolved_at"] = ticket_dict["created_at"]
+
+        ticket_events.publish("created", ticket_dict)
 
         return ticket_dict
 
     @staticmethod
     def get_all_tickets(db: firestore.Client, project_id: Optional[str] = None) -> List[dict]:
         """Get all tickets, optionally filtered by project, ordered by created_at (desc)."""
-        tickets_ref = db.collection(TicketService.COLLECTION)
-
-        if project_id is not None:
-            query = tickets_ref.where(filter=FieldFilter("project_id", "==", project_id))
-            docs = query.stream()
-        else:
-            docs = tickets_ref.stream()
+        docs = data_layout.project_query(db, TicketService.COLLECTION, project_id).stream()
 
         tickets = []
         for doc in docs:
@@ -94,13 +109,56 @@ class TicketService:
 
         return tickets
 
+    @staticmethod
+    def _filtered_query(
+        db: firestore.Client,
+        project_id: Optional[str] = None,
+        status: Optional[str] = None,
+        cycle_id: Optional[str] = None,
+        assignee_id: Optional[str] = None,
+    ):
+        """Build a ticket query with optional equality filters."""
+        query = data_layout.project_query(db, TicketService.COLLECTION, project_id)
+        for field, value in (("status", status), ("cycle_id", cycle_id), ("assignee_id", assignee_id)):
+            if value is not None:
+                query = query.where(filter=FieldFilter(field, "==", value))
+        return query
+
+    @staticmethod
+    def count_tickets(
+        db: firestore.Client,
+        project_id: Optional[str] = None,
+        status: Optional[str] = None,
+        cycle_id: Optional[str] = None,
+        assignee_id: Optional[str] = None,
+    ) -> int:
+        """Count tickets with a single aggregation query (no documents fetched)."""
+        query = TicketService._filtered_query(db, project_id, status, cycle_id, assignee_id)
+        return aggregations.count(query)
+
+    @staticmethod
+    def get_estimate_totals(
+        db: firestore.Client,
+        project_id: Optional[str] = None,
+        status: Optional[str] = None,
+        cycle_id: Optional[str] = None,
+        assignee_id: Optional[str] = None,
+    ) -> dict:
+        """Ticket count plus sum/avg of estimated_hours in one aggregation query."""
+        query = TicketService._filtered_query(db, project_id, status, cycle_id, assignee_id)
+        summary = aggregations.numeric_summary(query, "estimated_hours")
+        return {
+            "total": summary["count"],
+            "total_estimated_hours": summary["sum"],
+            "avg_estimated_hours": summary["avg"],
+        }
+
     @staticmethod
     def get_ticket_by_id(db: firestore.Client, ticket_id: str) -> Optional[dict]:
         """Get a single ticket by ID."""
-        doc_ref = db.collection(TicketService.COLLECTION).document(ticket_id)
-        doc = doc_ref.get()
+        doc = data_layout.get_document(db, TicketService.COLLECTION, ticket_id)
 
-        if not doc.exists:
+        if doc is None:
             return None
 
         ticket = doc.to_dict()
@@ -110,11 +168,12 @@ class TicketService:
     @staticmethod
     def update_ticket(db: firestore.Client, ticket_id: str, update_data: TicketUpdate) -> Optional[dict]:
         """Update a ticket including label relationships."""
-        doc_ref = db.collection(TicketService.COLLECTION).document(ticket_id)
+        doc = data_layout.get_document(db, TicketService.COLLECTION, ticket_id)
 
         # Check if ticket exists
-        if not doc_ref.get().exists:
+        if doc is None:
             return None
+        doc_ref = doc.reference
 
         # Extract label_ids separately
         update_dict = update_data.model_dump(exclude_unset=True, exclude={'label_ids'})
@@ -130,48 +189,133 @@ class TicketService:
         if label_ids is not None:
             update_dict["label_ids"] = label_ids
 
+        # A ticket cannot depend on itself; keep the first of any duplicates
+        if update_dict.get("dependency_ids") is not None:
+            update_dict["dependency_ids"] = [
+                dep for dep in dict.fromkeys(update_dict["dependency_ids"]) if dep != ticket_id
+            ]
+
         # Add updated timestamp
         update_dict["updated_at"] = firestore.SERVER_TIMESTAMP
 
-        # Update document
-        doc_ref.update(update_dict)
+        # Stamp or clear resolved_at when the status crosses the done boundary
+        current = doc.to_dict()
+        if "status" in update_dict:
+            was_done = _status_value(current.get("status")) in DONE_STATUSES
+            is_done = _status_value(update_dict["status"]) in DONE_STATUSES
+            if is_done and not was_done:
+                update_dict["resolved_at"] = firestore.SERVER_TIMESTAMP
+            elif was_done and not is_done:
+                update_dict["resolved_at"] = None
+
+        # In the nested layout a project change moves the document
+        new_project_id = update_dict.get("project_id", current.get("project_id"))
+        if data_layout.uses_subcollections() and new_project_id != current.get("project_id"):
+            doc_ref = TicketService._move_ticket(db, doc, new_project_id, update_dict)
+        else:
+            # Update document
+            doc_ref.update(update_dict)
 
         # Return updated ticket
         updated_doc = doc_ref.get()
         ticket = updated_doc.to_dict()
         ticket["id"] = updated_doc.id
+
+        current["id"] = doc.id
+        ticket_events.publish("updated", ticket, current)
+
         return ticket
 
+    @staticmethod
+    def _move_ticket(db: firestore.Client, doc, project_id: Optional[str], update_dict: dict):
+        """Move a ticket to another project's subcollection, applying updates."""
+        moved = {**doc.to_dict(), **update_dict}
+        new_ref = data_layout.scoped_collection(db, TicketService.COLLECTION, project_id).document(doc.id)
+
+        batch = db.batch()
+        batch.set(new_ref, data_layout.with_layout_fields(moved, doc.id))
+        batch.delete(doc.reference)
+        flat = data_layout.flat_original(db, TicketService.COLLECTION, doc.reference)
+        if flat is not None:
+            batch.delete(flat)
+        batch.commit()
+
+        return new_ref
+
     @staticmethod
     def delete_ticket(db: firestore.Client, ticket_id: str) -> bool:
         """
         Delete a ticket and cascade delete all subtasks.
 
-        Subtasks are tickets where parent_ticket_id == ticket_id.
+        Subtasks are tickets where parent_ticket_id == ticket_id. The
+        deleted IDs are removed from the dependency_ids of the remaining
+        tickets in the same batch, so no ticket depends on a deleted one.
         """
-        doc_ref = db.collection(TicketService.COLLECTION).document(ticket_id)
+        doc = data_layout.get_document(db, TicketService.COLLECTION, ticket_id)
 
         # Check if ticket exists
-        if not doc_ref.get().exists:
+        if doc is None:
             return False
 
-        # Find and delete all subtasks (recursive cascade)
-        def delete_ticket_and_subtasks(tid: str):
-            """Recursively delete a ticket and all its subtasks."""
-            # Find all subtasks
-            subtasks_ref = db.collection(TicketService.COLLECTION)
-            query = subtasks_ref.where(filter=FieldFilter("parent_ticket_id", "==", tid))
-            subtasks = list(query.stream())
-
-            # Recursively delete subtasks first
-            for subtask in subtasks:
-                delete_ticket_and_subtasks(subtask.id)
-
-            # Delete the ticket itself
-            db.collection(TicketService.COLLECTION).document(tid).delete()
-
-        # Execute cascade delete
-        delete_ticket_and_subtasks(ticket_id)
+        # Find the ticket and all its subtasks (recursive cascade, subtasks first)
+        deleted_docs = []
+
+        def collect_ticket_and_subtasks(ticket_doc):
+            subtasks_ref = data_layout.cross_project_query(db, TicketService.COLLECTION)
+            query = subtasks_ref.where(filter=FieldFilter("parent_ticket_id", "==", ticket_doc.id))
+            for subtask in query.stream():
+                collect_ticket_and_subtasks(subtask)
+            deleted_docs.append(ticket_doc)
+
+        collect_ticket_and_subtasks(doc)
+        deleted_ids = [d.id for d in deleted_docs]
+        deleted_set = set(deleted_ids)
+
+        # Tickets depending on a deleted one (array_contains_any takes up to 30 values)
+        dependents = {}
+        for i in range(0, len(deleted_ids), 30):
+            query = data_layout.cross_project_query(db, TicketService.COLLECTION).where(
+                filter=FieldFilter("dependency_ids", "array_contains_any", deleted_ids[i:i + 30])
+            )
+            for dependent in query.stream():
+                if dependent.id not in deleted_set:
+                    dependents[dependent.id] = dependent
+
+        operations = []
+        updated = []
+        for dependent in dependents.values():
+            previous = dependent.to_dict()
+            previous["id"] = dependent.id
+            dependency_ids = [d for d in previous.get("dependency_ids") or [] if d not in deleted_set]
+            operations.append((dependent.reference, {
+                "dependency_ids": dependency_ids,
+                "updated_at": firestore.SERVER_TIMESTAMP
+            }))
+            updated.append(({**previous, "dependency_ids": dependency_ids}, previous))
+        for ticket_doc in deleted_docs:
+            operations.append((ticket_doc.reference, None))
+            # Also the pre-migration flat original
+            flat = data_layout.flat_original(db, TicketService.COLLECTION, ticket_doc.reference)
+            if flat is not None:
+                operations.append((flat, None))
+
+        # Write in batches of 500 (one batch unless the cascade is huge)
+        batch_size = 500
+        for i in range(0, len(operations), batch_size):
+            batch = db.batch()
+            for ref, update in operations[i:i + batch_size]:
+                if update is None:
+                    batch.delete(ref)
+                else:
+                    batch.update(ref, update)
+            batch.commit()
+
+        for ticket, previous in updated:
+            ticket_events.publish("updated", ticket, previous)
+        for ticket_doc in deleted_docs:
+            deleted = ticket_doc.to_dict()
+            deleted["id"] = ticket_doc.id
+            ticket_events.publish("deleted", None, deleted)
 
         return True
 
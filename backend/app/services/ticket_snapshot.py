@@ -0,0 +1,162 @@
+"""
+Columnar snapshot of ticket state for analytics.
+
+Each project's tickets are loaded once into a pandas DataFrame (one row
+per ticket, indexed by ticket ID) and then kept current from ticket_events:
+writes are queued as pending upserts/deletes and folded into the frame in
+one vectorized step on the next read. A project is reloaded from Firestore
+only after a bulk "reset" event.
+"""
+
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from firebase_admin import firestore
+
+from app.services import ticket_events
+from app.services.ticket_service import ticket_service, DONE_STATUSES
+
+COLUMNS = [
+    "project_id",
+    "cycle_id",
+    "module_id",
+    "assignee_id",
+    "status",
+    "estimated_hours",
+    "created_at",
+    "updated_at",
+    "resolved_at",
+]
+
+_DATETIME_COLUMNS = ("created_at", "updated_at", "resolved_at")
+
+
+def _status_value(status) -> Optional[str]:
+    return status.value if hasattr(status, "value") else status
+
+
+def _row(ticket: dict) -> dict:
+    """Extract the snapshot columns from a ticket dict."""
+    row = {column: ticket.get(column) for column in COLUMNS}
+    row["status"] = _status_value(row["status"])
+    return row
+
+
+def build_frame(tickets) -> pd.DataFrame:
+    """
+    Build a typed columnar frame from ticket dicts.
+
+    Datetimes are normalized to UTC, estimated_hours to float (NaN when
+    unknown). Done tickets without resolved_at (written before it existed)
+    fall back to updated_at.
+    """
+    tickets = list(tickets)
+    frame = pd.DataFrame(
+        [_row(t) for t in tickets],
+        index=pd.Index([t["id"] for t in tickets], name="id", dtype=object),
+        columns=COLUMNS,
+    )
+
+    for column in _DATETIME_COLUMNS:
+        frame[column] = pd.to_datetime(frame[column], utc=True, errors="coerce")
+    frame["estimated_hours"] = pd.to_numeric(frame["estimated_hours"], errors="coerce").astype(np.float64)
+
+    done = frame["status"].isin(DONE_STATUSES).to_numpy()
+    frame["is_done"] = done
+    frame.loc[done, "resolved_at"] = frame.loc[done, "resolved_at"].fillna(frame.loc[done, "updated_at"])
+
+    return frame
+
+
+class _ProjectSnapshot:
+    """Frame for one project plus writes not yet folded into it."""
+
+    def __init__(self, frame: Optional[pd.DataFrame]):
+        self.frame = frame
+        self.pending_upserts: Dict[str, dict] = {}
+        self.pending_deletes = set()
+
+    def apply_pending(self):
+        """Fold queued writes into the frame in a single concat."""
+        if self.frame is None:
+            return
+        if not self.pending_upserts and not self.pending_deletes:
+            return
+        drop = self.pending_deletes | set(self.pending_upserts)
+        frame = self.frame.drop(index=list(drop), errors="ignore")
+        if self.pending_upserts:
+            frame = pd.concat([frame, build_frame(self.pending_upserts.values())])
+        self.frame = frame
+        self.pending_upserts = {}
+        self.pending_deletes = set()
+
+
+class TicketSnapshotStore:
+    """Per-project columnar ticket snapshots kept current from ticket writes."""
+
+    def __init__(self):
+        self._snapshots: Dict[str, _ProjectSnapshot] = {}
+        self._lock = threading.RLock()
+
+    def get_frame(self, db: firestore.Client, project_id: str) -> pd.DataFrame:
+        """
+        Get the project's ticket frame, loading it from Firestore on first use.
+
+        The returned frame is shared; callers must not mutate it.
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(project_id)
+            if snapshot is not None and snapshot.frame is not None:
+                snapshot.apply_pending()
+                return snapshot.frame
+            if snapshot is None:
+                # Register before loading so writes during the load are queued
+                snapshot = _ProjectSnapshot(None)
+                self._snapshots[project_id] = snapshot
+
+        # Load outside the lock so other projects are not blocked on I/O
+        frame = build_frame(ticket_service.get_all_tickets(db, project_id))
+
+        with self._lock:
+            if self._snapshots.get(project_id) is not snapshot:
+                # Invalidated while loading: serve the fresh load uncached
+                return frame
+            if snapshot.frame is None:
+                snapshot.frame = frame
+            snapshot.apply_pending()
+            return snapshot.frame
+
+    def invalidate(self, project_id: Optional[str] = None):
+        """Drop one project's snapshot (or all of them) so it reloads."""
+        with self._lock:
+            if project_id is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(project_id, None)
+
+    def on_ticket_event(self, event: str, ticket: Optional[dict], previous: Optional[dict]):
+        """ticket_events listener: queue the write for affected projects."""
+        if event == "reset":
+            self.invalidate(ticket.get("project_id") if ticket else None)
+            return
+
+        with self._lock:
+            # A ticket that moved projects leaves the old snapshot
+            if previous is not None:
+                old = self._snapshots.get(previous.get("project_id"))
+                if old is not None and (ticket is None or ticket.get("project_id") != previous.get("project_id")):
+                    old.pending_upserts.pop(previous["id"], None)
+                    old.pending_deletes.add(previous["id"])
+
+            if ticket is not None:
+                current = self._snapshots.get(ticket.get("project_id"))
+                if current is not None:
+                    current.pending_deletes.discard(ticket["id"])
+                    current.pending_upserts[ticket["id"]] = ticket
+
+
+# Singleton instance
+ticket_snapshot_store = TicketSnapshotStore()
+ticket_events.subscribe(ticket_snapshot_store.on_ticket_event)
@@ -0,0 +1,187 @@
+"""
+Token budgeting for LLM prompts.
+
+Measures prompts with a local tokenizer, sizes max_tokens from the output a
+call is expected to produce, compacts inputs that would not fit the model
+context, and records per-call token usage by stage.
+
+Token counts come from tiktoken (cl100k_base, a close approximation of the
+Llama 3 tokenizer) when it is installed, otherwise from a regex estimate
+(words and punctuation, long words split every 4 characters).
+
+Configuration (environment variables):
+- LLM_CONTEXT_TOKENS: Model context window (default: 128000)
+- ANALYSIS_CHUNK_TOKENS: Transcript tokens per analysis prompt (default: 3000)
+"""
+
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from app.services import metrics
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # Not installed or encoding unavailable
+    _ENCODING = None
+
+CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "128000"))
+ANALYSIS_CHUNK_TOKENS = int(os.getenv("ANALYSIS_CHUNK_TOKENS", "3000"))
+
+# Chat formatting overhead per message (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Output sizing
+ANALYSIS_MIN_TOKENS = 768
+ANALYSIS_MAX_TOKENS = 4096
+DIAGRAM_MIN_TOKENS = 256
+DIAGRAM_MAX_TOKENS = 4096
+DIAGRAM_TOKENS_PER_TICKET = 60
+MERMAID_MAX_TOKENS = 1000
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_FILLERS = re.compile(r"\b(?:um+|uh+|erm+|hmm+|uh-huh)\b[,.]?\s*", re.IGNORECASE)
+_REPEATED_WORD = re.compile(r"\b(\w+)(?:\s+\1\b)+", re.IGNORECASE)
+_BLANK_RUNS = re.compile(r"[ \t]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def tokenizer_name() -> str:
+    return "tiktoken:cl100k_base" if _ENCODING is not None else "regex-estimate"
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Number of tokens in text."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _TOKEN_PATTERN.findall(text))
+
+
+def count_message_tokens(messages: List[Dict[str, str]]) -> int:
+    """Prompt tokens of a chat message list."""
+    return sum(count_tokens(m.get("content")) + MESSAGE_OVERHEAD_TOKENS for m in messages) + 2
+
+
+def analysis_max_tokens(transcript_tokens: int) -> int:
+    """
+    Completion budget for ticket extraction.
+
+    The JSON output grows with the amount of discussion (roughly half the
+    transcript length at most), so short meetings reserve far fewer tokens.
+    """
+    return max(ANALYSIS_MIN_TOKENS, min(ANALYSIS_MAX_TOKENS, 400 + transcript_tokens // 2))
+
+
+def diagram_max_tokens(ticket_count: int) -> int:
+    """Completion budget for a Mermaid diagram: a node, an edge and a style line per ticket."""
+    return max(DIAGRAM_MIN_TOKENS, min(DIAGRAM_MAX_TOKENS, 200 + DIAGRAM_TOKENS_PER_TICKET * ticket_count))
+
+
+def chars_per_token(text: str) -> float:
+    """Measured characters per token of a text (used to size character chunks)."""
+    tokens = count_tokens(text)
+    return len(text) / tokens if tokens else 4.0
+
+
+def compact_transcript(text: str) -> str:
+    """Remove filler words, stutters and redundant whitespace."""
+    text = _FILLERS.sub("", text)
+    text = _REPEATED_WORD.sub(r"\1", text)
+    text = _BLANK_RUNS.sub(" ", text)
+    text = _BLANK_LINES.sub("\n\n", text)
+    return text.strip()
+
+
+def fit_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Make text fit max_tokens: compact it first, then cut at a line boundary.
+
+    Returns the text unchanged if it already fits.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    text = compact_transcript(text)
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+
+    # Binary search on a character prefix, then back off to a line break
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    cut = text.rfind("\n", 0, low)
+    return text[:cut if cut > low // 2 else low].rstrip()
+
+
+def prompt_budget(max_tokens: int, reserved: int = 0) -> int:
+    """Tokens left for the prompt after the completion and any fixed parts."""
+    return CONTEXT_TOKENS - max_tokens - reserved
+
+
+class TokenUsageTracker:
+    """Per-stage totals of requested and used tokens."""
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        stage: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        max_tokens: int,
+        estimated_prompt_tokens: int,
+        cached: bool = False,
+        truncated: bool = False,
+    ):
+        with self._lock:
+            entry = self._stages.setdefault(stage, {
+                "calls": 0,
+                "cached_calls": 0,
+                "truncated_calls": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "estimated_prompt_tokens": 0,
+                "max_tokens_requested": 0,
+            })
+            entry["calls"] += 1
+            entry["cached_calls"] += int(cached)
+            entry["truncated_calls"] += int(truncated)
+            if not cached:
+                entry["prompt_tokens"] += prompt_tokens
+                entry["completion_tokens"] += completion_tokens
+                entry["estimated_prompt_tokens"] += estimated_prompt_tokens
+                entry["max_tokens_requested"] += max_tokens
+        if not cached:
+            metrics.record_tokens(stage, prompt_tokens, completion_tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {}
+            for stage, entry in self._stages.items():
+                sent = entry["calls"] - entry["cached_calls"]
+                stages[stage] = {
+                    **entry,
+                    "avg_prompt_tokens": round(entry["prompt_tokens"] / sent, 1) if sent else None,
+                    "avg_completion_tokens": round(entry["completion_tokens"] / sent, 1) if sent else None,
+                    # How much of the requested completion budget was actually used
+                    "completion_budget_used": (
+                        round(entry["completion_tokens"] / entry["max_tokens_requested"], 3)
+                        if entry["max_tokens_requested"] else None
+                    ),
+                }
+            return {"tokenizer": tokenizer_name(), "context_tokens": CONTEXT_TOKENS, "stages": stages}
+
+
+# Singleton instance
+token_usage = TokenUsageTracker()
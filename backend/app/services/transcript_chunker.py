@@ -0,0 +1,243 @@
+"""
+Map-reduce support for long meeting transcripts.
+
+Long transcripts are split into overlapping chunks that each fit one
+analyzer prompt (split_transcript), the chunks are analyzed concurrently,
+and the partial ticket lists are merged back into one (TicketMerger):
+tickets seen twice because they were discussed in an overlap are merged,
+and "ticket:N" dependencies are remapped from chunk-local to global
+indices.
+"""
+
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional
+
+# A line that starts a new speaker turn: "Alice: ...", "Speaker 2: ...",
+# "[00:12:03] Bob: ..."
+_SPEAKER_TURN = re.compile(r"^\s*(?:\[[^\]]{1,20}\]\s*)?[A-Z][\w .'-]{0,40}:\s")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Titles at least this similar are considered the same ticket
+TITLE_SIMILARITY = 0.85
+
+
+def _segments(transcript: str) -> List[str]:
+    """Split into paragraphs and speaker turns, keeping line text intact."""
+    segments = []
+    current: List[str] = []
+    for line in transcript.splitlines():
+        if not line.strip() or _SPEAKER_TURN.match(line):
+            if current:
+                segments.append("\n".join(current))
+                current = []
+        if line.strip():
+            current.append(line)
+    if current:
+        segments.append("\n".join(current))
+    return segments
+
+
+def _split_long(segment: str, max_chars: int) -> List[str]:
+    """Break a segment longer than max_chars at sentence ends (hard cut as a last resort)."""
+    pieces = []
+    current = ""
+    for sentence in _SENTENCE_END.split(segment):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_transcript(transcript: str, max_chars: int = 12000, overlap_chars: int = 1000) -> List[str]:
+    """
+    Split a transcript into chunks on speaker-turn and paragraph boundaries.
+
+    Each chunk starts with the trailing segments of the previous chunk (up
+    to overlap_chars) so a discussion that crosses a boundary is seen whole
+    at least once.
+
+    Args:
+        transcript: Full meeting transcript
+        max_chars: Maximum chunk length
+        overlap_chars: Maximum text repeated from the previous chunk
+
+    Returns:
+        Chunks in transcript order (a single chunk if it already fits)
+    """
+    if len(transcript) <= max_chars:
+        return [transcript]
+
+    segments = []
+    for segment in _segments(transcript):
+        segments.extend(_split_long(segment, max_chars) if len(segment) > max_chars else [segment])
+
+    chunks = []
+    current: List[str] = []
+    size = 0
+    for segment in segments:
+        if current and size + len(segment) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            # Carry trailing segments over as overlap
+            overlap: List[str] = []
+            overlap_size = 0
+            for previous in reversed(current):
+                if overlap_size + len(previous) + 1 > overlap_chars:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += len(previous) + 1
+            if overlap_size + len(segment) + 1 > max_chars:
+                overlap, overlap_size = [], 0
+            current, size = overlap, overlap_size
+        current.append(segment)
+        size += len(segment) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _title_key(title: Optional[str]) -> str:
+    return " ".join(_WORD.findall((title or "").lower()))
+
+
+def _dependency_index(dep: Any) -> Optional[int]:
+    if isinstance(dep, str) and dep.startswith("ticket:"):
+        try:
+            return int(dep.split(":")[1])
+        except (ValueError, IndexError):
+            return None
+    return None
+
+
+class TicketMerger:
+    """
+    Merges per-chunk analyzer results into one ticket list.
+
+    Chunks can be added in any order. Each added ticket is either new (it is
+    appended and gets the next global index) or a duplicate of a ticket from
+    another chunk (its missing fields are filled into the existing ticket).
+    After add_chunk(), `updated` lists the earlier tickets that chunk changed,
+    so callers that already acted on them can apply the change.
+    """
+
+    def __init__(self):
+        self.tickets: List[Dict[str, Any]] = []
+        self.updated: List[int] = []
+        self._ticket_chunks: List[int] = []
+        self._title_keys: List[str] = []
+        self._project_names: Counter = Counter()
+        self._first_project_chunk: Dict[str, int] = {}
+
+    def _find_duplicate(self, spec: Dict[str, Any], chunk_index: int) -> Optional[int]:
+        key = _title_key(spec.get("title"))
+        if not key:
+            return None
+        assignee = (spec.get("assignee_name") or "").strip().lower()
+        for idx, existing_key in enumerate(self._title_keys):
+            # Tickets within one chunk are distinct by construction
+            if self._ticket_chunks[idx] == chunk_index:
+                continue
+            existing_assignee = (self.tickets[idx].get("assignee_name") or "").strip().lower()
+            if assignee and existing_assignee and assignee != existing_assignee:
+                continue
+            if existing_key == key or SequenceMatcher(None, key, existing_key).ratio() >= TITLE_SIMILARITY:
+                return idx
+        return None
+
+    @staticmethod
+    def _fill(existing: Dict[str, Any], spec: Dict[str, Any]) -> bool:
+        """Complete an existing ticket with details only the duplicate has; True if it changed."""
+        changed = False
+        for field, value in spec.items():
+            if field == "dependencies":
+                continue
+            if field == "labels":
+                labels = list(existing.get("labels") or [])
+                lowered = {str(label).lower() for label in labels}
+                added = [label for label in value or [] if str(label).lower() not in lowered]
+                if added:
+                    existing["labels"] = labels + added
+                    changed = True
+            elif field == "description":
+                if len(value or "") > len(existing.get("description") or ""):
+                    existing["description"] = value
+                    changed = True
+            elif existing.get(field) in (None, "", []) and value not in (None, "", []):
+                existing[field] = value
+                changed = True
+        return changed
+
+    def add_chunk(self, chunk_index: int, ticket_specs: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Merge one chunk's analyzer output.
+
+        Returns:
+            The tickets that were new (in global index order)
+        """
+        project_name = ticket_specs.get("project_name")
+        if project_name:
+            self._project_names[project_name] += 1
+            first = self._first_project_chunk.get(project_name, chunk_index)
+            self._first_project_chunk[project_name] = min(first, chunk_index)
+
+        # Keep the model's list positions: "ticket:N" refers to them
+        specs = {i: s for i, s in enumerate(ticket_specs.get("tickets") or []) if isinstance(s, dict)}
+        local_to_global: Dict[int, int] = {}
+        new_tickets = []
+        first_new = len(self.tickets)
+        updated = set()
+
+        for local_idx, spec in specs.items():
+            duplicate = self._find_duplicate(spec, chunk_index)
+            if duplicate is not None:
+                if self._fill(self.tickets[duplicate], spec):
+                    updated.add(duplicate)
+                local_to_global[local_idx] = duplicate
+            else:
+                local_to_global[local_idx] = len(self.tickets)
+                ticket = {**spec, "dependencies": []}
+                self.tickets.append(ticket)
+                self._ticket_chunks.append(chunk_index)
+                self._title_keys.append(_title_key(spec.get("title")))
+                new_tickets.append(ticket)
+
+        # Remap chunk-local "ticket:N" references to global indices
+        for local_idx, spec in specs.items():
+            global_idx = local_to_global[local_idx]
+            ticket = self.tickets[global_idx]
+            for dep in spec.get("dependencies") or []:
+                dep_idx = _dependency_index(dep)
+                if dep_idx is None or dep_idx not in local_to_global:
+                    continue
+                reference = f"ticket:{local_to_global[dep_idx]}"
+                if local_to_global[dep_idx] != global_idx and reference not in ticket["dependencies"]:
+                    ticket["dependencies"].append(reference)
+                    updated.add(global_idx)
+
+        self.updated = sorted(idx for idx in updated if idx < first_new)
+        return new_tickets
+
+    @property
+    def project_name(self) -> Optional[str]:
+        """Most common project name across chunks (earliest chunk breaks ties)."""
+        if not self._project_names:
+            return None
+        return min(
+            self._project_names,
+            key=lambda name: (-self._project_names[name], self._first_project_chunk[name]),
+        )
+
+    def result(self) -> Dict[str, Any]:
+        return {"project_name": self.project_name, "tickets": self.tickets}
@@ -0,0 +1,316 @@
+"""
+In-memory name index for resolving spoken/extracted names to users.
+
+Meeting transcripts refer to people as "Bob", "bob smith", "Smith" or by
+their email handle. The index is built once per process from the users
+collection and kept current by UserService writes, so resolving an
+assignee never scans every user:
+
+1. Exact lookup of the normalized full name, aliases, email prefix, and
+   the name with nicknames expanded ("Bob Smith" -> "robert smith").
+2. Single-token lookup ("Sarah", "Smith") against first and last names.
+3. Fuzzy fallback: candidates sharing the rarest character trigrams are
+   scored with SequenceMatcher (at least 60% similarity, as before).
+
+Another worker's writes are picked up on the next reload
+(USER_INDEX_TTL_SECONDS, default: 300).
+"""
+
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from firebase_admin import firestore
+
+USER_INDEX_TTL_SECONDS = float(os.getenv("USER_INDEX_TTL_SECONDS", "300"))
+
+COLLECTION = "users"
+
+# Minimum SequenceMatcher ratio of a fuzzy match
+MIN_SIMILARITY = 0.6
+# Fuzzy matching scores at most this many trigram candidates
+MAX_CANDIDATES = 10
+# Postings scanned per fuzzy lookup (rarest trigrams first)
+POSTING_BUDGET = 1500
+
+# Common English nicknames -> given name
+NICKNAMES = {
+    "abby": "abigail", "al": "albert", "alex": "alexander", "andy": "andrew",
+    "ben": "benjamin", "beth": "elizabeth", "bill": "william", "billy": "william",
+    "bob": "robert", "bobby": "robert", "cathy": "catherine", "charlie": "charles",
+    "chris": "christopher", "chuck": "charles", "dan": "daniel", "danny": "daniel",
+    "dave": "david", "deb": "deborah", "don": "donald", "ed": "edward",
+    "eddie": "edward", "fred": "frederick", "greg": "gregory", "jack": "john",
+    "jake": "jacob", "jen": "jennifer", "jenny": "jennifer", "jim": "james",
+    "jimmy": "james", "joe": "joseph", "joey": "joseph", "johnny": "john",
+    "jon": "jonathan", "josh": "joshua", "kate": "katherine", "katie": "katherine",
+    "ken": "kenneth", "larry": "lawrence", "liz": "elizabeth", "matt": "matthew",
+    "meg": "margaret", "mike": "michael", "mikey": "michael", "nate": "nathan",
+    "nick": "nicholas", "pat": "patrick", "pete": "peter", "rick": "richard",
+    "rob": "robert", "ron": "ronald", "sam": "samuel", "steve": "steven",
+    "sue": "susan", "ted": "theodore", "tim": "timothy", "tom": "thomas",
+    "tommy": "thomas", "tony": "anthony", "vicky": "victoria", "will": "william",
+    "zach": "zachary",
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_EMAIL_SEPARATORS = re.compile(r"[._\-+]+")
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(_NON_ALNUM.sub(" ", text).split())
+
+
+def expand_nicknames(normalized: str) -> str:
+    """Replace a leading nickname with the given name ("bob smith" -> "robert smith")."""
+    first, _, rest = normalized.partition(" ")
+    given = NICKNAMES.get(first)
+    if given is None:
+        return normalized
+    return f"{given} {rest}".strip()
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _email_keys(email: Optional[str]) -> List[str]:
+    if not email or "@" not in email:
+        return []
+    local = email.split("@", 1)[0].lower()
+    keys = [normalize_name(local)]
+    spaced = normalize_name(_EMAIL_SEPARATORS.sub(" ", local))
+    if spaced not in keys:
+        keys.append(spaced)
+    return [key for key in keys if key]
+
+
+class UserNameIndex:
+    """Name, alias, nickname and trigram lookups over all users."""
+
+    def __init__(self, ttl_seconds: float = USER_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        # Writes made while a load is fetching users (None when not loading)
+        self._pending: Optional[List[Tuple[dict, Optional[str]]]] = None
+        self._invalidations = 0
+        self._clear()
+
+    def _clear(self):
+        self._users: Dict[str, dict] = {}
+        self._names: Dict[str, str] = {}                      # user ID -> normalized name
+        self._exact: Dict[str, Set[str]] = defaultdict(set)   # key -> user IDs
+        self._tokens: Dict[str, Set[str]] = defaultdict(set)  # first/last name -> user IDs
+        self._trigrams: Dict[str, Set[str]] = defaultdict(set)
+        self._keys: Dict[str, List[str]] = {}                 # user ID -> exact keys
+        self._user_tokens: Dict[str, List[str]] = {}
+
+    # ------------------------------------------------------------------
+    # Loading and updates
+    # ------------------------------------------------------------------
+
+    def ensure_loaded(self, db: firestore.Client):
+        """Build the index on first use and rebuild it after the TTL."""
+        if self._fresh():
+            return
+        with self._load_lock:
+            if self._fresh():
+                return
+            started = time.perf_counter()
+            with self._lock:
+                self._pending = []
+                invalidations = self._invalidations
+            # Fetch without holding the index lock so lookups continue meanwhile
+            users = []
+            try:
+                for doc in db.collection(COLLECTION).stream():
+                    user = doc.to_dict()
+                    user["id"] = doc.id
+                    users.append(user)
+            except BaseException:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                pending, self._pending = self._pending, None
+                self._clear()
+                for user in users:
+                    self._add(user)
+                # Writes made during the fetch, replayed over it
+                for user, removed_id in pending:
+                    if user is not None:
+                        self._remove(user["id"])
+                        self._add(user)
+                    else:
+                        self._remove(removed_id)
+                # Invalidated mid-fetch: serve this load but rebuild on next use
+                self._loaded_at = time.monotonic() if invalidations == self._invalidations else None
+            print(f"[UserIndex] Indexed {len(users)} users in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def _fresh(self) -> bool:
+        with self._lock:
+            return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+            self._invalidations += 1
+
+    def upsert(self, user: dict):
+        """Add or replace a user after a write (recorded for the load in progress, if any)."""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((user, None))
+            if self._loaded_at is None:
+                return
+            self._remove(user["id"])
+            self._add(user)
+
+    def remove(self, user_id: str):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((None, user_id))
+            if self._loaded_at is not None:
+                self._remove(user_id)
+
+    def _add(self, user: dict):
+        user_id = user["id"]
+        name = normalize_name(user.get("name"))
+        keys = {name, expand_nicknames(name)}
+        for alias in user.get("aliases") or []:
+            alias = normalize_name(alias)
+            keys.update((alias, expand_nicknames(alias)))
+        keys.update(_email_keys(user.get("email")))
+        keys.discard("")
+
+        parts = name.split()
+        tokens = {parts[0], parts[-1], NICKNAMES.get(parts[0], parts[0])} if parts else set()
+
+        self._users[user_id] = user
+        self._names[user_id] = name
+        self._keys[user_id] = sorted(keys)
+        self._user_tokens[user_id] = sorted(tokens)
+        for key in keys:
+            self._exact[key].add(user_id)
+        for token in tokens:
+            self._tokens[token].add(user_id)
+        for gram in _trigrams(name):
+            self._trigrams[gram].add(user_id)
+
+    def _remove(self, user_id: str):
+        if user_id not in self._users:
+            return
+        name = self._names.pop(user_id)
+        for key in self._keys.pop(user_id):
+            self._discard(self._exact, key, user_id)
+        for token in self._user_tokens.pop(user_id):
+            self._discard(self._tokens, token, user_id)
+        for gram in _trigrams(name):
+            self._discard(self._trigrams, gram, user_id)
+        del self._users[user_id]
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, user_id: str):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(user_id)
+            if not ids:
+                del index[key]
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get(self, user_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._users.get(user_id)
+
+    def names(self, user_ids: Iterable[str]) -> Dict[str, str]:
+        """User ID -> display name for the given (known) users."""
+        with self._lock:
+            return {uid: self._users[uid].get("name") for uid in user_ids if uid in self._users}
+
+    def match(self, name: Optional[str]) -> Optional[dict]:
+        """Best user for a name, or None if nobody is similar enough."""
+        query = normalize_name(name)
+        if not query:
+            return None
+        with self._lock:
+            for key in (query, expand_nicknames(query)):
+                ids = self._exact.get(key)
+                if ids:
+                    return self._users[self._best(query, ids)[0]]
+
+            if " " not in query:
+                ids = self._tokens.get(query) or self._tokens.get(NICKNAMES.get(query, query))
+                if ids:
+                    return self._users[self._best(query, ids)[0]]
+
+            best_id, ratio = self._best(query, self._trigram_candidates(query))
+            return self._users[best_id] if best_id is not None and ratio >= MIN_SIMILARITY else None
+
+    def _trigram_candidates(self, query: str) -> List[str]:
+        """Users sharing the most trigrams with query, scanning the rarest trigrams first."""
+        postings = sorted(
+            (self._trigrams[gram] for gram in _trigrams(query) if gram in self._trigrams),
+            key=len
+        )
+        counts: Counter = Counter()
+        scanned = 0
+        for ids in postings:
+            if scanned and scanned + len(ids) > POSTING_BUDGET:
+                break
+            counts.update(ids)
+            scanned += len(ids)
+        return [user_id for user_id, _ in counts.most_common(MAX_CANDIDATES)]
+
+    def _best(self, query: str, user_ids: Iterable[str]) -> Tuple[Optional[str], float]:
+        """(user ID, similarity) of the closest name among user_ids."""
+        # Very common names only score the first few (by ID, so results are stable)
+        if not isinstance(user_ids, list):
+            user_ids = heapq.nsmallest(MAX_CANDIDATES, user_ids)
+        # One matcher per query variant: SequenceMatcher caches its analysis of b
+        matchers = []
+        for variant in dict.fromkeys((query, expand_nicknames(query))):
+            matcher = SequenceMatcher(None)
+            matcher.set_seq2(variant)
+            matchers.append(matcher)
+
+        best_id, best_ratio = None, -1.0
+        for user_id in user_ids:
+            name = self._names[user_id]
+            for matcher in matchers:
+                matcher.set_seq1(name)
+                # Upper bounds first: skip the full ratio when it cannot win
+                if matcher.real_quick_ratio() <= best_ratio or matcher.quick_ratio() <= best_ratio:
+                    continue
+                ratio = matcher.ratio()
+                if ratio > best_ratio:
+                    best_id, best_ratio = user_id, ratio
+        return best_id, best_ratio
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "exact_keys": len(self._exact),
+                "trigrams": len(self._trigrams),
+            }
+
+
+# Singleton instance
+user_index = UserNameIndex()
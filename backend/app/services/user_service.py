@@ -11,6 +11,8 @@ from typing import List, Optional
 from datetime import datetime
 
 from app.models.schemas import UserCreate, UserUpdate
+from app.services import data_layout, aggregations, ticket_events
+from app.services.user_index import user_index
 
 
 class UserService:
@@ -40,6 +42,7 @@ class UserService:
         user_dict["created_at"] = datetime.utcnow()
         user_dict["updated_at"] = datetime.utcnow()
 
+        user_index.upsert(user_dict)
         return user_dict
 
     @staticmethod
@@ -59,6 +62,11 @@ class UserService:
 
         return users
 
+    @staticmethod
+    def count_users(db: firestore.Client) -> int:
+        """Count users using an aggregation query."""
+        return aggregations.count(db.collection(UserService.COLLECTION))
+
     @staticmethod
     def get_user_by_id(db: firestore.Client, user_id: str) -> Optional[dict]:
         """Get a single user by ID."""
@@ -112,6 +120,7 @@ class UserService:
         updated_doc = doc_ref.get()
         user = updated_doc.to_dict()
         user["id"] = updated_doc.id
+        user_index.upsert(user)
         return user
 
     @staticmethod
@@ -128,7 +137,7 @@ class UserService:
             return False
 
         # Update all tickets assigned to this user (set assignee_id to null)
-        tickets_ref = db.collection("tickets")
+        tickets_ref = data_layout.cross_project_query(db, "tickets")
         query = tickets_ref.where(filter=FieldFilter("assignee_id", "==", user_id))
         tickets = query.stream()
 
@@ -141,6 +150,10 @@ class UserService:
 
         # Commit batch
         batch.commit()
+        user_index.remove(user_id)
+
+        # Assignments changed across projects
+        ticket_events.reset()
 
         return True
 
@@ -0,0 +1,224 @@
+"""
+Silence trimming with an energy / zero-crossing voice activity detector.
+
+Meeting recordings often contain minutes of silence or dead air that are
+uploaded and billed like speech. SilenceTrimmer runs inside audio
+normalization (see audio_preprocess), on the mono 16 kHz samples, and
+cuts every pause longer than VAD_MIN_SILENCE_MS down to VAD_PAD_MS on
+each side, so words at the edges of speech are never clipped.
+
+Each 30 ms frame is classified from two vectorized features:
+- energy (dBFS) above an adaptive threshold: VAD_MARGIN_DB over the noise
+  floor, but at least VAD_THRESHOLD_DB. The floor follows the 10th
+  percentile of each block's frames down at once and up only slowly, so
+  a stretch of continuous speech does not raise it;
+- zero-crossing rate: frames just below the threshold still count as
+  speech when their ZCR is that of unvoiced consonants (s, f, sh), and
+  frames above it do not when the ZCR is that of mains hum.
+
+The trimmer keeps an OffsetMap from trimmed to original time, so word
+timestamps of the transcript are mapped back to the uploaded recording.
+Only quiet spans are cut: steady hold music is as loud as speech and is
+kept.
+
+Configuration (environment variables):
+- VAD_ENABLED: Trim silence unless the request says otherwise (default: true)
+- VAD_MIN_SILENCE_MS: Shortest pause that is cut (default: 1000)
+- VAD_PAD_MS: Audio kept on each side of a cut (default: 300)
+- VAD_THRESHOLD_DB: Lowest energy threshold in dBFS (default: -50)
+- VAD_MARGIN_DB: Threshold above the noise floor (default: 10)
+"""
+
+import bisect
+import os
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+VAD_MIN_SILENCE_MS = int(os.getenv("VAD_MIN_SILENCE_MS", "1000"))
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", "300"))
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-50"))
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "10"))
+
+FRAME_MS = 30
+# Speech runs shorter than this are clicks or bumps, not words
+MIN_SPEECH_FRAMES = 3
+# Frames below the threshold by at most this much are speech if their ZCR is high
+UNVOICED_RESCUE_DB = 8.0
+UNVOICED_ZCR = 0.25
+# Frames at or below this ZCR are hum or rumble, not speech
+HUM_ZCR = 0.01
+# The noise floor drops at once but rises at most this much per second
+FLOOR_RISE_DB_PER_SECOND = 0.5
+
+
+class OffsetMap:
+    """Maps times of the trimmed audio back to the original recording."""
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        # From trimmed sample t onward, original = original_start + (t - trimmed_start)
+        self._trimmed: List[int] = [0]
+        self._original: List[int] = [0]
+
+    def add_cut(self, trimmed_at: int, original_resume: int):
+        self._trimmed.append(trimmed_at)
+        self._original.append(original_resume)
+
+    def to_original(self, seconds: float) -> float:
+        sample = seconds * self.sample_rate
+        i = bisect.bisect_right(self._trimmed, sample) - 1
+        return (self._original[i] + sample - self._trimmed[i]) / self.sample_rate
+
+    def to_list(self) -> List[Tuple[float, float]]:
+        """[(trimmed seconds, original seconds)] at the start of every kept span."""
+        return [
+            (round(t / self.sample_rate, 3), round(o / self.sample_rate, 3))
+            for t, o in zip(self._trimmed, self._original)
+        ]
+
+
+def frame_features(frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Energy (dBFS) and zero-crossing rate of each row of a (frames, samples) array."""
+    energy = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frames.shape[1] - 1)
+    return energy, zcr
+
+
+class SilenceTrimmer:
+    """Streaming silence cutter: feed blocks with process(), then call flush()."""
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * FRAME_MS / 1000)
+        self.pad = max(self.frame, int(sample_rate * VAD_PAD_MS / 1000))
+        # A cut keeps pad samples on both sides, so it must be longer than that
+        self.min_silence = max(int(sample_rate * VAD_MIN_SILENCE_MS / 1000), 2 * self.pad + self.frame)
+        self.offsets = OffsetMap(sample_rate)
+        self.consumed = 0              # Original samples seen
+        self.kept = 0                  # Samples emitted
+        self.cuts = 0
+        self.speech_frames = 0
+        self.frames = 0
+        # Noise floor estimate (dBFS); starts quiet so speech-only openings are not cut
+        self._floor = VAD_THRESHOLD_DB - VAD_MARGIN_DB
+        self._carry = np.zeros(0, dtype=np.float32)
+        # The silence run in progress: buffered until it is long enough to cut,
+        # then only its last pad samples (the lead-in of the next speech)
+        self._pending: List[np.ndarray] = []
+        self._pending_len = 0
+        self._cutting = False
+        self._silence_len = 0
+        self._tail = np.zeros(0, dtype=np.float32)
+
+    # ------------------------------------------------------------------
+    # Classification
+    # ------------------------------------------------------------------
+
+    def _classify(self, frames: np.ndarray) -> np.ndarray:
+        energy, zcr = frame_features(frames)
+        seconds = len(frames) * FRAME_MS / 1000
+        block_floor = float(np.percentile(energy, 10))
+        self._floor = min(block_floor, self._floor + FLOOR_RISE_DB_PER_SECOND * seconds)
+        threshold = max(VAD_THRESHOLD_DB, self._floor + VAD_MARGIN_DB)
+
+        speech = ((energy > threshold) & (zcr > HUM_ZCR)) | (
+            (energy > threshold - UNVOICED_RESCUE_DB) & (zcr > UNVOICED_ZCR)
+        )
+        # Drop speech runs too short to be words
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], speech.astype(np.int8), [0]))))
+        for start, end in zip(edges[::2], edges[1::2]):
+            if end - start < MIN_SPEECH_FRAMES:
+                speech[start:end] = False
+        return speech
+
+    # ------------------------------------------------------------------
+    # Streaming
+    # ------------------------------------------------------------------
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        samples = np.concatenate([self._carry, block]) if len(self._carry) else block
+        whole = len(samples) - len(samples) % self.frame
+        self._carry = samples[whole:]
+        if not whole:
+            return np.zeros(0, dtype=np.float32)
+
+        speech = self._classify(samples[:whole].reshape(-1, self.frame))
+        self.frames += len(speech)
+        self.speech_frames += int(np.count_nonzero(speech))
+
+        out: List[np.ndarray] = []
+        edges = np.flatnonzero(np.diff(speech.astype(np.int8))) + 1
+        for start, end in zip(np.concatenate(([0], edges)), np.concatenate((edges, [len(speech)]))):
+            run = samples[start * self.frame:end * self.frame]
+            out.extend(self._speech(run) if speech[start] else self._silence(run))
+        return np.concatenate(out) if out else np.zeros(0, dtype=np.float32)
+
+    def flush(self) -> np.ndarray:
+        """Close the stream; trailing silence is cut after its pad."""
+        out = self._silence(self._carry) if len(self._carry) else []
+        self._carry = np.zeros(0, dtype=np.float32)
+        if self._cutting:
+            self.cuts += 1  # Trailing silence: the tail is never needed
+            self._cutting = False
+        elif self._pending:
+            out.extend(self._emit(self._pending))
+            self._pending, self._pending_len = [], 0
+        return np.concatenate(out) if out else np.zeros(0, dtype=np.float32)
+
+    def _emit(self, parts: List[np.ndarray]) -> List[np.ndarray]:
+        self.kept += sum(len(part) for part in parts)
+        return parts
+
+    def _silence(self, run: np.ndarray) -> List[np.ndarray]:
+        self.consumed += len(run)
+        if self._cutting:
+            self._silence_len += len(run)
+            self._tail = np.concatenate([self._tail, run])[-self.pad:]
+            return []
+        self._pending.append(run)
+        self._pending_len += len(run)
+        if self._pending_len < self.min_silence:
+            return []
+        # Long enough to cut: emit the pad after the speech, keep only the last pad
+        buffered = np.concatenate(self._pending)
+        self._pending, self._pending_len = [], 0
+        self._cutting = True
+        self._silence_len = len(buffered)
+        self._tail = buffered[self.pad:][-self.pad:]
+        return self._emit([buffered[:self.pad]])
+
+    def _speech(self, run: np.ndarray) -> List[np.ndarray]:
+        out: List[np.ndarray] = []
+        if self._cutting:
+            # The tail starts where the original audio resumes
+            self.offsets.add_cut(self.kept, self.consumed - len(self._tail))
+            self.cuts += 1
+            out.extend(self._emit([self._tail]))
+            self._cutting = False
+            self._tail = np.zeros(0, dtype=np.float32)
+        elif self._pending:
+            out.extend(self._emit(self._pending))
+            self._pending, self._pending_len = [], 0
+        self.consumed += len(run)
+        out.extend(self._emit([run]))
+        return out
+
+    # ------------------------------------------------------------------
+    # Report
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        original = self.consumed / self.sample_rate
+        kept = self.kept / self.sample_rate
+        return {
+            "original_seconds": round(original, 2),
+            "kept_seconds": round(kept, 2),
+            "removed_seconds": round(original - kept, 2),
+            "reduction_ratio": round(1 - kept / original, 4) if original else 0.0,
+            "cuts": self.cuts,
+            "speech_frame_ratio": round(self.speech_frames / self.frames, 4) if self.frames else 0.0,
+            "offset_map": self.offsets.to_list(),
+        }
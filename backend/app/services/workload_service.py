@@ -0,0 +1,342 @@
+"""
+Assignee workload and project capacity analytics.
+
+A columnar index over all tickets (one NumPy array per field, string IDs
+interned to integer codes) is built with a single scan on first use and
+then updated in place from ticket_events. Workload and capacity queries
+are a boolean mask plus a bincount over the index, so they stay fast
+without re-reading Firestore.
+"""
+
+import itertools
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from firebase_admin import firestore
+
+from app.models.enums import TicketStatus
+from app.services import ticket_events
+from app.services.ticket_service import ticket_service, DONE_STATUSES
+
+# Working hours per business day, used for default cycle capacity
+HOURS_PER_DAY = 8.0
+
+STATUSES = [status.value for status in TicketStatus]
+_STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+_DONE_MASK = np.array([status in DONE_STATUSES for status in STATUSES])
+
+# Code for a missing ID (unassigned, no cycle, ...)
+_NONE = -1
+
+# Scans restarted by a reset mid-scan before the last one is used uncached
+INDEX_LOAD_ATTEMPTS = 3
+
+
+class _Interner:
+    """Maps string IDs to dense integer codes and back."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NONE
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: Optional[str]) -> Optional[int]:
+        """Code of an existing value (None if never seen)."""
+        if value is None:
+            return _NONE
+        return self.codes.get(value)
+
+    def value(self, code: int) -> Optional[str]:
+        return None if code == _NONE else self.values[code]
+
+
+def _status_value(status) -> Optional[str]:
+    return status.value if hasattr(status, "value") else status
+
+
+class WorkloadIndex:
+    """Columnar ticket index: rows are tickets, columns are NumPy arrays."""
+
+    def __init__(self, capacity: int = 1024):
+        self.rows: Dict[str, int] = {}
+        self.free: List[int] = []
+        self.assignees = _Interner()
+        self.projects = _Interner()
+        self.cycles = _Interner()
+
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.assignee = np.full(capacity, _NONE, dtype=np.int32)
+        self.project = np.full(capacity, _NONE, dtype=np.int32)
+        self.cycle = np.full(capacity, _NONE, dtype=np.int32)
+        self.status = np.zeros(capacity, dtype=np.int8)
+        self.hours = np.zeros(capacity, dtype=np.float64)
+        self.estimated = np.zeros(capacity, dtype=bool)
+
+    def _grow(self):
+        size = len(self.alive) * 2
+        for name in ("alive", "assignee", "project", "cycle", "status", "hours", "estimated"):
+            old = getattr(self, name)
+            fill = _NONE if name in ("assignee", "project", "cycle") else 0
+            new = np.full(size, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def upsert(self, ticket: dict):
+        """Insert or overwrite a ticket's row in place."""
+        row = self.rows.get(ticket["id"])
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            else:
+                row = len(self.rows)
+                if row >= len(self.alive):
+                    self._grow()
+            self.rows[ticket["id"]] = row
+
+        hours = ticket.get("estimated_hours")
+        has_hours = isinstance(hours, (int, float)) and not isinstance(hours, bool)
+
+        self.alive[row] = True
+        self.assignee[row] = self.assignees.code(ticket.get("assignee_id"))
+        self.project[row] = self.projects.code(ticket.get("project_id"))
+        self.cycle[row] = self.cycles.code(ticket.get("cycle_id"))
+        self.status[row] = _STATUS_CODES.get(_status_value(ticket.get("status")), 0)
+        self.hours[row] = float(hours) if has_hours else 0.0
+        self.estimated[row] = has_hours
+
+    def remove(self, ticket_id: str):
+        row = self.rows.pop(ticket_id, None)
+        if row is not None:
+            self.alive[row] = False
+            self.free.append(row)
+
+    def apply(self, ticket: Optional[dict], previous: Optional[dict]):
+        """Apply one ticket write (ticket is None for a delete)."""
+        if ticket is None:
+            self.remove(previous["id"])
+        else:
+            self.upsert(ticket)
+
+    def _summarize(self, rows: np.ndarray) -> Dict[str, Any]:
+        """Hours and ticket counts per status for the given rows."""
+        status = self.status[rows]
+        hours = self.hours[rows]
+        hours_by_status = np.bincount(status, weights=hours, minlength=len(STATUSES))
+        count_by_status = np.bincount(status, minlength=len(STATUSES))
+        done_hours = float(hours_by_status[_DONE_MASK].sum())
+        total_hours = float(hours_by_status.sum())
+        return {
+            "ticket_count": int(count_by_status.sum()),
+            "unestimated_ticket_count": int((~self.estimated[rows]).sum()),
+            "total_hours": round(total_hours, 2),
+            "remaining_hours": round(total_hours - done_hours, 2),
+            "completed_hours": round(done_hours, 2),
+            "hours_by_status": {s: round(float(h), 2) for s, h in zip(STATUSES, hours_by_status)},
+            "tickets_by_status": {s: int(c) for s, c in zip(STATUSES, count_by_status)},
+        }
+
+    def _groups(self, rows: np.ndarray, keys: np.ndarray):
+        """Yield (key code, group rows) for each distinct key among the rows."""
+        row_keys = keys[rows]
+        for key in np.unique(row_keys):
+            yield int(key), rows[row_keys == key]
+
+    def user_workload(self, assignee_id: str) -> Dict[str, Any]:
+        """A user's load overall, per project and per cycle."""
+        code = self.assignees.lookup(assignee_id)
+        if code is None:
+            rows = np.zeros(0, dtype=np.int64)
+        else:
+            rows = np.flatnonzero(self.alive & (self.assignee == code))
+
+        cycles = []
+        for cycle_code, cycle_rows in self._groups(rows, self.cycle):
+            project_codes = np.unique(self.project[cycle_rows])
+            cycles.append({
+                "cycle_id": self.cycles.value(cycle_code),
+                "project_id": self.projects.value(int(project_codes[0])) if len(project_codes) == 1 else None,
+                **self._summarize(cycle_rows),
+            })
+
+        projects = [
+            {"project_id": self.projects.value(project_code), **self._summarize(project_rows)}
+            for project_code, project_rows in self._groups(rows, self.project)
+        ]
+
+        return {
+            "user_id": assignee_id,
+            **self._summarize(rows),
+            "projects": projects,
+            "cycles": cycles,
+        }
+
+    def project_capacity(self, project_id: str, cycle_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-assignee load within a project (optionally one cycle)."""
+        project_code = self.projects.lookup(project_id)
+        if project_code is None:
+            return []
+        mask = self.alive & (self.project == project_code)
+        if cycle_id is not None:
+            cycle_code = self.cycles.lookup(cycle_id)
+            if cycle_code is None:
+                return []
+            mask &= self.cycle == cycle_code
+
+        # One bincount over (assignee, status) pairs; unassigned becomes slot 0
+        assignee = self.assignee[mask] + 1
+        status = self.status[mask].astype(np.int64)
+        hours = self.hours[mask]
+        estimated = self.estimated[mask]
+        width = len(STATUSES)
+        slots = assignee.astype(np.int64) * width + status
+        size = (len(self.assignees.values) + 1) * width
+        hours_grid = np.bincount(slots, weights=hours, minlength=size).reshape(-1, width)
+        count_grid = np.bincount(slots, minlength=size).reshape(-1, width)
+        unestimated = np.bincount(assignee, weights=(~estimated).astype(np.float64), minlength=len(self.assignees.values) + 1)
+
+        results = []
+        for slot in np.flatnonzero(count_grid.sum(axis=1)):
+            total = float(hours_grid[slot].sum())
+            done = float(hours_grid[slot][_DONE_MASK].sum())
+            results.append({
+                "assignee_id": self.assignees.value(int(slot) - 1),
+                "ticket_count": int(count_grid[slot].sum()),
+                "unestimated_ticket_count": int(unestimated[slot]),
+                "total_hours": round(total, 2),
+                "remaining_hours": round(total - done, 2),
+                "completed_hours": round(done, 2),
+                "hours_by_status": {s: round(float(h), 2) for s, h in zip(STATUSES, hours_grid[slot])},
+                "tickets_by_status": {s: int(c) for s, c in zip(STATUSES, count_grid[slot])},
+            })
+        results.sort(key=lambda r: r["remaining_hours"], reverse=True)
+        return results
+
+
+def cycle_capacity_hours(cycle: dict, hours_per_day: float = HOURS_PER_DAY) -> float:
+    """Available hours per person in a cycle (business days x hours per day)."""
+    start = np.datetime64(date.fromisoformat(str(cycle["start_date"])[:10]), "D")
+    end = np.datetime64(date.fromisoformat(str(cycle["end_date"])[:10]), "D")
+    return float(np.busday_count(start, end + np.timedelta64(1, "D"))) * hours_per_day
+
+
+class WorkloadService:
+    """Owns the workload index and keeps it current from ticket writes."""
+
+    def __init__(self):
+        self._index: Optional[WorkloadIndex] = None
+        # Writes seen by each scan in progress (None: reset, the scan is stale)
+        self._loading: Dict[int, Optional[List[tuple]]] = {}
+        self._load_ids = itertools.count()
+        self._lock = threading.RLock()
+
+    def _get_index(self, db: firestore.Client) -> WorkloadIndex:
+        """Get the index, scanning every ticket once on first use."""
+        for attempt in range(INDEX_LOAD_ATTEMPTS):
+            with self._lock:
+                if self._index is not None:
+                    return self._index
+                load_id = next(self._load_ids)
+                self._loading[load_id] = []
+
+            # Scan outside the lock so ticket writes are not blocked on I/O
+            try:
+                tickets = ticket_service.get_all_tickets(db)
+            except BaseException:
+                with self._lock:
+                    self._loading.pop(load_id, None)
+                raise
+
+            with self._lock:
+                pending = self._loading.pop(load_id)
+                if self._index is not None:
+                    return self._index
+                index = WorkloadIndex(capacity=max(1024, len(tickets) * 2))
+                for ticket in tickets:
+                    index.upsert(ticket)
+                if pending is not None:
+                    # Writes that arrived mid-scan, applied over it
+                    for ticket, previous in pending:
+                        index.apply(ticket, previous)
+                    self._index = index
+                    return index
+
+        # Reset during every scan: answer from the last one, without caching it
+        print("[Workload] Tickets kept changing while loading, index not cached")
+        return index
+
+    def get_user_workload(self, db: firestore.Client, user_id: str) -> Dict[str, Any]:
+        """Estimated hours assigned to a user, by status, project and cycle."""
+        index = self._get_index(db)
+        with self._lock:
+            return index.user_workload(user_id)
+
+    def get_project_capacity(
+        self,
+        db: firestore.Client,
+        project_id: str,
+        cycle: Optional[dict] = None,
+        capacity_hours: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Per-assignee load in a project compared with available hours.
+
+        Args:
+            db: Firestore client
+            project_id: Project to analyze
+            cycle: Restrict to this cycle; also sets the default capacity
+            capacity_hours: Available hours per person (overrides the cycle default)
+        """
+        index = self._get_index(db)
+        with self._lock:
+            assignees = index.project_capacity(project_id, cycle["id"] if cycle else None)
+
+        if capacity_hours is None and cycle is not None:
+            capacity_hours = cycle_capacity_hours(cycle)
+
+        for entry in assignees:
+            entry["capacity_hours"] = capacity_hours
+            if capacity_hours and entry["assignee_id"] is not None:
+                entry["utilization"] = round(entry["remaining_hours"] / capacity_hours, 3)
+                entry["over_capacity"] = entry["remaining_hours"] > capacity_hours
+            else:
+                entry["utilization"] = None
+                entry["over_capacity"] = False
+
+        return {
+            "project_id": project_id,
+            "cycle_id": cycle["id"] if cycle else None,
+            "capacity_hours": capacity_hours,
+            "total_remaining_hours": round(sum(a["remaining_hours"] for a in assignees), 2),
+            "assignees": assignees,
+        }
+
+    def on_ticket_event(self, event: str, ticket: Optional[dict], previous: Optional[dict]):
+        """ticket_events listener: update rows in place."""
+        with self._lock:
+            if event == "reset":
+                # Bulk changes (cycle/user deletes) are rare; rebuild on next read
+                self._index = None
+                for load_id in self._loading:
+                    self._loading[load_id] = None
+                return
+            if self._index is not None:
+                self._index.apply(ticket, previous)
+            for pending in self._loading.values():
+                if pending is not None:
+                    pending.append((ticket, previous))
+
+
+# Singleton instance
+workload_service = WorkloadService()
+ticket_events.subscribe(workload_service.on_ticket_event)
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Flat → Subcollection Layout Migration Script
+
+This script moves tickets, labels, cycles and modules from the top-level
+collections into per-project subcollections:
+
+    /tickets/{ticketId}  →  /projects/{projectId}/tickets/{ticketId}
+
+Document IDs are preserved, so existing references (parent_ticket_id,
+label_ids, cycle_id, ...) stay valid. The migration runs online, in phases,
+while the backend keeps serving traffic:
+
+    1. copy     Copy every flat document into its project subcollection.
+                Run this while the backend still uses FIRESTORE_LAYOUT=flat.
+    2. (switch) Set FIRESTORE_LAYOUT=subcollections and restart the backend.
+    3. sync     Re-copy flat documents written since the copy started
+                (between step 1 and the restart), and delete nested copies
+                whose flat original was deleted in that time. Nested
+                documents that are newer than their flat copy are left
+                untouched.
+    4. verify   Compare per-project counts between both layouts.
+    5. cleanup  Delete flat documents that have a nested copy. Projects
+                that were cleaned up are skipped by later syncs.
+
+Copies carry the layout marker the backend's cross-project queries filter
+on, so the flat originals are never read twice after the switch, and a
+migrated_from_flat flag for the sync phase. Top-level documents without a
+project get the marker in place. Deleting a nested document in the
+backend deletes its flat original too, so sync cannot resurrect it.
+
+Usage:
+    python migration/migrate_to_subcollections.py copy [--dry-run] [--project ID]
+    python migration/migrate_to_subcollections.py sync [--dry-run] [--project ID]
+    python migration/migrate_to_subcollections.py verify [--project ID]
+    python migration/migrate_to_subcollections.py cleanup [--dry-run] [--project ID]
+
+Output:
+    migration/subcollection_checkpoint.json - Copy start time and progress
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.firebase_service import initialize_firebase
+from app.services.data_layout import (
+    PROJECTS_COLLECTION, PROJECT_SCOPED_COLLECTIONS, LAYOUT_FIELD, MIGRATED_FIELD, SUBCOLLECTIONS,
+)
+from app.services import aggregations
+from firebase_admin import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+CHECKPOINT_PATH = Path(__file__).parent / "subcollection_checkpoint.json"
+BATCH_SIZE = 500
+
+
+def load_checkpoint() -> dict:
+    """Load migration progress (empty if the migration has not started)."""
+    if not CHECKPOINT_PATH.exists():
+        return {}
+    with open(CHECKPOINT_PATH, 'r') as f:
+        return json.load(f)
+
+
+def save_checkpoint(checkpoint: dict):
+    """Persist migration progress."""
+    with open(CHECKPOINT_PATH, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+
+
+def nested_collection(db, project_id: str, name: str):
+    """Subcollection holding a project's documents."""
+    return db.collection(PROJECTS_COLLECTION).document(project_id).collection(name)
+
+
+def flat_documents(db, name: str, project_id: str):
+    """Stream a project's documents from the flat top-level collection."""
+    query = db.collection(name).where(filter=FieldFilter("project_id", "==", project_id))
+    return query.stream()
+
+
+def as_datetime(value):
+    """Normalize Firestore timestamps and ISO strings for comparison."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def last_write(data: dict):
+    """Best-effort last modification time of a document."""
+    return as_datetime(data.get("updated_at")) or as_datetime(data.get("created_at"))
+
+
+def commit_in_batches(db, operations, dry_run: bool) -> int:
+    """
+    Apply (kind, ref, data) operations in batches of 500.
+
+    Returns:
+        Number of operations applied (or that would be applied)
+    """
+    count = 0
+    batch = db.batch()
+    pending = 0
+
+    for kind, ref, data in operations:
+        count += 1
+        if dry_run:
+            continue
+        if kind == "set":
+            batch.set(ref, data)
+        elif kind == "update":
+            batch.update(ref, data)
+        else:
+            batch.delete(ref)
+        pending += 1
+        if pending == BATCH_SIZE:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if pending and not dry_run:
+        batch.commit()
+
+    return count
+
+
+def copy_project(db, project_id: str, since=None, dry_run: bool = False) -> dict:
+    """
+    Copy one project's flat documents into its subcollections.
+
+    Args:
+        db: Firestore client
+        project_id: Project to migrate
+        since: Only copy documents written at or after this time, and
+               delete copies whose flat original is gone (sync phase)
+        dry_run: Count without writing
+
+    Returns:
+        Dict of collection name -> number of documents copied (and, when
+        syncing, "<name> deleted" -> nested copies deleted)
+    """
+    copied = {}
+
+    for name in PROJECT_SCOPED_COLLECTIONS:
+        target = nested_collection(db, project_id, name)
+        flat_ids = set()
+
+        def operations():
+            for doc in flat_documents(db, name, project_id):
+                flat_ids.add(doc.id)
+                data = doc.to_dict()
+                written = last_write(data)
+
+                if since is not None:
+                    if written is not None and written < since:
+                        continue
+                    # Never overwrite a nested document that changed after the switch
+                    existing = target.document(doc.id).get()
+                    if existing.exists:
+                        nested_written = last_write(existing.to_dict())
+                        if nested_written is not None and written is not None and nested_written >= written:
+                            continue
+
+                data["id"] = doc.id
+                data[LAYOUT_FIELD] = SUBCOLLECTIONS
+                data[MIGRATED_FIELD] = True
+                yield "set", target.document(doc.id), data
+
+        copied[name] = commit_in_batches(db, operations(), dry_run)
+
+        if since is not None:
+            # Deleted in the flat layout after the copy: delete the copy too
+            def deletions():
+                copies = target.where(filter=FieldFilter(MIGRATED_FIELD, "==", True)).stream()
+                for doc in copies:
+                    if doc.id not in flat_ids:
+                        yield "delete", doc.reference, None
+
+            copied[f"{name} deleted"] = commit_in_batches(db, deletions(), dry_run)
+
+    return copied
+
+
+def mark_unscoped(db, dry_run: bool = False) -> int:
+    """Add the nested-layout fields to top-level documents without a project (they stay in place)."""
+    def operations():
+        for name in PROJECT_SCOPED_COLLECTIONS:
+            for doc in db.collection(name).stream():
+                data = doc.to_dict()
+                if data.get("project_id") or data.get(LAYOUT_FIELD) == SUBCOLLECTIONS:
+                    continue
+                yield "update", doc.reference, {"id": doc.id, LAYOUT_FIELD: SUBCOLLECTIONS}
+
+    return commit_in_batches(db, operations(), dry_run)
+
+
+def count_project(db, project_id: str) -> dict:
+    """Count a project's documents in both layouts."""
+    counts = {}
+    for name in PROJECT_SCOPED_COLLECTIONS:
+        flat_query = db.collection(name).where(filter=FieldFilter("project_id", "==", project_id))
+        flat_count = aggregations.count(flat_query)
+        nested_count = aggregations.count(nested_collection(db, project_id, name))
+        counts[name] = (flat_count, nested_count)
+    return counts
+
+
+def cleanup_project(db, project_id: str, dry_run: bool = False) -> dict:
+    """Delete flat documents of a project that already have a nested copy."""
+    deleted = {}
+
+    for name in PROJECT_SCOPED_COLLECTIONS:
+        target = nested_collection(db, project_id, name)
+
+        def operations():
+            for doc in flat_documents(db, name, project_id):
+                if target.document(doc.id).get().exists:
+                    yield "delete", doc.reference, None
+                else:
+                    print(f"  ⚠ {name}/{doc.id} has no nested copy (kept)")
+
+        deleted[name] = commit_in_batches(db, operations(), dry_run)
+
+    return deleted
+
+
+def list_project_ids(db, only: str = None):
+    """All project IDs, or just the one requested."""
+    if only:
+        return [only]
+    return [doc.id for doc in db.collection(PROJECTS_COLLECTION).stream()]
+
+
+def run(phase: str, project: str = None, dry_run: bool = False):
+    """Run a migration phase across projects."""
+
+    # Initialize Firebase
+    print("Initializing Firebase...")
+    try:
+        initialize_firebase()
+        db = firestore.client()
+        print("✓ Firebase initialized successfully\n")
+    except Exception as e:
+        print(f"✗ ERROR: Failed to initialize Firebase: {str(e)}")
+        print("  Make sure firebase-credentials.json exists in the backend directory")
+        exit(1)
+
+    checkpoint = load_checkpoint()
+    project_ids = list_project_ids(db, project)
+    prefix = "[dry run] " if dry_run else ""
+
+    if phase == "copy":
+        if not dry_run:
+            checkpoint.setdefault("copy_started_at", datetime.now(timezone.utc).isoformat())
+            checkpoint.setdefault("copied_projects", [])
+        done = set(checkpoint.get("copied_projects", []))
+
+        for project_id in project_ids:
+            if project_id in done:
+                print(f"  - {project_id}: already copied (skipping)")
+                continue
+            copied = copy_project(db, project_id, dry_run=dry_run)
+            print(f"  ✓ {prefix}{project_id}: " + ", ".join(f"{n} {k}" for k, n in copied.items()))
+            if not dry_run:
+                checkpoint["copied_projects"].append(project_id)
+                save_checkpoint(checkpoint)
+        print(f"  ✓ {prefix}{mark_unscoped(db, dry_run)} documents without a project marked")
+
+        print("\nNext: set FIRESTORE_LAYOUT=subcollections, restart the backend, then run 'sync'.")
+
+    elif phase == "sync":
+        if "copy_started_at" not in checkpoint:
+            print("✗ ERROR: No copy checkpoint found. Run the 'copy' phase first.")
+            exit(1)
+        since = as_datetime(checkpoint["copy_started_at"])
+        cleaned = set(checkpoint.get("cleaned_projects", []))
+
+        for project_id in project_ids:
+            if project_id in cleaned:
+                # Flat originals are gone: syncing would delete every copy
+                print(f"  - {project_id}: already cleaned up (skipping)")
+                continue
+            copied = copy_project(db, project_id, since=since, dry_run=dry_run)
+            print(f"  ✓ {prefix}{project_id}: " + ", ".join(f"{n} {k}" for k, n in copied.items()))
+        print(f"  ✓ {prefix}{mark_unscoped(db, dry_run)} documents without a project marked")
+
+        if not dry_run:
+            checkpoint["synced_at"] = datetime.now(timezone.utc).isoformat()
+            save_checkpoint(checkpoint)
+
+    elif phase == "verify":
+        errors = []
+        for project_id in project_ids:
+            for name, (flat_count, nested_count) in count_project(db, project_id).items():
+                if flat_count == nested_count:
+                    print(f"✓ {project_id} {name.upper()}: {flat_count} documents (match)")
+                else:
+                    error_msg = f"✗ {project_id} {name.upper()}: flat={flat_count}, nested={nested_count} (MISMATCH)"
+                    print(error_msg)
+                    errors.append(error_msg)
+
+        print("\n" + "="*60)
+        if errors:
+            print(f"✗ VERIFICATION FAILED ({len(errors)} issue(s))")
+            print("="*60)
+            exit(1)
+        print("✓ VERIFICATION SUCCESSFUL")
+        print("="*60)
+
+    elif phase == "cleanup":
+        if "synced_at" not in checkpoint and not dry_run:
+            print("✗ ERROR: Run the 'sync' phase before cleaning up flat documents.")
+            exit(1)
+
+        for project_id in project_ids:
+            deleted = cleanup_project(db, project_id, dry_run=dry_run)
+            print(f"  ✓ {prefix}{project_id}: deleted " + ", ".join(f"{n} {k}" for k, n in deleted.items()))
+            if not dry_run:
+                checkpoint.setdefault("cleaned_projects", [])
+                if project_id not in checkpoint["cleaned_projects"]:
+                    checkpoint["cleaned_projects"].append(project_id)
+                save_checkpoint(checkpoint)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate project entities into subcollections")
+    parser.add_argument("phase", choices=["copy", "sync", "verify", "cleanup"])
+    parser.add_argument("--project", help="Only migrate this project ID")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    run(args.phase, project=args.project, dry_run=args.dry_run)
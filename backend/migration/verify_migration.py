@@ -18,6 +18,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from app.services.firebase_service import initialize_firebase
+from app.services import aggregations
 from firebase_admin import firestore
 
 
@@ -64,8 +65,8 @@ def verify_migration(db_path: str):
             print(f"⚠ {sqlite_table.upper()}: Table not found in SQLite (skipping)")
             continue
 
-        # Count in Firestore
-        firestore_count = len(list(db.collection(firestore_collection).stream()))
+        # Count in Firestore (single aggregation query, no document reads)
+        firestore_count = aggregations.count(db.collection(firestore_collection))
 
         # Compare
         if sqlite_count == firestore_count:
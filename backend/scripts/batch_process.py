@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Batch Meeting Processing Script
+
+Runs an archive of meeting transcripts through the 3-agent workflow
+(analysis → ticket creation → diagram) and writes one NDJSON record per
+meeting:
+
+    {"id": "2024/standup-01.txt", "status": "done", "project_id": "...",
+     "ticket_count": 4, "ticket_ids": [...], "seconds": 12.3, ...}
+    {"id": "...", "status": "failed", "stage": "analysis", "error": "..."}
+
+The output file doubles as the checkpoint: run the same command again
+after an interruption and meetings that already have a record are
+skipped. LLM calls are throttled by the shared NVIDIA limits
+(NVIDIA_RPM, NVIDIA_TPM, NVIDIA_MAX_CONCURRENCY), however many workers run.
+
+Usage:
+    python scripts/batch_process.py DIRECTORY --output results.ndjson [--workers N]
+    python scripts/batch_process.py manifest.jsonl --output results.ndjson [--retry-failed]
+    python scripts/batch_process.py DIRECTORY --output results.ndjson --dry-run
+
+A directory is searched recursively for .txt/.md transcripts. A manifest
+has one JSON object per line: {"id", "path" or "transcript", "project_name"}.
+"""
+
+import argparse
+import signal
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Load .env before app imports (services read API keys and limits at import)
+load_dotenv(Path(__file__).parent.parent / ".env")
+
+from app.services.firebase_service import initialize_firebase, get_firestore_client
+from app.services.batch_service import BatchRun, BATCH_WORKERS, completed_ids, load_items
+from app.services.nemotron_service import nvidia_limiter
+
+
+def run(source: str, output: str, workers: int, retry_failed: bool = False, dry_run: bool = False):
+    """Process every pending transcript of a directory or manifest."""
+    print("=" * 60)
+    print("Batch meeting processing")
+    print("=" * 60)
+
+    items = load_items(Path(source))
+    output_path = Path(output)
+    finished = completed_ids(output_path, retry_failed)
+    pending = [item for item in items if item["id"] not in finished]
+    print(f"Source:  {source} ({len(items)} transcripts)")
+    print(f"Output:  {output_path}")
+    print(f"Pending: {len(pending)} ({len(items) - len(pending)} already processed)")
+    print(f"Workers: {workers}")
+
+    if dry_run:
+        for item in pending[:20]:
+            print(f"  - {item['id']}")
+        if len(pending) > 20:
+            print(f"  ... and {len(pending) - 20} more")
+        return
+    if not pending:
+        print("\n✓ Nothing to do")
+        return
+
+    initialize_firebase()
+    db = get_firestore_client()
+
+    batch = BatchRun(items, output_path, workers=workers, retry_failed=retry_failed)
+
+    def stop(signum, frame):
+        print("\nStopping after the meetings in progress (run again to resume)...")
+        batch.cancel()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    def progress(current: BatchRun):
+        print(f"  ✓ {current.progress_line()}")
+
+    batch.run(db, on_progress=progress)
+
+    stats = batch.stats()
+    limiter = nvidia_limiter.stats()
+    print("\n" + "=" * 60)
+    print(f"Status:     {stats['status']}")
+    print(f"Processed:  {stats['done']} done, {stats['failed']} failed, {stats['remaining']} remaining")
+    print(f"Tickets:    {stats['tickets_created']}")
+    print(f"Elapsed:    {stats['elapsed_seconds']}s")
+    print(f"Throughput: {stats['meetings_per_minute']} meetings/min")
+    print(f"LLM calls:  {limiter['admitted']} ({limiter['retries']} retries, {limiter['throttled']} throttled)")
+    print("=" * 60)
+    if stats["failed"]:
+        print("Re-run with --retry-failed to process failed meetings again")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run archived meeting transcripts through the agent workflow")
+    parser.add_argument("source", help="Directory of .txt/.md transcripts or a .jsonl manifest")
+    parser.add_argument("--output", required=True, help="NDJSON results file (also the resume checkpoint)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Meetings processed at the same time")
+    parser.add_argument("--retry-failed", action="store_true", help="Process meetings whose last record failed again")
+    parser.add_argument("--dry-run", action="store_true", help="List pending transcripts without processing them")
+    args = parser.parse_args()
+
+    try:
+        run(args.source, args.output, args.workers, retry_failed=args.retry_failed, dry_run=args.dry_run)
+    except ValueError as e:
+        print(f"❌ {str(e)}")
+        sys.exit(1)
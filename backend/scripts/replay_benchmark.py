@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Offline Pipeline Benchmark
+
+Runs meetings through transcription (audio inputs) and Agent 1 analysis
+against the stand-in API server, so throughput numbers are repeatable and
+free. The server is started in-process with the given latency and error
+settings; the LLM response cache is disabled so every call reaches it.
+
+Usage:
+    # Record fixtures once (real API calls, keys from .env)
+    python scripts/replay_benchmark.py INPUTS --record
+
+    # Replay as often as needed
+    python scripts/replay_benchmark.py INPUTS [--meetings 50] [--concurrency 8]
+        [--latency-ms 800 --jitter-ms 200 | --latency-scale 0.5]
+        [--error-rate 0.05 --error-status 429] [--seed 1]
+        [--no-normalize | --codec opus|flac|wav] [--no-trim]
+
+INPUTS is a directory of .txt/.md transcripts and audio files (.wav, .mp3,
+.m4a, .webm, .ogg). Inputs are reused round-robin to reach --meetings.
+--full also creates tickets and diagrams; it needs Firestore (set
+FIRESTORE_EMULATOR_HOST to keep the run offline).
+
+Audio is normalized and silence-trimmed before transcription (see
+audio_preprocess and voice_activity); compare runs with and without
+--no-normalize / --no-trim for the end-to-end effect. Normalized
+and original uploads are different requests, so record fixtures for both.
+"""
+
+import argparse
+import mimetypes
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Load .env before app imports (services read API keys and limits at import)
+load_dotenv(Path(__file__).parent.parent / ".env")
+# Every call has to reach the (stand-in) API to be measured
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+from app.services import api_replay
+
+TRANSCRIPT_SUFFIXES = (".txt", ".md")
+AUDIO_SUFFIXES = (".wav", ".mp3", ".m4a", ".webm", ".ogg", ".flac")
+
+
+def load_inputs(source: Path):
+    """Transcript and audio files of a directory, sorted by path."""
+    inputs = [
+        path for path in sorted(source.rglob("*"))
+        if path.is_file() and path.suffix.lower() in TRANSCRIPT_SUFFIXES + AUDIO_SUFFIXES
+    ]
+    if not inputs:
+        raise ValueError(f"No transcripts or audio files found in {source}")
+    return inputs
+
+
+def process(path: Path, full: bool, db=None, normalize: bool = True, codec: str = None, trim: bool = True) -> dict:
+    """One meeting: transcribe (audio), then analyze or run the whole workflow."""
+    from app.services.agent_service import agent_service, AgentService
+    from app.services.deepgram_service import deepgram_service
+
+    started = time.perf_counter()
+    bytes_saved = 0
+    silence_seconds = 0.0
+    if path.suffix.lower() in AUDIO_SUFFIXES:
+        mimetype = mimetypes.guess_type(path.name)[0] or "audio/wav"
+        result = deepgram_service.transcribe_file(
+            path.read_bytes(), mimetype, normalize=normalize, codec=codec, trim_silence=trim
+        )
+        if not result["success"]:
+            return {"success": False, "stage": "transcription", "seconds": time.perf_counter() - started}
+        transcript = result["data"]["transcript"]
+        preprocess = result["data"]["metadata"]["preprocess"]
+        bytes_saved = preprocess.get("bytes_saved", 0)
+        silence_seconds = preprocess.get("silence", {}).get("removed_seconds", 0.0)
+    else:
+        transcript = path.read_text(encoding="utf-8")
+
+    if full:
+        result = agent_service.process_meeting_transcript(db, transcript)
+    else:
+        result = AgentService.analyze_meeting(transcript)
+    return {
+        "success": result["success"],
+        "stage": result.get("stage", "analysis"),
+        "seconds": time.perf_counter() - started,
+        "bytes_saved": bytes_saved,
+        "silence_seconds": silence_seconds,
+    }
+
+
+def run(args):
+    inputs = load_inputs(Path(args.inputs))
+    meetings = [inputs[i % len(inputs)] for i in range(args.meetings or len(inputs))]
+
+    server = None
+    if args.record:
+        api_replay.MODE = "record"
+        print(f"Recording fixtures to {api_replay.FIXTURES_DIR}")
+    else:
+        server = api_replay.ReplayServer(
+            fixtures_dir=Path(args.fixtures),
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            latency_scale=args.latency_scale,
+            chunk_delay_ms=args.chunk_delay_ms,
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            seed=args.seed,
+        )
+        api_replay.MODE = "replay"
+        api_replay.REPLAY_URL = server.start()
+        print(f"Replaying fixtures from {args.fixtures} at {api_replay.REPLAY_URL}")
+
+    db = None
+    if args.full:
+        from app.services.firebase_service import initialize_firebase, get_firestore_client
+        initialize_firebase()
+        db = get_firestore_client()
+
+    print(f"Meetings: {len(meetings)} ({len(inputs)} distinct inputs), concurrency {args.concurrency}")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda path: process(path, args.full, db, not args.no_normalize, args.codec, not args.no_trim), meetings))
+    elapsed = time.perf_counter() - started
+
+    from app.services.nemotron_service import nvidia_limiter
+    latencies = sorted(r["seconds"] for r in results)
+    failed = [r for r in results if not r["success"]]
+    limiter = nvidia_limiter.stats()
+
+    print("\n" + "=" * 60)
+    print(f"Meetings:   {len(results) - len(failed)} ok, {len(failed)} failed")
+    print(f"Elapsed:    {elapsed:.2f}s")
+    print(f"Throughput: {len(results) / (elapsed / 60.0):.1f} meetings/min")
+    print(f"Latency:    p50 {statistics.median(latencies):.2f}s, "
+          f"p95 {latencies[max(0, int(len(latencies) * 0.95) - 1)]:.2f}s, max {latencies[-1]:.2f}s")
+    print(f"Audio:      {sum(r.get('bytes_saved', 0) for r in results) / (1024 * 1024):.1f} MB saved by normalization, "
+          f"{sum(r.get('silence_seconds', 0) for r in results):.0f}s of silence trimmed")
+    print(f"LLM calls:  {limiter['admitted']} ({limiter['retries']} retries, {limiter['throttled']} throttled)")
+    if server is not None:
+        print(f"Server:     {server.stats()}")
+        server.stop()
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the meeting pipeline against recorded API responses")
+    parser.add_argument("inputs", help="Directory of transcripts and audio files")
+    parser.add_argument("--record", action="store_true", help="Call the real APIs and record fixtures")
+    parser.add_argument("--fixtures", default=str(api_replay.FIXTURES_DIR), help="Fixture directory")
+    parser.add_argument("--meetings", type=int, default=None, help="Meetings to run (default: one per input)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Meetings processed at the same time")
+    parser.add_argument("--full", action="store_true", help="Also create tickets and diagrams (needs Firestore)")
+    parser.add_argument("--latency-ms", type=float, default=None, help="Fixed latency instead of the recorded one")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform jitter around --latency-ms")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for recorded latency")
+    parser.add_argument("--chunk-delay-ms", type=float, default=0.0, help="Delay between streamed SSE events")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=503, help="Status of injected errors (e.g. 429, 503)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-normalize", action="store_true", help="Send audio files as they are")
+    parser.add_argument("--no-trim", action="store_true", help="Keep silences in normalized audio")
+    parser.add_argument("--codec", choices=("opus", "flac", "wav"), default=None, help="Codec of normalized audio")
+    args = parser.parse_args()
+
+    try:
+        run(args)
+    except ValueError as e:
+        print(f"❌ {str(e)}")
+        sys.exit(1)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Stand-in Nemotron/Deepgram Server
+
+Serves recorded API fixtures (see app/services/api_replay.py) so the
+backend can run without network access or API keys:
+
+    # 1. Record: run the app (or scripts/replay_benchmark.py --record) with
+    API_REPLAY_MODE=record uvicorn app.main:app
+
+    # 2. Replay: start this server and point the app at it
+    python scripts/replay_server.py --port 8765 --latency-scale 1.0 --error-rate 0.05
+    API_REPLAY_MODE=replay API_REPLAY_URL=http://127.0.0.1:8765 LLM_CACHE_ENABLED=false uvicorn app.main:app
+
+Latency defaults to the recorded time of each exchange; --latency-ms
+replaces it with a fixed value (+/- --jitter-ms). Injected errors and
+latency are reproducible for a given --seed.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.api_replay import ReplayServer, FIXTURES_DIR
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded Nemotron/Deepgram responses")
+    parser.add_argument("--fixtures", default=str(FIXTURES_DIR), help="Fixture directory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=None, help="Fixed latency instead of the recorded one")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform jitter around --latency-ms")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for recorded latency")
+    parser.add_argument("--chunk-delay-ms", type=float, default=0.0, help="Delay between streamed SSE events")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=503, help="Status of injected errors (e.g. 429, 503)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        fixtures_dir=Path(args.fixtures),
+        host=args.host,
+        port=args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        latency_scale=args.latency_scale,
+        chunk_delay_ms=args.chunk_delay_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    print(f"Serving fixtures from {args.fixtures} at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nStopped: {server.stats()}")